@@ -4,6 +4,8 @@ import seaborn as sns
 import os
 import numpy as np
 
+from saisonprofile import saisonprofile
+
 sns.set_theme(style="whitegrid")
 
 def load_data(filepath="rohdaten.xlsx"):
@@ -14,15 +16,26 @@ def load_data(filepath="rohdaten.xlsx"):
         df_raw = pd.read_excel(filepath)
         print(f"Datei '{filepath}' erfolgreich geladen: {df_raw.shape[0]} Zeilen, {df_raw.shape[1]} Spalten.")
         
-        df_raw['bedmo_date'] = pd.to_datetime(df_raw['bedmo'], format='%Y%m')
-        
     except FileNotFoundError:
         print(f"FEHLER: Datei nicht gefunden: '{filepath}'")
         return None
     except Exception as e:
-        print(f"Fehler beim Laden oder Umwandeln von 'bedmo': {e}")
+        print(f"Fehler beim Laden: {e}")
         return None
         
+    return prepare_data(df_raw)
+
+def prepare_data(df_raw):
+    """
+    Ergänzt die (bereits geladenen) Rohdaten um 'bedmo_date'.
+    Arbeitet auf einer Kopie, damit andere Stufen dieselben Rohdaten weiterverwenden können.
+    """
+    try:
+        df_raw = df_raw.copy()
+        df_raw['bedmo_date'] = pd.to_datetime(df_raw['bedmo'], format='%Y%m')
+    except Exception as e:
+        print(f"Fehler beim Umwandeln von 'bedmo': {e}")
+        return None
     return df_raw
 
 # --- Schritt 2: Effizient Aggregieren ---
@@ -116,24 +129,31 @@ def plot_task_trends(df_baumarkt_agg, output_dir):
     plt.savefig(os.path.join(output_dir, "1_Gesamtmarkt_Trend.png"))
     plt.close()
 
-def plot_task_seasonality(df_artikelgruppe_agg, output_dir):
+def plot_task_seasonality(df_artikelgruppe_agg, output_dir, df_profile=None):
     """
     AUFGABE: Analyse von Saisonalität (auf Teilegruppen-Ebene)
     
     NEU: Zeigt die 5 Gruppen mit der HÖCHSTEN SCHWANKUNG (Volatilität),
     nicht das höchste Gesamtvolumen.
+    Wenn Saisonprofile übergeben werden (saisonprofile.py), wird deren CV über die
+    beobachteten Monate genutzt (gleiche Definition wie unten) statt ihn hier neu zu berechnen.
     """
     print("Erstelle Plot: 2_Saisonalitaet_Staerste_Schwankung.png")
     
-    # Berechne die Volatilität (Schwankung) für jede Gruppe
-    # Wir nutzen den Variationskoeffizienten (Std / Mean)
-    df_volatility = df_artikelgruppe_agg.groupby('Baumarktartikel')['wavor_bstlmg'].agg(
-        std_dev='std',
-        mean_val='mean'
-    ).reset_index()
-    
-    # CV = Standardabweichung / Mittelwert. fillna(0) falls mean = 0
-    df_volatility['cv'] = (df_volatility['std_dev'] / df_volatility['mean_val']).fillna(0)
+    if df_profile is not None:
+        df_volatility = df_profile[df_profile['Ebene'] == 'Teilegruppe'].rename(
+            columns={'CV_Beobachtet': 'cv', 'Mittelwert_Beobachtet': 'mean_val'}
+        )[['Baumarktartikel', 'mean_val', 'cv']]
+    else:
+        # Berechne die Volatilität (Schwankung) für jede Gruppe
+        # Wir nutzen den Variationskoeffizienten (Std / Mean)
+        df_volatility = df_artikelgruppe_agg.groupby('Baumarktartikel')['wavor_bstlmg'].agg(
+            std_dev='std',
+            mean_val='mean'
+        ).reset_index()
+        
+        # CV = Standardabweichung / Mittelwert. fillna(0) falls mean = 0
+        df_volatility['cv'] = (df_volatility['std_dev'] / df_volatility['mean_val']).fillna(0)
     
     df_volatility = df_volatility[df_volatility['mean_val'] > 100] # Schwellenwert ggf. anpassen!
 
@@ -242,17 +262,9 @@ def plot_task_trends_per_baumarkt(df_baumarkt_agg, output_dir, top_n=10):
 
 
 
-def main():
-    # Output-Verzeichnisse erstellen
-    os.makedirs("./output", exist_ok=True)
-    plot_dir = "./output/plots/1"
+def run_analysis(data, plot_dir="./output/plots/1"):
+    """Aggregation, Glättung und alle Präsentations-Plots für bereits geladene Rohdaten."""
     os.makedirs(plot_dir, exist_ok=True)
-    
-    # 1. Laden
-    data = load_data()
-    if data is None:
-        print("Daten konnten nicht geladen werden. Skript wird beendet.")
-        return
 
     # 2. Aggregieren (Ebenen 3 und 4)
     df_baumarkt_agg, df_artikelgruppe_agg = aggregate_data(data)
@@ -270,8 +282,9 @@ def main():
     # Plot 1: Gesamt-Trend
     plot_task_trends(df_baumarkt_agg, plot_dir)
     
-    # Plot 2: Saisonalität
-    plot_task_seasonality(df_artikelgruppe_agg, plot_dir)
+    # Plot 2: Saisonalität (CV aus dem gecachten Saisonprofil)
+    df_profile = saisonprofile(data)
+    plot_task_seasonality(df_artikelgruppe_agg, plot_dir, df_profile)
     
     # Plot 3: Ausreißer / Störgrößen
     plot_task_outliers(df_baumarkt_smoothed, plot_dir)
@@ -281,7 +294,17 @@ def main():
     
     print(f"\nAlle Analyse-Plots wurden im Ordner '{plot_dir}' gespeichert.")
 
-if __name__ == "__main__":
-    main()
+def main():
+    # Output-Verzeichnisse erstellen
+    os.makedirs("./output", exist_ok=True)
+    
+    # 1. Laden
+    data = load_data()
+    if data is None:
+        print("Daten konnten nicht geladen werden. Skript wird beendet.")
+        return
 
+    run_analysis(data)
 
+if __name__ == "__main__":
+    main()
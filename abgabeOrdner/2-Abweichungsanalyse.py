@@ -8,8 +8,11 @@ import matplotlib.dates as mdates
 
 warnings.filterwarnings("ignore")
 
+# --- KONFIGURATION ---
+OUTPUT_FILE_PLAN_AGG = "./output/agg_baumarktprogramm.xlsx"   # Eingabe für Schritt 3 und 4
 
-def load_rohdaten():
+
+def load_rohdaten(filepath="rohdaten.xlsx"):
     """
     Lädt die Rohdaten aus rohdaten.xlsx
 
@@ -17,7 +20,7 @@ def load_rohdaten():
         pd.DataFrame: Rohdaten mit Bestellinformationen
     """
     try:
-        df_raw = pd.read_excel("rohdaten.xlsx")
+        df_raw = pd.read_excel(filepath)
         print(
             f"✅ Rohdaten geladen: {df_raw.shape[0]} Zeilen, {df_raw.shape[1]} Spalten"
         )
@@ -25,7 +28,7 @@ def load_rohdaten():
         return df_raw
 
     except FileNotFoundError:
-        print("❌ Datei 'rohdaten.xlsx' nicht gefunden!")
+        print(f"❌ Datei '{filepath}' nicht gefunden!")
         print("🔍 Verfügbare Excel-Dateien:")
         for file in os.listdir("."):
             if file.endswith(".xlsx"):
@@ -37,7 +40,7 @@ def load_rohdaten():
         return None
 
 
-def load_baumarktprogramm():
+def load_baumarktprogramm(filepath="BAUMARKTPROGRAMM.xlsx"):
     """
     Lädt das Baumarktprogramm aus BAUMARKTPROGRAMM.xlsx
 
@@ -45,7 +48,7 @@ def load_baumarktprogramm():
         pd.DataFrame: Baumarktprogramm-Daten mit Prognosen
     """
     try:
-        df = pd.read_excel("BAUMARKTPROGRAMM.xlsx")
+        df = pd.read_excel(filepath)
         print(
             f"✅ Baumarktprogramm geladen: {df.shape[0]} Zeilen, {df.shape[1]} Spalten"
         )
@@ -53,7 +56,7 @@ def load_baumarktprogramm():
         return df
 
     except FileNotFoundError:
-        print("❌ Datei 'BAUMARKTPROGRAMM.xlsx' nicht gefunden!")
+        print(f"❌ Datei '{filepath}' nicht gefunden!")
         print("🔍 Verfügbare Excel-Dateien:")
         for file in os.listdir("."):
             if file.endswith(".xlsx"):
@@ -144,6 +147,17 @@ def agg_Rohdaten(data):
     return finale_daten
 
 
+def _zahlen(spalte):
+    """Spalte -> float; Texte wie '1 234,5' werden umgewandelt, Unlesbares und Leeres wird 0."""
+    zahlen = pd.to_numeric(spalte, errors="coerce")
+    text = spalte.notna() & zahlen.isna()
+    if text.any():
+        zahlen[text] = pd.to_numeric(
+            spalte[text].astype(str).str.replace(",", ".").str.replace(" ", ""), errors="coerce"
+        )
+    return zahlen.fillna(0.0).to_numpy(dtype=float)
+
+
 def agg_Baumarktprogramm(data):
     """
     Wandelt das BAUMARKTPROGRAMM-DataFrame in langes Format um:
@@ -167,32 +181,33 @@ def agg_Baumarktprogramm(data):
         "2028": list(range(43, 55)),  # AR-BC -> 43..54
     }
 
-    rows = []
-    for _, row in data.iterrows():
-        baumarkt = row.iloc[0]
-        if pd.isna(baumarkt):
-            continue
-        bname = str(baumarkt).strip()
-        if bname == "" or bname.lower() == "baumarkt":
-            continue
-        for jahr, indices in spalten_mapping.items():
-            for m_idx in range(12):
-                col_idx = indices[m_idx] if m_idx < len(indices) else None
-                wert = 0.0
-                if col_idx is not None and col_idx < len(row):
-                    val = row.iloc[col_idx]
-                    if pd.notna(val):
-                        try:
-                            wert = float(val)
-                        except Exception:
-                            try:
-                                wert = float(
-                                    str(val).replace(",", ".").replace(" ", "")
-                                )
-                            except Exception:
-                                wert = 0.0
-                monat_code = int(f"{jahr}{m_idx+1:02d}")
-                rows.append({"Baumarkt": bname, "Monat": monat_code, "Zahl": wert})
+    # Gültige Baumarkt-Zeilen (ohne leere Namen und Kopfzeilen)
+    namen = data.iloc[:, 0]
+    bname = namen.astype(str).str.strip()
+    gueltig = namen.notna() & bname.ne("") & bname.str.lower().ne("baumarkt")
+    bname = bname[gueltig].to_numpy(dtype=object)
+
+    # Alle Monatsspalten auf einmal in Zahlen umwandeln (Wide -> Long ohne Zeilenschleife)
+    monate, spalten = [], []
+    for jahr, indices in spalten_mapping.items():
+        for m_idx in range(12):
+            col_idx = indices[m_idx] if m_idx < len(indices) else None
+            monate.append(int(f"{jahr}{m_idx+1:02d}"))
+            spalten.append(col_idx if col_idx is not None and col_idx < data.shape[1] else -1)
+    spalten = np.array(spalten)
+    block = data.iloc[gueltig.to_numpy(), spalten[spalten >= 0]]
+    try:
+        zahlen = block.to_numpy(dtype=float, na_value=np.nan)
+    except (TypeError, ValueError):
+        zahlen = np.column_stack([_zahlen(block.iloc[:, i]) for i in range(block.shape[1])])
+    matrix = np.zeros((len(bname), len(monate)))
+    matrix[:, spalten >= 0] = np.nan_to_num(zahlen, nan=0.0)
+
+    rows = {
+        "Baumarkt": np.repeat(bname, len(monate)),
+        "Monat": np.tile(np.array(monate, dtype=np.int64), len(bname)),
+        "Zahl": matrix.ravel(),
+    }
 
     result = pd.DataFrame(rows, columns=["Baumarkt", "Monat", "Zahl"])
     # Falls mehrere Zeilen für gleichen Baumarkt/Monat existieren, zusammenfassen (Summe)
@@ -365,7 +380,7 @@ def main():
 
     # Export des Baumarktprogramms im langen Format
     baumarktProgamm_agg = agg_Baumarktprogramm(baumarktprogramm)
-    baumarktProgamm_agg.to_excel("./output/agg_baumarktprogramm.xlsx", index=False)
+    baumarktProgamm_agg.to_excel(OUTPUT_FILE_PLAN_AGG, index=False)
 
     plot_vergleich_baumarkt(rohdaten_agg, baumarktProgamm_agg, out_dir="./output/plots/2")
 
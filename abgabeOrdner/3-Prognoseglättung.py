@@ -6,9 +6,10 @@ import seaborn as sns
 
 # --- KONFIGURATION ---
 INPUT_FILE_ROHDATEN = "rohdaten.xlsx"
-INPUT_FILE_PLAN = "agg_baumarktprogramm.xlsx"
+INPUT_FILE_PLAN = "./output/agg_baumarktprogramm.xlsx"   # wie von Schritt 2 geschrieben
 OUTPUT_DIR = "./output/final"
 OUTPUT_FILE_EXCEL = "Final_Forecast_2026_2027.xlsx"
+OHNE_GRUPPE = "Ohne Gruppe"   # Artikel ohne Baumarktartikel (Teilegruppe)
 
 # Erstelle Ausgabeordner
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -18,13 +19,21 @@ sns.set_theme(style="whitegrid")
 # 1. HILFSFUNKTIONEN
 # ---------------------------------------------------------
 
+def norm_kunde(serie):
+    """Kunde zu Upper-Case String ohne Leerzeichen (gemeinsamer Schlüssel aller Module)."""
+    return serie.astype(str).str.strip().str.upper()
+
+def norm_gruppe(serie):
+    """Teilegruppe als String, fehlende Gruppe -> OHNE_GRUPPE."""
+    return serie.fillna(OHNE_GRUPPE).astype(str)
+
 def clean_keys(df, col_kunde='Kunde', col_monat='Monat'):
     """Bereinigt Schlüssel für sauberen Merge."""
     # Monat zu Int
     df[col_monat] = pd.to_numeric(df[col_monat], errors='coerce').fillna(0).astype(int)
     # Kunde zu Upper-Case String
     if col_kunde in df.columns:
-        df[col_kunde] = df[col_kunde].astype(str).str.strip().str.upper()
+        df[col_kunde] = norm_kunde(df[col_kunde])
     return df
 
 def calculate_factor(row):
@@ -41,17 +50,11 @@ def calculate_factor(row):
 # 2. DATEN LADEN
 # ---------------------------------------------------------
 
-def load_data():
-    print("Step 1: Lade Daten...")
-    
-    # A) Prognose
-    if not os.path.exists(INPUT_FILE_ROHDATEN):
-        print(f"❌ Fehler: {INPUT_FILE_ROHDATEN} fehlt.")
-        return pd.DataFrame(), pd.DataFrame()
-        
-    df_raw = pd.read_excel(INPUT_FILE_ROHDATEN)
-    
-    # Forecast zusammenbauen (Jahr 1 + 2)
+def prepare_forecast(df_raw, mit_horizont=False):
+    """
+    Baut die lange Prognose (Jahr 1 + 2) aus den Rohdaten: Artikel, Kunde, Gruppe, Monat, Menge.
+    mit_horizont=True ergänzt 'Horizont' (1 = prog_mg1, 2 = prog_mg2) je Zeile.
+    """
     # Spaltennamen ggf. anpassen falls nötig
     try:
         p1 = df_raw[['matnr', 'Baumarkt', 'Baumarktartikel', 'progmo', 'prog_mg1']].copy()
@@ -60,22 +63,23 @@ def load_data():
         p2 = df_raw[['matnr', 'Baumarkt', 'Baumarktartikel', 'progmo2', 'prog_mg2']].copy()
         p2.columns = ['Artikel', 'Kunde', 'Gruppe', 'Monat', 'Menge']
         
-        df_forecast = pd.concat([p1, p2], ignore_index=True)
-        df_forecast = df_forecast.dropna(subset=['Monat', 'Menge'])
-        df_forecast = df_forecast[df_forecast['Menge'] > 0]
-        df_forecast = clean_keys(df_forecast)
-        print(f"   ✅ Prognose geladen: {len(df_forecast)} Zeilen.")
-        
     except KeyError as e:
         print(f"❌ Fehler: Spalte fehlt in Rohdaten: {e}")
-        return pd.DataFrame(), pd.DataFrame()
+        return pd.DataFrame()
 
-    # B) Plan
-    if not os.path.exists(INPUT_FILE_PLAN):
-        print(f"❌ Fehler: {INPUT_FILE_PLAN} fehlt.")
-        return pd.DataFrame(), pd.DataFrame()
+    if mit_horizont:
+        p1['Horizont'] = 1
+        p2['Horizont'] = 2
+
+    df_forecast = pd.concat([p1, p2], ignore_index=True)
+    df_forecast = df_forecast.dropna(subset=['Monat', 'Menge'])
+    df_forecast = df_forecast[df_forecast['Menge'] > 0]
+    df_forecast = clean_keys(df_forecast)
+    print(f"   ✅ Prognose geladen: {len(df_forecast)} Zeilen.")
+    return df_forecast
 
-    df_plan = pd.read_excel(INPUT_FILE_PLAN)
+def prepare_plan(df_plan):
+    """Bereitet den aggregierten Vertriebsplan (Baumarkt, Monat, Zahl) für den Abgleich auf."""
     df_plan = df_plan.rename(columns={'Baumarkt': 'Kunde', 'Zahl': 'Ziel_Summe'})
     
     # --- KORREKTUR: Einheiten anpassen ---
@@ -85,6 +89,26 @@ def load_data():
     
     df_plan = clean_keys(df_plan)
     print(f"   ✅ Plan geladen: {len(df_plan)} Zeilen.")
+    return df_plan
+
+def load_data(rohdaten_pfad=INPUT_FILE_ROHDATEN, plan_pfad=INPUT_FILE_PLAN):
+    print("Step 1: Lade Daten...")
+    
+    # A) Prognose
+    if not os.path.exists(rohdaten_pfad):
+        print(f"❌ Fehler: {rohdaten_pfad} fehlt.")
+        return pd.DataFrame(), pd.DataFrame()
+        
+    df_forecast = prepare_forecast(pd.read_excel(rohdaten_pfad))
+    if df_forecast.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    # B) Plan
+    if not os.path.exists(plan_pfad):
+        print(f"❌ Fehler: {plan_pfad} fehlt.")
+        return pd.DataFrame(), pd.DataFrame()
+
+    df_plan = prepare_plan(pd.read_excel(plan_pfad))
 
     return df_forecast, df_plan
 
@@ -143,17 +167,10 @@ def run_reconciliation(df_forecast, df_plan):
 # 4. MAIN
 # ---------------------------------------------------------
 
-def main():
-    # Laden
-    df_forecast, df_plan = load_data()
-    if df_forecast.empty: return
-
-    # Rechnen
-    df_final = run_reconciliation(df_forecast, df_plan)
-    if df_final.empty: return
-
-    # Speichern
-    out_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE_EXCEL)
+def save_results(df_final, out_dir=OUTPUT_DIR):
+    """Schreibt den finalen Forecast als Excel und einen Kontroll-Plot."""
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, OUTPUT_FILE_EXCEL)
     cols = ['Artikel', 'Kunde', 'Gruppe', 'Monat', 'Menge', 'Faktor', 'Menge_Geglaettet']
     df_final[cols].to_excel(out_path, index=False)
     print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
@@ -167,10 +184,24 @@ def main():
         plt.plot(plot_data['Monat'], plot_data['Menge_Geglaettet'], label='Geglättet (Ziel)')
         plt.title("Gesamtvolumen Vorher vs. Nachher")
         plt.legend()
-        plt.savefig(os.path.join(OUTPUT_DIR, "Final_Check.png"))
+        plt.savefig(os.path.join(out_dir, "Final_Check.png"))
+        plt.close()
         print("   Plot gespeichert.")
     except:
         pass
+    return out_path
+
+def main():
+    # Laden
+    df_forecast, df_plan = load_data()
+    if df_forecast.empty: return
+
+    # Rechnen
+    df_final = run_reconciliation(df_forecast, df_plan)
+    if df_final.empty: return
+
+    # Speichern
+    save_results(df_final)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,7 +4,7 @@ import os
 
 # --- KONFIGURATION ---
 FILE_FORECAST_FINAL = "./output/final/Final_Forecast_2026_2027.xlsx"
-FILE_PLAN = "agg_baumarktprogramm.xlsx"
+FILE_PLAN = "./output/agg_baumarktprogramm.xlsx"   # wie von Schritt 2 geschrieben
 
 def clean_keys(df, col_kunde='Kunde', col_monat='Monat'):
     """Stellt sicher, dass wir Text und Zahlen vergleichen können."""
@@ -13,27 +13,17 @@ def clean_keys(df, col_kunde='Kunde', col_monat='Monat'):
         df[col_kunde] = df[col_kunde].astype(str).str.strip().str.upper()
     return df
 
-def main():
-    print("=== TEILAUFGABE 4: KONSISTENZPRÜFUNG ===")
-    
-    # 1. Daten laden
-    if not os.path.exists(FILE_FORECAST_FINAL):
-        print("❌ FEHLER: Finaler Forecast fehlt. Bitte erst Schritt 3 ausführen.")
-        return
+def check_consistency(df_final, df_plan, out_dir="./output/final"):
+    """
+    Summiert die geglätteten Artikelwerte je Kunde/Monat und vergleicht sie mit dem Plan.
+    Erwartet den Plan bereits in Stück (Ziel_Summe, wie in Schritt 3 skaliert).
 
-    print("1. Lade geglättete Artikeldaten...")
-    df_final = pd.read_excel(FILE_FORECAST_FINAL)
-    
-    print("2. Lade ursprünglichen Vertriebsplan...")
-    df_plan = pd.read_excel(FILE_PLAN)
-    df_plan = df_plan.rename(columns={'Baumarkt': 'Kunde', 'Zahl': 'Ziel_Summe'})
-    
-    # WICHTIG: Gleiche Skalierung wie in Schritt 3 anwenden!
-    df_plan['Ziel_Summe'] = df_plan['Ziel_Summe'] * 1000
-    
+    Returns:
+        pd.DataFrame: Vergleich pro Kunde/Monat mit Differenz und Differenz_Abs
+    """
     # Bereinigen
-    df_final = clean_keys(df_final)
-    df_plan = clean_keys(df_plan)
+    df_final = clean_keys(df_final.copy())
+    df_plan = clean_keys(df_plan.copy())
 
     # 2. Aggregation: Wir summieren die neuen Artikelwerte wieder hoch
     print("\n3. Prüfe Summen...")
@@ -71,8 +61,31 @@ def main():
         print(merged[merged['Differenz_Abs'] > 1000].head())
 
     # Optional: Export der Prüfung
-    merged.to_excel("./output/final/Konsistenz_Report.xlsx", index=False)
-    print(f"\n   Detaillierter Report gespeichert: ./output/final/Konsistenz_Report.xlsx")
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, "Konsistenz_Report.xlsx")
+    merged.to_excel(out_path, index=False)
+    print(f"\n   Detaillierter Report gespeichert: {out_path}")
+    return merged
+
+def main():
+    print("=== TEILAUFGABE 4: KONSISTENZPRÜFUNG ===")
+    
+    # 1. Daten laden
+    if not os.path.exists(FILE_FORECAST_FINAL):
+        print("❌ FEHLER: Finaler Forecast fehlt. Bitte erst Schritt 3 ausführen.")
+        return
+
+    print("1. Lade geglättete Artikeldaten...")
+    df_final = pd.read_excel(FILE_FORECAST_FINAL)
+    
+    print("2. Lade ursprünglichen Vertriebsplan...")
+    df_plan = pd.read_excel(FILE_PLAN)
+    df_plan = df_plan.rename(columns={'Baumarkt': 'Kunde', 'Zahl': 'Ziel_Summe'})
+    
+    # WICHTIG: Gleiche Skalierung wie in Schritt 3 anwenden!
+    df_plan['Ziel_Summe'] = df_plan['Ziel_Summe'] * 1000
+    
+    check_consistency(df_final, df_plan)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -18,7 +18,11 @@ def load_data():
         return pd.DataFrame()
     
     print("1. Lade Daten für Visualisierung...")
-    df = pd.read_excel(INPUT_FILE)
+    return prepare_data(pd.read_excel(INPUT_FILE))
+
+def prepare_data(df):
+    """Ergänzt den finalen Forecast um die Hilfsspalten für die Plots."""
+    df = df.copy()
     # Monat als String für diskrete Achse
     df['Monat_Str'] = df['Monat'].astype(str)
     return df
@@ -0,0 +1,228 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+from numpy.lib.stride_tricks import sliding_window_view
+
+from stufen import lade_stufe
+from exponentielle_glaettung import serien_matrix, matrix_zu_lang
+from saisonprofile import saisonprofile, saisonindex_matrix, saisonindizes, PROFIL_EBENEN
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/final"
+OUTPUT_FILE_EXCEL = "Ausreisser_Wuerfel.xlsx"
+WERT_COL = "wavor_bstlmg"
+
+FENSTER = 7             # Hampel-Fenster (Monate, muss ungerade sein)
+SCHWELLE = 3.0          # robuste z-Werte (MAD-Einheiten)
+MAD_FAKTOR = 1.4826     # MAD -> Standardabweichung bei Normalverteilung
+MIN_REL_SKALA = 0.1     # Untergrenze der Skala: 10% des lokalen Medians
+MIN_ABS_ABWEICHUNG = 1  # Abweichungen unter 1 Stück sind nie Ausreißer
+AUSFALL_MIN_NIVEAU = 100  # wie detect_and_smooth: (fast) 0 bei gleitendem Mittel > 100
+
+WUERFEL_EBENEN = {
+    "Artikel x Kunde": ["matnr", "Baumarkt"],
+    "Teilegruppe x Kunde": ["Baumarktartikel", "Baumarkt"],
+    "Teilegruppe": ["Baumarktartikel"],
+    "Kunde": ["Baumarkt"],
+}
+
+# ---------------------------------------------------------
+# 1. TESTS (vektorisiert über alle Reihen)
+# ---------------------------------------------------------
+
+def _fenster_median(fenster_view):
+    """Median über die letzte Achse per Partition (schneller als np.median bei ungeradem Fenster)."""
+    mitte = fenster_view.shape[-1] // 2
+    return np.partition(np.ascontiguousarray(fenster_view), mitte, axis=-1)[..., mitte]
+
+
+def hampel(werte, fenster=FENSTER, schwelle=SCHWELLE):
+    """
+    Hampel-Filter: gleitender Median / MAD über alle Reihen gleichzeitig.
+    Ränder werden gespiegelt, damit jedes Fenster voll ist.
+
+    Returns:
+        median (n, t), skala (n, t), z (n, t)
+    """
+    halb = fenster // 2
+    gepolstert = np.pad(werte, ((0, 0), (halb, halb)), mode="symmetric")
+    fenster_view = sliding_window_view(gepolstert, fenster, axis=1)
+    median = _fenster_median(fenster_view)
+    mad = _fenster_median(np.abs(fenster_view - median[..., None])) * MAD_FAKTOR
+
+    # Untergrenzen: relativ zum lokalen Median und reihenweite MAD
+    # (sonst würde in Fenstern voller Nullen jede Bestellung markiert)
+    reihen_mad = np.median(np.abs(werte - np.median(werte, axis=1, keepdims=True)), axis=1) * MAD_FAKTOR
+    skala = np.maximum.reduce([mad, MIN_REL_SKALA * np.abs(median), np.broadcast_to(reihen_mad[:, None], mad.shape)])
+    skala = np.maximum(skala, 1e-9)
+
+    abweichung = werte - median
+    z = np.where(np.abs(abweichung) >= MIN_ABS_ABWEICHUNG, abweichung / skala, 0.0)
+    return median, skala, z
+
+
+def saison_residuen(werte, monate, saison_index=None):
+    """
+    Saisonaler Residuentest: erwarteter Wert = Mittel * Saisonindex des Monats,
+    die Residuen werden pro Reihe robust (Median / MAD) standardisiert.
+    'saison_index' (n, 12) kommt aus dem Saisonprofil-Speicher (saisonindex_matrix);
+    ohne ihn wird er aus der Matrix selbst berechnet.
+
+    Returns:
+        erwartet (n, t), z (n, t)
+    """
+    index = saisonindizes(werte, monate) if saison_index is None else saison_index
+    mittel = werte.mean(axis=1)
+    erwartet = mittel[:, None] * index[:, np.asarray(monate) % 100 - 1]
+    residuen = werte - erwartet
+    zentrum = np.median(residuen, axis=1, keepdims=True)
+    skala = np.median(np.abs(residuen - zentrum), axis=1, keepdims=True) * MAD_FAKTOR
+    skala = np.maximum(skala, np.maximum(MIN_REL_SKALA * np.abs(mittel[:, None]), 1e-9))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(np.abs(residuen - zentrum) >= MIN_ABS_ABWEICHUNG, (residuen - zentrum) / skala, 0.0)
+    return erwartet, np.nan_to_num(z)
+
+
+def ausfall(werte, fenster=3):
+    """Die bisherige Regel aus detect_and_smooth: Wert <= 0.1 bei gleitendem Mittel > 100."""
+    gepolstert = np.pad(werte, ((0, 0), (fenster // 2, fenster // 2)), mode="edge")
+    gleitend = sliding_window_view(gepolstert, fenster, axis=1).mean(axis=-1)
+    return (werte <= 0.1) & (gleitend > AUSFALL_MIN_NIVEAU)
+
+
+# ---------------------------------------------------------
+# 2. ERSETZEN
+# ---------------------------------------------------------
+
+def _interpoliere(werte, maske):
+    """Lineare Interpolation zwischen den nächsten gültigen Nachbarn (zeilenweise, ohne Schleife)."""
+    n, t_max = werte.shape
+    t = np.broadcast_to(np.arange(t_max), (n, t_max))
+    gueltig = ~maske
+
+    links = np.where(gueltig, t, -1)
+    links = np.maximum.accumulate(links, axis=1)
+    rechts = np.where(gueltig, t, t_max)
+    rechts = np.minimum.accumulate(rechts[:, ::-1], axis=1)[:, ::-1]
+
+    zeilen = np.arange(n)[:, None]
+    wert_links = werte[zeilen, np.clip(links, 0, t_max - 1)]
+    wert_rechts = werte[zeilen, np.clip(rechts, 0, t_max - 1)]
+    wert_links = np.where(links < 0, wert_rechts, wert_links)
+    wert_rechts = np.where(rechts >= t_max, wert_links, wert_rechts)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        anteil = np.where(rechts > links, (t - links) / (rechts - links), 0.0)
+    interpoliert = wert_links + anteil * (wert_rechts - wert_links)
+    # Reihen ganz ohne gültige Werte bleiben unverändert
+    return np.where(maske & (gueltig.any(axis=1, keepdims=True)), interpoliert, werte)
+
+
+def ersetze(werte, maske, strategie, median=None, skala=None, erwartet=None, schwelle=SCHWELLE):
+    """
+    Ersetzungsstrategien für markierte Werte:
+    - 'median':        gleitender Median (Hampel)
+    - 'saison':        erwarteter Saisonwert
+    - 'interpolation': linear zwischen gültigen Nachbarmonaten
+    - 'kappen':        auf Median +/- Schwelle * Skala begrenzen
+    """
+    if strategie == "median":
+        return np.where(maske, median, werte)
+    if strategie == "saison":
+        return np.where(maske, erwartet, werte)
+    if strategie == "interpolation":
+        return _interpoliere(werte, maske)
+    if strategie == "kappen":
+        return np.where(maske, np.clip(werte, median - schwelle * skala, median + schwelle * skala), werte)
+    raise ValueError(f"Unbekannte Ersetzungsstrategie: '{strategie}'")
+
+
+# ---------------------------------------------------------
+# 3. AUSREISSER-WÜRFEL (alle Ebenen)
+# ---------------------------------------------------------
+
+def erkenne_ausreisser(werte, monate, strategie="median", schwelle=SCHWELLE, fenster=FENSTER, mit_saison=True,
+                       saison_index=None):
+    """
+    Kombiniert Hampel-, Saison- und Ausfalltest für eine Matrix (Reihen x Monate).
+    Spitzen (z.B. Aktionen) und Einbrüche (z.B. Umbau) werden gleichermaßen erkannt.
+    'saison_index' (n, 12): Saisonindizes aus dem Speicher, siehe saison_residuen.
+
+    Returns:
+        dict mit 'ausreisser', 'richtung' (+1 Spitze / -1 Einbruch), 'z', 'geglaettet'
+    """
+    median, skala, z = hampel(werte, fenster, schwelle)
+    maske = np.abs(z) > schwelle
+    erwartet = None
+    if mit_saison and werte.shape[1] >= 12:
+        erwartet, z_saison = saison_residuen(werte, monate, saison_index)
+        # Saisontest bestätigt: ein saisonaler Hochpunkt ist kein Ausreißer
+        maske &= np.abs(z_saison) > schwelle
+    maske |= ausfall(werte)
+    if erwartet is None:
+        erwartet = median
+
+    return {
+        "ausreisser": maske,
+        "richtung": np.where(maske, np.sign(werte - median), 0).astype(int),
+        "z": z,
+        "geglaettet": ersetze(werte, maske, strategie, median, skala, erwartet, schwelle),
+    }
+
+
+def ausreisser_wuerfel(df, wert_col=WERT_COL, strategie="median", ebenen=WUERFEL_EBENEN):
+    """
+    Läuft über alle Ebenen des Artikel/Gruppe/Kunde-Würfels.
+    Die Saisonindizes kommen aus dem Saisonprofil-Speicher (gleiche Ebenen).
+
+    Returns:
+        langes DataFrame: Ebene, Schlüssel, Monat, Wert, Ausreisser, Richtung, z, Wert_geglaettet
+    """
+    profile = saisonprofile(df, wert_col)
+    teile = []
+    for ebene, schluessel in ebenen.items():
+        werte, schluessel_df, monate = serien_matrix(df, schluessel, "bedmo", wert_col)
+        index = saisonindex_matrix(profile, ebene, schluessel_df) if ebene in PROFIL_EBENEN else None
+        ergebnis = erkenne_ausreisser(werte, monate, strategie, saison_index=index)
+
+        teil = matrix_zu_lang(werte, schluessel_df, monate, "Wert")
+        teil["Ausreisser"] = ergebnis["ausreisser"].reshape(-1)
+        teil["Richtung"] = ergebnis["richtung"].reshape(-1)
+        teil["z"] = ergebnis["z"].reshape(-1)
+        teil["Wert_geglaettet"] = ergebnis["geglaettet"].reshape(-1)
+        teil.insert(0, "Ebene", ebene)
+        teile.append(teil)
+    return pd.concat(teile, ignore_index=True)
+
+
+# ---------------------------------------------------------
+# 4. MAIN
+# ---------------------------------------------------------
+
+def main():
+    print("=== AUSREISSER-ERKENNUNG (HAMPEL / MAD) ===")
+    stufe2 = lade_stufe(2)
+    rohdaten = stufe2.load_rohdaten()
+    if rohdaten is None:
+        return
+
+    start = time.perf_counter()
+    wuerfel = ausreisser_wuerfel(rohdaten)
+    print(f"   ✅ {len(wuerfel):,} Werte geprüft in {time.perf_counter() - start:.2f}s")
+
+    uebersicht = wuerfel.groupby("Ebene").agg(
+        Werte=("Wert", "size"),
+        Spitzen=("Richtung", lambda r: (r > 0).sum()),
+        Einbrueche=("Richtung", lambda r: (r < 0).sum()),
+    )
+    print(uebersicht.to_string())
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE_EXCEL)
+    wuerfel[wuerfel["Ausreisser"]].to_excel(out_path, index=False)
+    print(f"\n✅ FERTIG! Ausreißer gespeichert: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
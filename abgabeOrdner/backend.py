@@ -0,0 +1,296 @@
+import pandas as pd
+import os
+import sys
+import time
+
+from stufen import lade_stufe
+
+# --- KONFIGURATION ---
+BACKEND = "pandas"          # "pandas" oder "polars"
+BACKENDS = ["pandas", "polars"]
+POLARS_THREADS = None       # None = alle Kerne (Polars-Standard); sonst vor dem ersten Import setzen
+
+# ---------------------------------------------------------
+# 1. BACKEND-AUSWAHL
+# ---------------------------------------------------------
+
+def _polars():
+    if POLARS_THREADS:
+        os.environ.setdefault("POLARS_MAX_THREADS", str(POLARS_THREADS))
+    try:
+        import polars as pl
+        return pl
+    except ImportError:
+        return None
+
+
+def verfuegbare_backends():
+    return [b for b in BACKENDS if b == "pandas" or _polars() is not None]
+
+
+def waehle_backend(name=None):
+    """
+    Liefert den zu nutzenden Backend-Namen. Ist Polars gewünscht, aber nicht installiert,
+    wird mit Hinweis auf pandas zurückgefallen (gleiche Ergebnisse, nur langsamer).
+    """
+    name = name or BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unbekanntes Backend '{name}' (erlaubt: {', '.join(BACKENDS)})")
+    if name == "polars" and _polars() is None:
+        print("   ⚠️ Polars nicht installiert (pip install polars) – nutze pandas.")
+        return "pandas"
+    return name
+
+
+def _nach_polars(df):
+    """
+    pandas -> Polars. pl.from_pandas braucht pyarrow für Text-Spalten (pandas 3: 'str');
+    ohne pyarrow werden diese als Python-Objekte übergeben, numerische Spalten direkt als numpy.
+    """
+    pl = _polars()
+    try:
+        return pl.from_pandas(df)
+    except ImportError:
+        spalten = {}
+        for name, serie in df.items():
+            if pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_datetime64_any_dtype(serie):
+                spalten[name] = pl.Series(name, serie.to_numpy(), nan_to_null=True)
+            else:
+                spalten[name] = pl.Series(name, serie.astype(object).where(serie.notna(), None).tolist())
+        return pl.DataFrame(spalten)
+
+
+def _nach_pandas(df):
+    """Polars -> pandas; ohne pyarrow spaltenweise über numpy."""
+    try:
+        return df.to_pandas()
+    except ImportError:  # auch ModuleNotFoundError
+        return pd.DataFrame({name: df[name].to_numpy() for name in df.columns})
+
+
+def _lazy(df, spalten):
+    """Nur die benötigten Spalten nach Polars übergeben; der Rest der Rohdaten bleibt in pandas."""
+    return _nach_polars(df[spalten]).lazy()
+
+
+# ---------------------------------------------------------
+# 2. AGGREGATION ROHDATEN (Stufe 2: agg_Rohdaten)
+# ---------------------------------------------------------
+
+def agg_rohdaten(data, backend=None):
+    """Wie agg_Rohdaten aus Stufe 2: Bestellungen + Prognosemonate je Baumarkt/Monat, bei Dopplung Maximum."""
+    if waehle_backend(backend) == "pandas":
+        return lade_stufe(2).agg_Rohdaten(data)
+
+    pl = _polars()
+    lf = _lazy(data, ["Baumarkt", "bedmo", "wavor_bstlmg", "progmo", "prog_mg1", "progmo2", "prog_mg2"])
+    teile = []
+    for monat_col, menge_col in [("bedmo", "wavor_bstlmg"), ("progmo", "prog_mg1"), ("progmo2", "prog_mg2")]:
+        teile.append(
+            lf.filter(pl.col("Baumarkt").is_not_null() & pl.col(monat_col).is_not_null())
+            .group_by(["Baumarkt", monat_col])
+            .agg(pl.col(menge_col).sum().cast(pl.Float64).alias("Zahl"))
+            # Monat wie _normalize_month: 202610.0 / "202610" -> 202610, ungültig -> entfernt
+            .select(
+                "Baumarkt",
+                pl.col(monat_col).cast(pl.Float64, strict=False).cast(pl.Int64, strict=False).alias("Monat"),
+                "Zahl",
+            )
+        )
+    ergebnis = (
+        pl.concat(teile, how="vertical_relaxed")
+        .filter(pl.col("Monat").is_not_null())
+        .group_by(["Baumarkt", "Monat"])
+        .agg(pl.col("Zahl").max())
+        .sort(["Baumarkt", "Monat"])
+        .collect()
+    )
+    return _nach_pandas(ergebnis)
+
+
+# ---------------------------------------------------------
+# 3. AGGREGATION JE BAUMARKT / TEILEGRUPPE (Stufe 1: aggregate_data)
+# ---------------------------------------------------------
+
+AGG_SUMME = ["wavor_bstlmg", "prog_mg1", "prog_mg2"]
+AGG_ERSTER = ["progmo", "progmo2"]
+
+
+def aggregate_data(data, backend=None):
+    """Wie aggregate_data aus Stufe 1 (erwartet 'bedmo_date' aus prepare_data)."""
+    if waehle_backend(backend) == "pandas":
+        return lade_stufe(1).aggregate_data(data)
+
+    pl = _polars()
+    lf = _lazy(data, ["Baumarkt", "Baumarktartikel", "bedmo_date"] + AGG_SUMME + AGG_ERSTER)
+    reihenfolge = ["wavor_bstlmg", "progmo", "prog_mg1", "progmo2", "prog_mg2"]
+    ausdruecke = [pl.col(c).sum() for c in AGG_SUMME] + [pl.col(c).drop_nulls().first() for c in AGG_ERSTER]
+
+    def je(ebene):
+        return (
+            lf.filter(pl.col(ebene).is_not_null() & pl.col("bedmo_date").is_not_null())
+            .group_by([ebene, "bedmo_date"])
+            .agg(ausdruecke)
+            .select([ebene, "bedmo_date"] + reihenfolge)
+            .sort([ebene, "bedmo_date"])
+        )
+
+    # Beide Abfragen gemeinsam ausführen -> gemeinsamer Scan, parallel
+    df_baumarkt_agg, df_artikelgruppe_agg = pl.collect_all([je("Baumarkt"), je("Baumarktartikel")])
+    return _nach_pandas(df_baumarkt_agg), _nach_pandas(df_artikelgruppe_agg)
+
+
+# ---------------------------------------------------------
+# 4. LANGE PROGNOSE (philipp/oldMain.py: structure_data)
+# ---------------------------------------------------------
+
+ID_SPALTEN = ["matnr", "Baumarktartikel", "Baumarkt", "kundnr"]
+
+
+def structure_data(df_raw, backend=None):
+    """
+    Prognose Jahr 1 + 2 untereinander (Prognose_Menge, Datum) wie structure_data in philipp/oldMain.py,
+    aber ohne Ausgabe/Export – das Schreiben bleibt beim Aufrufer.
+    """
+    if waehle_backend(backend) == "pandas":
+        teile = []
+        for monat_col, menge_col in [("progmo", "prog_mg1"), ("progmo2", "prog_mg2")]:
+            teil = df_raw[ID_SPALTEN + [monat_col, menge_col]].rename(
+                columns={monat_col: "Prognose_Monat_Code", menge_col: "Prognose_Menge"}
+            )
+            teile.append(teil.dropna(subset=["Prognose_Monat_Code", "Prognose_Menge"]))
+        df_lang = pd.concat(teile, ignore_index=True)
+        df_lang["Datum"] = pd.to_datetime(df_lang["Prognose_Monat_Code"].astype(int).astype(str), format="%Y%m")
+        return df_lang.drop(columns=["Prognose_Monat_Code"])
+
+    pl = _polars()
+    lf = _lazy(df_raw, ID_SPALTEN + ["progmo", "prog_mg1", "progmo2", "prog_mg2"])
+    teile = [
+        lf.select(ID_SPALTEN + [
+            pl.col(monat_col).alias("Prognose_Monat_Code"),
+            pl.col(menge_col).cast(pl.Float64).alias("Prognose_Menge"),
+        ]).drop_nulls(["Prognose_Monat_Code", "Prognose_Menge"])
+        for monat_col, menge_col in [("progmo", "prog_mg1"), ("progmo2", "prog_mg2")]
+    ]
+    code = pl.col("Prognose_Monat_Code").cast(pl.Int64)
+    df_lang = (
+        pl.concat(teile, how="vertical_relaxed")
+        .with_columns(pl.datetime(code // 100, code % 100, 1).alias("Datum"))
+        .drop("Prognose_Monat_Code")
+        .collect()
+    )
+    return _nach_pandas(df_lang)
+
+
+# ---------------------------------------------------------
+# 5. ABGLEICH (Stufe 3: run_reconciliation)
+# ---------------------------------------------------------
+
+def run_reconciliation(df_forecast, df_plan, backend=None):
+    """
+    Wie run_reconciliation aus Stufe 3: Faktor = Plan / Bottom-up je Kunde und Monat,
+    Fallback 1.0 ohne Plan. Gruppierung und Joins laufen in Polars, die Rundung
+    (numpy, kaufmännisch auf gerade) danach in pandas – damit das Ergebnis bitgleich bleibt.
+    """
+    if waehle_backend(backend) == "pandas":
+        return lade_stufe(3).run_reconciliation(df_forecast, df_plan)
+
+    pl = _polars()
+    print("\nStep 2: Führe Abgleich durch (Polars)...")
+    forecast = _nach_polars(df_forecast).lazy().with_row_index("_zeile")
+    plan = _lazy(df_plan, ["Kunde", "Monat", "Ziel_Summe"])
+
+    ist = pl.col("Bottom_Up_Summe")
+    ziel = pl.col("Ziel_Summe")
+    merged = (
+        forecast.group_by(["Kunde", "Monat"])
+        .agg(pl.col("Menge").sum().alias("Bottom_Up_Summe"))
+        .join(plan, on=["Kunde", "Monat"], how="inner")
+        .with_columns(
+            pl.when(ist == 0).then(0.0).when(ziel == 0).then(1.0).otherwise(ziel / ist).alias("Faktor")
+        )
+        .collect()
+    )
+    if merged.height == 0:
+        print("❌ FEHLER: Keine Matches (Kunde/Monat) gefunden!")
+        return pd.DataFrame()
+
+    total_ist = merged["Bottom_Up_Summe"].sum()
+    weighted_factor = merged["Ziel_Summe"].sum() / total_ist if total_ist > 0 else 0
+    print(f"   📊 Gewichteter Faktor: {weighted_factor:.2f} (Schnitt der Faktoren: {merged['Faktor'].mean():.2f})")
+
+    df_final = (
+        forecast.join(merged.lazy().select(["Kunde", "Monat", "Faktor"]), on=["Kunde", "Monat"], how="left")
+        .sort("_zeile")
+        .drop("_zeile")
+        .collect()
+    )
+    df_final = _nach_pandas(df_final)
+    missing_count = df_final["Faktor"].isna().sum()
+    if missing_count > 0:
+        print(f"   ℹ️  Info: {missing_count} Zeilen ohne Plan behalten (Faktor 1.0).")
+    df_final["Faktor"] = df_final["Faktor"].fillna(1.0)
+    df_final["Menge_Geglaettet"] = (df_final["Menge"] * df_final["Faktor"]).round(0).astype(int)
+    return df_final
+
+
+# ---------------------------------------------------------
+# 6. VERGLEICH DER BACKENDS
+# ---------------------------------------------------------
+
+def vergleiche(funktion, *args):
+    """
+    Führt 'funktion' mit allen verfügbaren Backends aus und prüft, ob die Ergebnisse gleich sind
+    (Werte und Zeilenfolge; Datentypen dürfen sich unterscheiden, z.B. datetime64[us] vs. [ns]).
+
+    Returns:
+        dict Backend -> Laufzeit in Sekunden
+    """
+    ergebnisse, zeiten = {}, {}
+    for name in verfuegbare_backends():
+        start = time.perf_counter()
+        ergebnisse[name] = funktion(*args, backend=name)
+        zeiten[name] = time.perf_counter() - start
+
+    referenz = ergebnisse["pandas"]
+    for name, ergebnis in ergebnisse.items():
+        if name == "pandas":
+            continue
+        paare = zip(referenz, ergebnis) if isinstance(referenz, tuple) else [(referenz, ergebnis)]
+        for a, b in paare:
+            pd.testing.assert_frame_equal(
+                a.reset_index(drop=True), b.reset_index(drop=True), check_dtype=False, check_exact=False
+            )
+        print(f"   ✅ {funktion.__name__}: {name} liefert dasselbe Ergebnis wie pandas.")
+    return zeiten
+
+
+# ---------------------------------------------------------
+# 7. MAIN
+# ---------------------------------------------------------
+
+def main():
+    pfad = sys.argv[1] if len(sys.argv) > 1 else "rohdaten.xlsx"
+    print(f"=== BACKEND-VERGLEICH ({', '.join(verfuegbare_backends())}) ===")
+    if "polars" not in verfuegbare_backends():
+        print("   ℹ️  Polars nicht installiert – es wird nur pandas ausgeführt.")
+
+    df_raw = lade_stufe(2).load_rohdaten(pfad)
+    if df_raw is None or df_raw.empty:
+        return
+    stufe3 = lade_stufe(3)
+    df_plan = stufe3.prepare_plan(pd.read_excel(stufe3.INPUT_FILE_PLAN))
+    df_forecast = stufe3.prepare_forecast(df_raw)
+
+    zeilen = []
+    zeilen.append(("agg_rohdaten", vergleiche(agg_rohdaten, df_raw)))
+    zeilen.append(("aggregate_data", vergleiche(aggregate_data, lade_stufe(1).prepare_data(df_raw))))
+    zeilen.append(("structure_data", vergleiche(structure_data, df_raw)))
+    zeilen.append(("run_reconciliation", vergleiche(run_reconciliation, df_forecast, df_plan)))
+
+    print("\nLaufzeiten (s):")
+    print(pd.DataFrame({name: z for name, z in zeilen}).T.round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import exponentielle_glaettung
+import strukturbrueche
+import intermittierende_nachfrage
+from stufen import lade_stufe
+from cache import daten_fingerprint, lade_cache, speichere_cache
+from exponentielle_glaettung import serien_matrix, prognose_matrix, monat_zu_index, index_zu_monat
+from strukturbrueche import regime_matrix
+from intermittierende_nachfrage import croston
+from genauigkeit import kennzahlen, ebenen_uebersicht
+from planversionen import lade_alle
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/backtest"
+OUTPUT_FILE_EXCEL = "Backtest_Ergebnisse.xlsx"
+HORIZONT = 12          # Monate nach jedem Prognose-Ursprung
+MIN_HISTORIE = 12      # Monate Historie, bevor der erste Ursprung bewertet wird
+MAX_WORKER = None      # None = alle Kerne
+
+# Methoden, deren Fenster nicht direkt nach dem Ursprung beginnt:
+# prog_mg2 zielt auf das 2. Jahr, also Monat 13-24 nach dem Ursprung
+VERSATZ = {"erp_jahr2": 12}
+
+# ---------------------------------------------------------
+# 1. KONTEXT AUFBAUEN (einmal pro Lauf)
+# ---------------------------------------------------------
+
+def _version_monat(version):
+    """Planstand 'JJJJ-MM' bzw. 'JJJJ-MM-TT' (planversionen.version_aus_datei) -> JJJJMM."""
+    return int(version[:4]) * 100 + int(version[5:7])
+
+
+def baue_kontext(df_raw, plan_versionen):
+    """
+    Bereitet alle Eingaben einmal auf:
+    - ist: gelieferte Mengen (bedmo / bedmo_mg) pro Artikel, Kunde, Monat
+    - erp: ERP-Prognosen prog_mg1 / prog_mg2 mit Erstellungsmonat (bedmo) und Jahr (1/2)
+    - plan_versionen: alle Planstände (planversionen.lade_alle: Version, Baumarkt, Monat, Zahl)
+    - plaene: je Planstand (JJJJMM) der Vertriebsplan wie in Schritt 3 (Kunde, Monat, Ziel_Summe)
+    """
+    stufe3 = lade_stufe(3)
+    basis = df_raw.copy()
+    basis["Kunde"] = stufe3.norm_kunde(basis["Baumarkt"])
+    basis["Gruppe"] = stufe3.norm_gruppe(basis["Baumarktartikel"])
+    basis["Quelle"] = pd.to_numeric(basis["bedmo"], errors="coerce")
+    basis = basis.dropna(subset=["Quelle"])
+    basis["Quelle"] = basis["Quelle"].astype(int)
+
+    ist = (
+        basis.groupby(["matnr", "Kunde", "Quelle"], as_index=False)["bedmo_mg"].sum()
+        .rename(columns={"matnr": "Artikel", "Quelle": "Monat", "bedmo_mg": "Ist"})
+    )
+
+    teile = []
+    for jahr, (monat_col, menge_col) in enumerate([("progmo", "prog_mg1"), ("progmo2", "prog_mg2")], start=1):
+        teil = basis[["matnr", "Kunde", "Quelle", monat_col, menge_col]].copy()
+        teil.columns = ["Artikel", "Kunde", "Quelle", "Monat", "Prognose"]
+        teil["Jahr"] = jahr
+        teile.append(teil)
+    erp = pd.concat(teile, ignore_index=True)
+    erp["Monat"] = pd.to_numeric(erp["Monat"], errors="coerce")
+    erp = erp.dropna(subset=["Monat", "Prognose"])
+    erp["Monat"] = erp["Monat"].astype(int)
+
+    gruppen = basis.drop_duplicates(["matnr", "Kunde"]).rename(columns={"matnr": "Artikel"})[
+        ["Artikel", "Kunde", "Gruppe"]
+    ]
+
+    werte, schluessel_df, monate = serien_matrix(ist, ("Artikel", "Kunde"), "Monat", "Ist")
+
+    plaene = [
+        (_version_monat(version), stufe3.prepare_plan(teil[["Baumarkt", "Monat", "Zahl"]]))
+        for version, teil in plan_versionen.groupby("Version", sort=True)
+    ]
+
+    return {
+        "ist": ist,
+        "erp": erp,
+        "plan_versionen": plan_versionen,
+        "plaene": plaene,
+        "gruppen": gruppen,
+        "matrix": (werte, schluessel_df, monate),
+    }
+
+
+def ursprunge(kontext, min_historie=MIN_HISTORIE):
+    """Alle Monate mit genug Historie davor und mindestens einem Ist-Monat danach."""
+    _, _, monate = kontext["matrix"]
+    return [int(m) for m in monate[min_historie - 1:-1]]
+
+
+def _fenster(origin, horizont, versatz=0):
+    start = monat_zu_index(origin) + versatz
+    return index_zu_monat(np.arange(start + 1, start + 1 + horizont))
+
+
+def plan_zum_ursprung(kontext, origin):
+    """Der zum Ursprung gültige Plan: jüngster Planstand bis einschließlich origin (None, wenn es keinen gab)."""
+    gueltig = [plan for stand, plan in kontext["plaene"] if stand <= origin]
+    return gueltig[-1] if gueltig else None
+
+
+# ---------------------------------------------------------
+# 2. METHODEN (Signatur: kontext, origin, horizont -> Artikel, Kunde, Monat, Prognose)
+# ---------------------------------------------------------
+
+def _erp(kontext, origin, horizont, jahr, versatz=0):
+    erp = kontext["erp"]
+    fenster = _fenster(origin, horizont, versatz)
+    auswahl = erp[(erp["Jahr"] == jahr) & (erp["Quelle"] <= origin) & erp["Monat"].isin(fenster)]
+    return auswahl.groupby(["Artikel", "Kunde", "Monat"], as_index=False)["Prognose"].sum()
+
+
+def methode_erp_jahr1(kontext, origin, horizont):
+    """ERP-Prognose prog_mg1 (1. Jahr), so wie sie zum Ursprung bekannt war."""
+    return _erp(kontext, origin, horizont, 1)
+
+
+def methode_erp_jahr2(kontext, origin, horizont):
+    """ERP-Prognose prog_mg2 (2. Jahr, Monat 13-24 nach dem Ursprung), so wie sie zum Ursprung bekannt war."""
+    return _erp(kontext, origin, horizont, 2, VERSATZ["erp_jahr2"])
+
+
+def methode_abgeglichen(kontext, origin, horizont):
+    """
+    ERP-Prognose (Jahr 1 + 2) nach dem Abgleich mit dem Vertriebsplan (run_reconciliation).
+    Abgeglichen wird mit dem Planstand, der zum Ursprung gültig war – ohne solchen keine Prognose.
+    """
+    stufe3 = lade_stufe(3)
+    leer = pd.DataFrame(columns=["Artikel", "Kunde", "Monat", "Prognose"])
+    df_plan = plan_zum_ursprung(kontext, origin)
+    if df_plan is None:
+        return leer
+    erp = kontext["erp"]
+    bekannt = erp[erp["Quelle"] <= origin].merge(kontext["gruppen"], on=["Artikel", "Kunde"], how="left")
+    df_forecast = bekannt.rename(columns={"Prognose": "Menge"})[["Artikel", "Kunde", "Gruppe", "Monat", "Menge"]]
+    df_forecast = df_forecast[df_forecast["Menge"] > 0]
+    if df_forecast.empty:
+        return leer
+
+    df_final = stufe3.run_reconciliation(df_forecast, df_plan)
+    if df_final.empty:
+        return leer
+    df_final = df_final[df_final["Monat"].isin(_fenster(origin, horizont))]
+    return (
+        df_final.groupby(["Artikel", "Kunde", "Monat"], as_index=False)["Menge_Geglaettet"].sum()
+        .rename(columns={"Menge_Geglaettet": "Prognose"})
+    )
+
+
+def _statistisch(kontext, origin, horizont, rechne):
+    werte, schluessel_df, monate = kontext["matrix"]
+    bis = int(np.searchsorted(monate, origin, side="right"))
+    prognose = rechne(werte[:, :bis], horizont)
+
+    fenster = _fenster(origin, horizont)
+    n = len(schluessel_df)
+    df = schluessel_df.loc[np.repeat(np.arange(n), horizont)].reset_index(drop=True)
+    df["Monat"] = np.tile(fenster, n)
+    df["Prognose"] = prognose.reshape(-1)
+    return df
+
+
+def methode_exp_glaettung(kontext, origin, horizont):
+    """Statistische Baseline (SES / Holt / Holt-Winters, beste Methode pro Reihe)."""
+    return _statistisch(kontext, origin, horizont, lambda w, h: prognose_matrix(w, horizont=h)[0])
+
+
+def methode_exp_glaettung_regime(kontext, origin, horizont):
+    """Wie exp_glaettung, aber nur mit der Historie seit dem letzten Strukturbruch."""
+    monate = kontext["matrix"][2]
+    return _statistisch(
+        kontext, origin, horizont,
+        lambda w, h: prognose_matrix(regime_matrix(w, monate[:w.shape[1]]), horizont=h)[0],
+    )
+
+
+def methode_sba(kontext, origin, horizont):
+    """Syntetos-Boylan (Croston-Variante) für alle Reihen."""
+    return _statistisch(kontext, origin, horizont, lambda w, h: np.repeat(croston(w, "sba")[:, None], h, axis=1))
+
+
+METHODEN = {
+    "erp_jahr1": methode_erp_jahr1,
+    "erp_jahr2": methode_erp_jahr2,
+    "abgeglichen": methode_abgeglichen,
+    "exp_glaettung": methode_exp_glaettung,
+    "exp_glaettung_regime": methode_exp_glaettung_regime,
+    "sba": methode_sba,
+}
+
+
+def methoden_parameter(methode):
+    """Einstellungen, von denen das Ergebnis einer Methode abhängt – Teil des Cache-Schlüssels."""
+    eg, sb = exponentielle_glaettung, strukturbrueche
+    glaettung = {
+        "alpha": eg.ALPHA_GITTER, "beta": eg.BETA_GITTER, "gamma": eg.GAMMA_GITTER, "saison": eg.SAISON_LAENGE,
+    }
+    parameter = {
+        "erp_jahr2": {"versatz": VERSATZ["erp_jahr2"]},
+        "exp_glaettung": glaettung,
+        "exp_glaettung_regime": {
+            **glaettung,
+            "max_brueche": sb.MAX_BRUECHE, "min_segment": sb.MIN_SEGMENT, "strafe": sb.STRAFE_FAKTOR,
+            "min_rel_sprung": sb.MIN_REL_SPRUNG, "min_saison_index": sb.MIN_SAISON_INDEX,
+        },
+        "sba": {"alpha": intermittierende_nachfrage.ALPHA},
+    }
+    return parameter.get(methode, {})
+
+# ---------------------------------------------------------
+# 3. BEWERTUNG PRO HIERARCHIEEBENE
+# ---------------------------------------------------------
+
+def bewerte(kontext, prognose, origin, horizont, versatz=0):
+    """
+    Vergleicht eine Prognose mit den Ist-Mengen im Fenster und rechnet die Kennzahlen pro Ebene.
+    Zellen (Artikel x Kunde x Monat), für die die Methode keine Prognose hat, bleiben NaN und
+    werden nicht bewertet – fehlendes Ist zählt dagegen als 0.
+    """
+    ist = kontext["ist"]
+    # Nur Monate bewerten, für die es schon Ist-Daten gibt
+    fenster = _fenster(origin, horizont, versatz)
+    fenster = fenster[fenster <= ist["Monat"].max()]
+    ist = ist[ist["Monat"].isin(fenster)]
+    prognose = prognose[prognose["Monat"].isin(fenster)]
+
+    vergleich = pd.merge(ist, prognose, on=["Artikel", "Kunde", "Monat"], how="outer")
+    vergleich["Ist"] = vergleich["Ist"].fillna(0)
+    vergleich = vergleich.dropna(subset=["Prognose"])
+    if vergleich.empty:
+        return pd.DataFrame()
+    vergleich = vergleich.merge(kontext["gruppen"], on=["Artikel", "Kunde"], how="left")
+    vergleich["Gruppe"] = lade_stufe(3).norm_gruppe(vergleich["Gruppe"])
+
+    uebersicht = ebenen_uebersicht(kennzahlen(vergleich))
+    return uebersicht.drop(columns="Horizont")
+
+
+# ---------------------------------------------------------
+# 4. PARALLELE AUSFÜHRUNG MIT CACHE PRO URSPRUNG
+# ---------------------------------------------------------
+
+_KONTEXT = None
+
+
+def _init_worker(kontext):
+    global _KONTEXT
+    _KONTEXT = kontext
+
+
+def _rechne_aufgabe(aufgabe):
+    origin, methode, horizont = aufgabe
+    prognose = METHODEN[methode](_KONTEXT, origin, horizont)
+    ergebnis = bewerte(_KONTEXT, prognose, origin, horizont, VERSATZ.get(methode, 0))
+    ergebnis.insert(0, "Methode", methode)
+    ergebnis.insert(0, "Origin", origin)
+    return aufgabe, ergebnis
+
+
+def run_backtest(kontext, methoden=None, horizont=HORIZONT, max_worker=MAX_WORKER):
+    """
+    Rolling-Origin-Backtest: Ursprünge x Methoden im Prozess-Pool.
+    Jedes Ergebnis wird pro (Ursprung, Methode) gecacht – eine neue Methode
+    rechnet also nur sich selbst, alle anderen kommen aus dem Cache.
+    Der Schlüssel enthält die Daten, alle Planstände und die Parameter der Methode.
+    """
+    methoden = methoden or list(METHODEN)
+    fingerprint = daten_fingerprint(kontext["ist"], kontext["erp"], kontext["plan_versionen"], horizont)
+    schluessel = {
+        methode: f"{fingerprint}_{daten_fingerprint(methoden_parameter(methode))}_{methode}" for methode in methoden
+    }
+
+    ergebnisse = []
+    offen = []
+    for origin in ursprunge(kontext):
+        for methode in methoden:
+            gecacht = lade_cache("backtest", f"{schluessel[methode]}_{origin}")
+            if gecacht is not None:
+                ergebnisse.append(gecacht)
+            else:
+                offen.append((origin, methode, horizont))
+
+    print(f"   Aufgaben: {len(ergebnisse) + len(offen)} gesamt, {len(ergebnisse)} aus Cache, {len(offen)} zu rechnen")
+
+    if offen:
+        with ProcessPoolExecutor(max_workers=max_worker, initializer=_init_worker, initargs=(kontext,)) as pool:
+            for (origin, methode, _), ergebnis in pool.map(_rechne_aufgabe, offen):
+                speichere_cache("backtest", f"{schluessel[methode]}_{origin}", ergebnis)
+                ergebnisse.append(ergebnis)
+
+    ergebnisse = [e for e in ergebnisse if not e.empty]
+    if not ergebnisse:
+        return pd.DataFrame()
+    return pd.concat(ergebnisse, ignore_index=True).sort_values(["Origin", "Methode", "Ebene"])
+
+
+def zusammenfassung(ergebnisse):
+    """Mittelwert über alle Ursprünge: eine Zeile pro Methode und Ebene."""
+    return (
+        ergebnisse.groupby(["Methode", "Ebene"], as_index=False)
+        .agg(Ursprunge=("Origin", "nunique"), WAPE=("WAPE", "mean"), Bias=("Bias", "mean"))
+        .sort_values(["Ebene", "WAPE"])
+    )
+
+
+# ---------------------------------------------------------
+# 5. MAIN
+# ---------------------------------------------------------
+
+def main():
+    print("=== ROLLING-ORIGIN BACKTEST ===")
+    stufe2 = lade_stufe(2)
+
+    rohdaten = stufe2.load_rohdaten()
+    if rohdaten is None:
+        return
+    plan_versionen = lade_alle()
+    if plan_versionen.empty:
+        return
+
+    start = time.perf_counter()
+    kontext = baue_kontext(rohdaten, plan_versionen)
+    erster_plan = kontext["plaene"][0][0]
+    ohne_plan = [o for o in ursprunge(kontext) if o < erster_plan]
+    if ohne_plan:
+        print(f"   ⚠️ Erster Planstand {erster_plan}: 'abgeglichen' wird für {len(ohne_plan)} frühere Ursprünge nicht bewertet.")
+    ergebnisse = run_backtest(kontext)
+    if ergebnisse.empty:
+        print("❌ Keine Ursprünge mit ausreichender Historie gefunden.")
+        return
+    uebersicht = zusammenfassung(ergebnisse)
+    print(f"   ✅ Backtest fertig in {time.perf_counter() - start:.1f}s")
+    print(uebersicht.to_string(index=False))
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE_EXCEL)
+    with pd.ExcelWriter(out_path) as writer:
+        uebersicht.to_excel(writer, sheet_name="Zusammenfassung", index=False)
+        ergebnisse.to_excel(writer, sheet_name="Pro_Ursprung", index=False)
+    print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+import pandas as pd
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import argparse
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime
+
+import datengenerator
+from stufen import lade_stufe
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/benchmark"
+HISTORIE_DATEI = "historie.jsonl"
+
+SKALEN = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+BASIS_KUNDEN = 5
+BASIS_MONATE = 24
+
+# Parameter-Sweeps: eine Dimension wird vervielfacht, die anderen bleiben auf dem Basisfall
+# (Faktor 1 ist der Basisfall selbst und wird aus basis_<skala> übernommen)
+SWEEP_DIMENSIONEN = ["kunden", "artikel", "monate"]
+SWEEP_FAKTOREN = [2, 4]
+SWEEP_BASIS = "1m"             # bei 10k dauern die Stufen nur Millisekunden -> Steigungen sind Rauschen
+
+WIEDERHOLUNGEN = 1
+REGRESSION_SCHWELLE = 1.25     # langsamer als 125 % des Median der letzten Läufe -> Warnung
+REGRESSION_VERGLEICH = 5       # Anzahl früherer Läufe für den Median
+LINEAR_TOLERANZ = 1.15         # Steigung log(Zeit) ~ log(Größe) darüber gilt als überlinear
+
+# Nur diese Spalten werden von den gemessenen Funktionen gebraucht (spart Speicher bei 10M Zeilen)
+BENCH_SPALTEN = [
+    "matnr", "Baumarkt", "Baumarktartikel", "bedmo", "wavor_bstlmg",
+    "progmo", "prog_mg1", "progmo2", "prog_mg2",
+]
+
+# ---------------------------------------------------------
+# 1. FÄLLE UND DATEN
+# ---------------------------------------------------------
+
+def zeilen_je_reihe_und_monat(parameter):
+    """Erwartete Zeilen pro Artikel x Kunde x Monat (Listung, intermittierende Reihen ohne Nullmonate)."""
+    p_bedarf = 0.3   # Mittel von U(0.1, 0.5) im Generator
+    return parameter["listung"] * (1 - parameter["anteil_intermittierend"] * (1 - p_bedarf))
+
+
+def basis_fall(zeilen, kunden=BASIS_KUNDEN, monate=BASIS_MONATE):
+    """Artikelzahl so wählen, dass der Generator etwa 'zeilen' Zeilen erzeugt."""
+    dichte = zeilen_je_reihe_und_monat(datengenerator.standard_parameter())
+    artikel = max(1, round(zeilen / (kunden * monate * dichte)))
+    return {"artikel": artikel, "kunden": kunden, "monate": monate}
+
+
+def faelle(skalen, sweep_basis=None, faktoren=SWEEP_FAKTOREN):
+    """
+    Basisfälle je Skala plus Sweeps über Kunden, Artikel und Horizont um 'sweep_basis'.
+    Der Basisfall der Sweeps wird nur einmal gemessen (als basis_<skala>) und dient in
+    jeder Sweep-Dimension als Punkt mit Faktor 1.
+
+    Returns:
+        Liste von dicts: name, variante, basis, artikel, kunden, monate
+    """
+    if sweep_basis and sweep_basis not in skalen:
+        skalen = list(skalen) + [sweep_basis]
+    liste = []
+    for skala in skalen:
+        name = f"basis_{skala}"
+        liste.append({"name": name, "variante": "zeilen", "basis": name, **basis_fall(SKALEN[skala])})
+    if sweep_basis:
+        basis = basis_fall(SKALEN[sweep_basis])
+        for dimension in SWEEP_DIMENSIONEN:
+            for faktor in faktoren:
+                if faktor == 1:
+                    continue
+                fall = dict(basis)
+                fall[dimension] = basis[dimension] * faktor
+                liste.append({"name": f"{dimension}_x{faktor}_{sweep_basis}", "variante": dimension,
+                              "basis": f"basis_{sweep_basis}", **fall})
+    return liste
+
+
+def erzeuge_daten(fall, seed=42):
+    """Rohdaten (nur BENCH_SPALTEN) und BAUMARKTPROGRAMM wie von load_baumarktprogramm gelesen."""
+    parameter = datengenerator.standard_parameter(
+        artikel=fall["artikel"], kunden=fall["kunden"], monate=fall["monate"], seed=seed
+    )
+    rohdaten = pd.concat((c[BENCH_SPALTEN] for c in datengenerator.generiere(parameter)), ignore_index=True)
+    programm = datengenerator.baumarktprogramm(parameter["_plan_summen"])
+    # load_baumarktprogramm liest mit header=0 -> erste Zeile wird zur Kopfzeile
+    programm = programm.iloc[1:].reset_index(drop=True)
+    return rohdaten, programm
+
+
+# ---------------------------------------------------------
+# 2. MESSUNG
+# ---------------------------------------------------------
+
+def _zeilen(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, (tuple, list)):
+        return sum(_zeilen(o) for o in obj)
+    return 0
+
+
+def messe(name, funktion, *args, speicher=True, wiederholungen=WIEDERHOLUNGEN):
+    """
+    Führt 'funktion(*args)' aus und misst Wall-/CPU-Zeit (Minimum über die Wiederholungen).
+    Der Spitzenwert der Python-Allokationen (tracemalloc, erfasst auch numpy/pandas) kommt aus
+    einem eigenen Durchlauf danach – tracemalloc verlangsamt jede Allokation und würde sonst die Zeiten verfälschen.
+
+    Returns:
+        (Ergebnis, Messwerte als dict)
+    """
+    walls, cpus = [], []
+    peak_mb = None
+    ergebnis = None
+    for _ in range(wiederholungen):
+        t0, c0 = time.perf_counter(), time.process_time()
+        try:
+            ergebnis = funktion(*args)
+        finally:
+            walls.append(time.perf_counter() - t0)
+            cpus.append(time.process_time() - c0)
+    if speicher:
+        tracemalloc.start()
+        try:
+            funktion(*args)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024**2
+        finally:
+            tracemalloc.stop()
+    return ergebnis, {
+        "stufe": name,
+        "wall_s": round(min(walls), 6),
+        "cpu_s": round(min(cpus), 6),
+        "peak_mb": None if peak_mb is None else round(peak_mb, 1),
+        "zeilen_rein": _zeilen(list(args)),
+        "zeilen_raus": _zeilen(ergebnis),
+    }
+
+
+def _glaette_je_baumarkt(stufe1, df_baumarkt_agg):
+    """detect_and_smooth pro Baumarkt, wie in run_analysis (Schleife statt groupby.apply)."""
+    return pd.concat(
+        [stufe1.detect_and_smooth(g.copy()) for _, g in df_baumarkt_agg.groupby("Baumarkt")],
+        ignore_index=True,
+    )
+
+
+def benchmark_fall(fall, speicher=True, plots=True, wiederholungen=WIEDERHOLUNGEN):
+    """Alle Stufenfunktionen für einen Fall messen. Ausgaben der Stufen werden unterdrückt."""
+    stufe1, stufe2, stufe3, stufe4, stufe5 = (lade_stufe(n) for n in range(1, 6))
+    start = time.perf_counter()
+    rohdaten, programm = erzeuge_daten(fall)
+    erzeugung_s = time.perf_counter() - start
+
+    messungen = []
+
+    def m(name, funktion, *args):
+        ergebnis, werte = messe(name, funktion, *args, speicher=speicher, wiederholungen=wiederholungen)
+        messungen.append(werte)
+        return ergebnis
+
+    with open(os.devnull, "w") as stumm, tempfile.TemporaryDirectory() as tmp:
+        stdout, sys.stdout = sys.stdout, stumm
+        try:
+            rohdaten_agg = m("agg_Rohdaten", stufe2.agg_Rohdaten, rohdaten)
+            plan_agg = m("agg_Baumarktprogramm", stufe2.agg_Baumarktprogramm, programm)
+            data = stufe1.prepare_data(rohdaten)
+            df_baumarkt_agg, _ = m("aggregate_data", stufe1.aggregate_data, data)
+            m("detect_and_smooth", _glaette_je_baumarkt, stufe1, df_baumarkt_agg)
+            df_forecast = m("prepare_forecast", stufe3.prepare_forecast, rohdaten)
+            df_plan = stufe3.prepare_plan(plan_agg)
+            df_final = m("run_reconciliation", stufe3.run_reconciliation, df_forecast, df_plan)
+            m("check_consistency", stufe4.check_consistency, df_final, df_plan, tmp)
+            if plots:
+                # Jede Plot-Funktion einzeln, damit eine langsame Grafik sichtbar wird
+                m("plot_task_trends", stufe1.plot_task_trends, df_baumarkt_agg, tmp)
+                m("plot_task_trends_per_baumarkt", stufe1.plot_task_trends_per_baumarkt, df_baumarkt_agg, tmp, 10)
+                m("plot_vergleich_baumarkt", stufe2.plot_vergleich_baumarkt, rohdaten_agg, plan_agg, tmp)
+                stufe5.OUTPUT_DIR_PLOTS = tmp
+                df = stufe5.prepare_data(df_final)
+                m("plot_management_summary", stufe5.plot_management_summary, df)
+                m("plot_correction_heatmap", stufe5.plot_correction_heatmap, df)
+                m("plot_detail_structure", stufe5.plot_detail_structure, df)
+        finally:
+            sys.stdout = stdout
+            plt.close("all")
+
+    for werte in messungen:
+        werte.update({
+            "fall": fall["name"], "variante": fall["variante"], "basis": fall["basis"], "zeilen": len(rohdaten),
+            "artikel": fall["artikel"], "kunden": fall["kunden"], "monate": fall["monate"],
+        })
+    print(f"   ✅ {fall['name']}: {len(rohdaten):,} Zeilen (erzeugt in {erzeugung_s:.1f}s), "
+          f"Stufen gesamt {sum(w['wall_s'] for w in messungen):.1f}s")
+    return messungen
+
+
+# ---------------------------------------------------------
+# 3. HISTORIE, REGRESSIONEN, SKALIERUNG
+# ---------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def lade_historie(pfad):
+    if not os.path.exists(pfad):
+        return pd.DataFrame()
+    with open(pfad, encoding="utf-8") as f:
+        return pd.DataFrame([json.loads(z) for z in f if z.strip()])
+
+
+def speichere_historie(messungen, pfad, lauf):
+    """Hängt jede Messung als eine JSON-Zeile an (mit Lauf-ID, Commit und Versionen)."""
+    os.makedirs(os.path.dirname(pfad) or ".", exist_ok=True)
+    with open(pfad, "a", encoding="utf-8") as f:
+        for werte in messungen:
+            f.write(json.dumps({**lauf, **werte}, ensure_ascii=False) + "\n")
+
+
+def regressionen(aktuell, historie, schwelle=REGRESSION_SCHWELLE, vergleich=REGRESSION_VERGLEICH):
+    """
+    Vergleicht jede Messung mit dem Median der letzten 'vergleich' Läufe desselben Falls
+    (nur Läufe mit derselben Zeitmessung – ältere Läufe haben unter tracemalloc gemessen).
+    """
+    aktuell = pd.DataFrame(aktuell)
+    if historie.empty or aktuell.empty or "zeitmessung" not in historie.columns:
+        return pd.DataFrame()
+    frueher = historie[historie["zeitmessung"] == aktuell["zeitmessung"].iloc[0]]
+    frueher = frueher.sort_values("zeit").groupby(["fall", "stufe"]).tail(vergleich)
+    referenz = frueher.groupby(["fall", "stufe"])["wall_s"].median().rename("wall_s_referenz")
+    vergleich_df = aktuell.join(referenz, on=["fall", "stufe"]).dropna(subset=["wall_s_referenz"])
+    vergleich_df["verhaeltnis"] = vergleich_df["wall_s"] / vergleich_df["wall_s_referenz"]
+    return vergleich_df[vergleich_df["verhaeltnis"] > schwelle][
+        ["fall", "stufe", "wall_s", "wall_s_referenz", "verhaeltnis"]
+    ]
+
+
+def skalierung(messungen):
+    """
+    Steigung von log(Zeit) gegen log(Größe) je Stufe und Variante
+    (Variante 'zeilen': Basisfälle über die Skalen, sonst die Sweep-Dimension inkl. ihres Basisfalls).
+    Steigung 1 = linear, deutlich darüber = die Stufe skaliert in dieser Dimension nicht mehr linear.
+    """
+    df = pd.DataFrame(messungen)
+    zeilen = []
+    for (variante, stufe), gruppe in df.groupby(["variante", "stufe"]):
+        if variante != "zeilen":
+            basis = df[(df["fall"].isin(gruppe["basis"])) & (df["stufe"] == stufe)]
+            gruppe = pd.concat([basis, gruppe], ignore_index=True)
+        x = gruppe[variante].to_numpy(dtype=float)
+        y = gruppe["wall_s"].to_numpy(dtype=float)
+        if len(np.unique(x)) < 2 or (y <= 0).any():
+            continue
+        steigung = np.polyfit(np.log(x), np.log(y), 1)[0]
+        zeilen.append({
+            "variante": variante, "stufe": stufe, "punkte": len(x), "steigung": round(steigung, 2),
+            "bewertung": "überlinear" if steigung > LINEAR_TOLERANZ else "linear/sublinear",
+        })
+    return pd.DataFrame(zeilen)
+
+
+# ---------------------------------------------------------
+# 4. MAIN
+# ---------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark aller Pipeline-Stufen auf generierten Daten")
+    parser.add_argument("--skalen", nargs="+", choices=list(SKALEN), default=list(SKALEN))
+    parser.add_argument("--sweep", choices=list(SKALEN), default=SWEEP_BASIS,
+                        help="Basisfall für die Sweeps über Kunden/Artikel/Monate")
+    parser.add_argument("--ohne-sweep", action="store_true")
+    parser.add_argument("--faktoren", nargs="+", type=int, default=SWEEP_FAKTOREN)
+    parser.add_argument("--wiederholungen", type=int, default=WIEDERHOLUNGEN)
+    parser.add_argument("--ohne-speicher", action="store_true", help="ohne tracemalloc (reine Zeiten)")
+    parser.add_argument("--ohne-plots", action="store_true")
+    parser.add_argument("--ziel", default=OUTPUT_DIR)
+    args = parser.parse_args(argv)
+
+    liste = faelle(args.skalen, None if args.ohne_sweep else args.sweep, args.faktoren)
+    print(f"=== BENCHMARK: {len(liste)} Fälle ===")
+
+    lauf = {
+        "lauf": datetime.now().strftime("%Y%m%d_%H%M%S"),
+        "zeit": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "speicher": not args.ohne_speicher,
+        "zeitmessung": "ohne tracemalloc",
+        "plots": not args.ohne_plots,
+    }
+    messungen = []
+    for fall in liste:
+        try:
+            messungen += benchmark_fall(fall, speicher=lauf["speicher"], plots=lauf["plots"],
+                                        wiederholungen=args.wiederholungen)
+        except MemoryError:
+            print(f"   ❌ {fall['name']}: zu wenig Speicher – Fall übersprungen.")
+    if not messungen:
+        print("❌ Keine Messungen.")
+        return
+
+    pfad = os.path.join(args.ziel, HISTORIE_DATEI)
+    historie = lade_historie(pfad)
+    speichere_historie(messungen, pfad, lauf)
+    print(f"\n   ✅ Historie ergänzt: {pfad}")
+
+    pd.set_option("display.width", 200)
+    ergebnis = pd.DataFrame(messungen)
+    print("\nZeiten (s) je Fall und Stufe:")
+    print(ergebnis.pivot_table(index="stufe", columns="fall", values="wall_s", sort=False).round(3).to_string())
+
+    steigungen = skalierung(messungen)
+    if not steigungen.empty:
+        print("\nSkalierung (Steigung log-log):")
+        print(steigungen.to_string(index=False))
+        ueber = steigungen[steigungen["bewertung"] == "überlinear"]
+        for _, z in ueber.iterrows():
+            print(f"   ⚠️ {z['stufe']} skaliert überlinear in '{z['variante']}' (Steigung {z['steigung']})")
+
+    langsamer = regressionen([{**lauf, **w} for w in messungen], historie)
+    if not langsamer.empty:
+        print("\n⚠️ Mögliche Regressionen gegenüber früheren Läufen:")
+        print(langsamer.round(3).to_string(index=False))
+    elif not historie.empty:
+        print("\n✅ Keine Regression gegenüber früheren Läufen.")
+
+
+if __name__ == "__main__":
+    main()
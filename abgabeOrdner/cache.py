@@ -0,0 +1,56 @@
+import pandas as pd
+import numpy as np
+import os
+import hashlib
+import pickle
+
+# --- KONFIGURATION ---
+CACHE_DIR = "./output/cache"
+
+
+def daten_fingerprint(*objekte):
+    """
+    Kurzer Fingerabdruck über beliebige Eingaben (DataFrames, Arrays, Zahlen, Texte).
+    Ändert sich ein Wert in den Daten, ändert sich der Fingerabdruck.
+    """
+    h = hashlib.sha1()
+    for obj in objekte:
+        if isinstance(obj, pd.DataFrame):
+            h.update(str(list(obj.columns)).encode())
+            h.update(pd.util.hash_pandas_object(obj, index=False).to_numpy().tobytes())
+        elif isinstance(obj, pd.Series):
+            h.update(pd.util.hash_pandas_object(obj, index=False).to_numpy().tobytes())
+        elif isinstance(obj, np.ndarray):
+            h.update(str(obj.shape).encode())
+            h.update(np.ascontiguousarray(obj).tobytes())
+        else:
+            h.update(repr(obj).encode())
+    return h.hexdigest()[:16]
+
+
+def cache_pfad(bereich, schluessel):
+    return os.path.join(CACHE_DIR, bereich, f"{schluessel}.pkl")
+
+
+def lade_cache(bereich, schluessel):
+    """Gibt das gespeicherte Objekt zurück oder None, wenn es (noch) nicht existiert."""
+    pfad = cache_pfad(bereich, schluessel)
+    if not os.path.exists(pfad):
+        return None
+    try:
+        with open(pfad, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"   ⚠️ Cache-Datei unlesbar, wird neu berechnet: {pfad} ({e})")
+        return None
+
+
+def speichere_cache(bereich, schluessel, objekt):
+    """Schreibt atomar (erst .tmp, dann umbenennen), damit parallele Läufe nie halbe Dateien sehen."""
+    pfad = cache_pfad(bereich, schluessel)
+    os.makedirs(os.path.dirname(pfad), exist_ok=True)
+    tmp_pfad = f"{pfad}.{os.getpid()}.tmp"
+    with open(tmp_pfad, "wb") as f:
+        pickle.dump(objekt, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_pfad, pfad)
+    return pfad
@@ -0,0 +1,325 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+from datetime import datetime
+
+from stufen import lade_stufe
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/dashboard"
+OUTPUT_FILE_HTML = "dashboard.html"
+OUTPUT_FILE_JSON = "dashboard_daten.json"
+PLAN_SKALIERUNG = 1000  # Vertriebsplan in Tausend -> Stück (wie in Schritt 3)
+
+# ---------------------------------------------------------
+# 1. AGGREGATE AUFBEREITEN
+# ---------------------------------------------------------
+
+def _reihen(df, index_cols, wert_col, monate, nachkommastellen=0):
+    """
+    Pivotiert ein langes DataFrame auf die gemeinsame Monatsachse.
+    Rückgabe: {schluessel: [wert_monat_1, ...]} mit None für fehlende Monate.
+    """
+    if df.empty:
+        return {}
+    pivot = df.pivot_table(index=index_cols, columns="Monat", values=wert_col, aggfunc="sum")
+    pivot = pivot.reindex(columns=monate).round(nachkommastellen)
+    werte = pivot.to_numpy(dtype=float)
+    listen = np.where(np.isnan(werte), None, werte).tolist()
+    if nachkommastellen == 0:
+        listen = [[None if v is None else int(v) for v in zeile] for zeile in listen]
+    return dict(zip(pivot.index.tolist(), listen))
+
+
+def baue_dashboard_daten(rohdaten_agg, plan_agg, df_final):
+    """
+    Baut die kompakten Dashboard-Daten aus den Ergebnissen der Pipeline:
+    - rohdaten_agg: Ausgabe von agg_Rohdaten        (Baumarkt, Monat, Zahl)
+    - plan_agg:     Ausgabe von agg_Baumarktprogramm (Baumarkt, Monat, Zahl)
+    - df_final:     Ausgabe von run_reconciliation   (Artikel, Kunde, Gruppe, Monat, Menge, Faktor, Menge_Geglaettet)
+
+    Alle Reihen liegen spaltenweise auf einer gemeinsamen Monatsachse,
+    dadurch bleibt das JSON klein und der Browser muss nichts mehr joinen.
+    """
+    stufe3 = lade_stufe(3)
+    ist = rohdaten_agg[["Baumarkt", "Monat", "Zahl"]].copy()
+    ist["Kunde"] = stufe3.norm_kunde(ist["Baumarkt"])
+
+    plan = plan_agg[["Baumarkt", "Monat", "Zahl"]].copy()
+    plan["Kunde"] = stufe3.norm_kunde(plan["Baumarkt"])
+    plan["Zahl"] = plan["Zahl"] * PLAN_SKALIERUNG
+
+    final = df_final[["Kunde", "Gruppe", "Monat", "Menge", "Faktor", "Menge_Geglaettet"]].copy()
+    final["Kunde"] = stufe3.norm_kunde(final["Kunde"])
+    final["Gruppe"] = stufe3.norm_gruppe(final["Gruppe"])
+
+    for df in (ist, plan, final):
+        df["Monat"] = pd.to_numeric(df["Monat"], errors="coerce").fillna(0).astype(int)
+
+    monate = sorted(set(ist["Monat"]) | set(plan["Monat"]) | set(final["Monat"]))
+    monate = [m for m in monate if m > 0]
+
+    # Reconciliation-Faktor je Kunde/Monat ist pro Zeile konstant -> 'first'
+    faktoren = final.groupby(["Kunde", "Monat"], as_index=False)["Faktor"].first()
+
+    reihen_kunde = {
+        "ist": _reihen(ist, "Kunde", "Zahl", monate),
+        "plan": _reihen(plan, "Kunde", "Zahl", monate),
+        "prognose": _reihen(final, "Kunde", "Menge", monate),
+        "geglaettet": _reihen(final, "Kunde", "Menge_Geglaettet", monate),
+        "faktor": _reihen(faktoren, "Kunde", "Faktor", monate, nachkommastellen=3),
+    }
+    reihen_gruppe = {
+        "prognose": _reihen(final, ["Kunde", "Gruppe"], "Menge", monate),
+        "geglaettet": _reihen(final, ["Kunde", "Gruppe"], "Menge_Geglaettet", monate),
+    }
+
+    alle_kunden = sorted(set().union(*[r.keys() for r in reihen_kunde.values()]))
+    kunden = {}
+    for kunde in alle_kunden:
+        eintrag = {typ: reihen.get(kunde) for typ, reihen in reihen_kunde.items()}
+        eintrag["gruppen"] = {}
+        kunden[kunde] = eintrag
+
+    for typ, reihen in reihen_gruppe.items():
+        for (kunde, gruppe), werte in reihen.items():
+            kunden[kunde]["gruppen"].setdefault(gruppe, {})[typ] = werte
+
+    gesamt = {
+        "ist": _reihen(ist.assign(Ebene="Gesamt"), "Ebene", "Zahl", monate).get("Gesamt"),
+        "plan": _reihen(plan.assign(Ebene="Gesamt"), "Ebene", "Zahl", monate).get("Gesamt"),
+        "prognose": _reihen(final.assign(Ebene="Gesamt"), "Ebene", "Menge", monate).get("Gesamt"),
+        "geglaettet": _reihen(final.assign(Ebene="Gesamt"), "Ebene", "Menge_Geglaettet", monate).get("Gesamt"),
+    }
+
+    return {
+        "erstellt": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "monate": monate,
+        "gesamt": gesamt,
+        "kunden": kunden,
+    }
+
+
+def exportiere_arrow(rohdaten_agg, plan_agg, df_final, out_dir=OUTPUT_DIR):
+    """
+    Schreibt die langen Tabellen zusätzlich als Arrow/Feather (falls pyarrow installiert ist),
+    damit andere Werkzeuge die Aggregate ohne Excel lesen können.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("   ℹ️  Info: pyarrow nicht installiert – Arrow-Export übersprungen.")
+        return []
+
+    pfade = []
+    for name, df in [
+        ("agg_rohdaten", rohdaten_agg),
+        ("agg_baumarktprogramm", plan_agg),
+        ("final_forecast", df_final),
+    ]:
+        pfad = os.path.join(out_dir, f"{name}.arrow")
+        df.reset_index(drop=True).to_feather(pfad)
+        pfade.append(pfad)
+    print(f"   ✅ Arrow-Dateien gespeichert: {len(pfade)}")
+    return pfade
+
+
+# ---------------------------------------------------------
+# 2. HTML (eigenständig, ohne Server / ohne externe Bibliotheken)
+# ---------------------------------------------------------
+
+HTML_VORLAGE = """<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="utf-8">
+<title>Prognose-Dashboard</title>
+<style>
+  body { font-family: Arial, sans-serif; margin: 24px; color: #333; }
+  h1 { font-size: 22px; margin-bottom: 4px; }
+  .info { color: #888; font-size: 12px; margin-bottom: 16px; }
+  .auswahl { margin: 12px 0; }
+  select { font-size: 14px; padding: 4px; margin-right: 12px; }
+  .chart { border: 1px solid #ddd; margin-bottom: 20px; }
+  .legende span { display: inline-block; margin-right: 16px; font-size: 13px; }
+  .legende i { display: inline-block; width: 14px; height: 3px; margin-right: 4px; vertical-align: middle; }
+  table { border-collapse: collapse; font-size: 11px; }
+  td, th { border: 1px solid #eee; padding: 3px 5px; text-align: center; }
+  td.kunde { text-align: left; cursor: pointer; color: #2c6fbb; }
+</style>
+</head>
+<body>
+<h1>Prognose-Dashboard: Plan vs. Ist vs. Prognose</h1>
+<div class="info" id="info"></div>
+
+<div class="auswahl">
+  Kunde: <select id="kunde"></select>
+  Teilegruppe: <select id="gruppe"></select>
+</div>
+
+<div class="legende" id="legende"></div>
+<svg id="chart" class="chart" width="1100" height="380"></svg>
+
+<h3>Korrekturfaktoren pro Kunde (Klick = Drill-Down)</h3>
+<div id="heatmap"></div>
+
+<script>
+const DATEN = __DATEN__;
+const FARBEN = { ist: "#7f8c8d", plan: "#e67e22", prognose: "#95a5a6", geglaettet: "#2ecc71" };
+const NAMEN = { ist: "Rohdaten (Ist + Prognose)", plan: "Vertriebsplan", prognose: "Prognose (Bottom-Up)", geglaettet: "Angepasster Plan (Final)" };
+
+const selKunde = document.getElementById("kunde");
+const selGruppe = document.getElementById("gruppe");
+document.getElementById("info").textContent = "Erstellt: " + DATEN.erstellt + " | " + DATEN.monate.length + " Monate | " + Object.keys(DATEN.kunden).length + " Kunden";
+
+function option(sel, wert, text) {
+  const o = document.createElement("option"); o.value = wert; o.textContent = text; sel.appendChild(o);
+}
+
+function esc(t) {
+  return String(t).replace(/[&<>"']/g, c => ({ "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;" }[c]));
+}
+
+function fmt(v) { return v === null || v === undefined ? "-" : Math.round(v).toLocaleString("de-DE"); }
+
+function zeichne(reihen) {
+  const svg = document.getElementById("chart");
+  const B = svg.clientWidth || 1100, H = 380, R = { l: 90, r: 20, o: 20, u: 50 };
+  const monate = DATEN.monate;
+  let max = 0;
+  for (const k in reihen) for (const v of (reihen[k] || [])) if (v !== null && v > max) max = v;
+  if (max === 0) max = 1;
+  const x = i => R.l + i * (B - R.l - R.r) / Math.max(1, monate.length - 1);
+  const y = v => H - R.u - v / max * (H - R.o - R.u);
+  let s = "";
+  for (let t = 0; t <= 4; t++) {
+    const v = max * t / 4;
+    s += `<line x1="${R.l}" x2="${B - R.r}" y1="${y(v)}" y2="${y(v)}" stroke="#eee"/>`;
+    s += `<text x="${R.l - 6}" y="${y(v) + 4}" font-size="11" text-anchor="end">${fmt(v)}</text>`;
+  }
+  monate.forEach((m, i) => {
+    if (i % Math.ceil(monate.length / 24) === 0)
+      s += `<text x="${x(i)}" y="${H - R.u + 16}" font-size="10" text-anchor="end" transform="rotate(-45 ${x(i)} ${H - R.u + 16})">${String(m).slice(0, 4)}-${String(m).slice(4)}</text>`;
+  });
+  for (const typ in reihen) {
+    const werte = reihen[typ];
+    if (!werte) continue;
+    let pfad = "", offen = false;
+    werte.forEach((v, i) => {
+      if (v === null) { offen = false; return; }
+      pfad += (offen ? "L" : "M") + x(i).toFixed(1) + "," + y(v).toFixed(1);
+      offen = true;
+    });
+    s += `<path d="${pfad}" fill="none" stroke="${FARBEN[typ]}" stroke-width="2.5"/>`;
+    werte.forEach((v, i) => {
+      if (v !== null) s += `<circle cx="${x(i)}" cy="${y(v)}" r="3" fill="${FARBEN[typ]}"><title>${NAMEN[typ]} ${monate[i]}: ${fmt(v)}</title></circle>`;
+    });
+  }
+  svg.innerHTML = s;
+  document.getElementById("legende").innerHTML = Object.keys(reihen).filter(t => reihen[t])
+    .map(t => `<span><i style="background:${FARBEN[t]}"></i>${NAMEN[t]}</span>`).join("");
+}
+
+function aktualisiere() {
+  const kunde = selKunde.value, gruppe = selGruppe.value;
+  if (kunde === "__GESAMT__") { zeichne(DATEN.gesamt); return; }
+  const k = DATEN.kunden[kunde];
+  if (gruppe) { zeichne(k.gruppen[gruppe]); return; }
+  zeichne({ ist: k.ist, plan: k.plan, prognose: k.prognose, geglaettet: k.geglaettet });
+}
+
+function fuelleGruppen() {
+  selGruppe.innerHTML = "";
+  option(selGruppe, "", "(alle)");
+  const k = DATEN.kunden[selKunde.value];
+  if (k) Object.keys(k.gruppen).sort().forEach(g => option(selGruppe, g, g));
+}
+
+function heatmap() {
+  const monate = DATEN.monate;
+  let s = "<table><tr><th></th>" + monate.map(m => `<th>${m}</th>`).join("") + "</tr>";
+  for (const kunde of Object.keys(DATEN.kunden).sort()) {
+    const f = DATEN.kunden[kunde].faktor;
+    if (!f) continue;
+    s += `<tr><td class="kunde" data-kunde="${esc(kunde)}">${esc(kunde)}</td>`;
+    f.forEach(v => {
+      if (v === null) { s += "<td></td>"; return; }
+      const d = Math.max(-1, Math.min(1, v - 1));
+      const farbe = d < 0 ? `rgba(192,57,43,${-d})` : `rgba(41,128,185,${d})`;
+      s += `<td style="background:${farbe}">${v.toFixed(2)}</td>`;
+    });
+    s += "</tr>";
+  }
+  const ziel = document.getElementById("heatmap");
+  ziel.innerHTML = s + "</table>";
+  ziel.querySelectorAll("td.kunde").forEach(td => td.onclick = () => {
+    selKunde.value = td.dataset.kunde; fuelleGruppen(); aktualisiere(); window.scrollTo(0, 0);
+  });
+}
+
+option(selKunde, "__GESAMT__", "Gesamt");
+Object.keys(DATEN.kunden).sort().forEach(k => option(selKunde, k, k));
+selKunde.onchange = () => { fuelleGruppen(); aktualisiere(); };
+selGruppe.onchange = aktualisiere;
+fuelleGruppen();
+aktualisiere();
+heatmap();
+</script>
+</body>
+</html>
+"""
+
+
+def schreibe_dashboard(daten, out_dir=OUTPUT_DIR):
+    """Schreibt die JSON-Daten und die eigenständige HTML-Seite (Daten eingebettet)."""
+    os.makedirs(out_dir, exist_ok=True)
+
+    json_text = json.dumps(daten, ensure_ascii=False, separators=(",", ":"))
+    json_pfad = os.path.join(out_dir, OUTPUT_FILE_JSON)
+    with open(json_pfad, "w", encoding="utf-8") as f:
+        f.write(json_text)
+
+    # '</' escapen, damit ein Kundenname nie das <script>-Tag schließen kann
+    html = HTML_VORLAGE.replace("__DATEN__", json_text.replace("</", "<\\/"))
+    html_pfad = os.path.join(out_dir, OUTPUT_FILE_HTML)
+    with open(html_pfad, "w", encoding="utf-8") as f:
+        f.write(html)
+
+    print(f"   ✅ Dashboard gespeichert: {html_pfad} ({len(html) / 1024:,.0f} KB)")
+    return html_pfad
+
+
+# ---------------------------------------------------------
+# 3. MAIN
+# ---------------------------------------------------------
+
+def main():
+    print("=== DASHBOARD (STATISCH, OHNE SERVER) ===")
+    stufe2 = lade_stufe(2)
+    stufe3 = lade_stufe(3)
+
+    rohdaten = stufe2.load_rohdaten()
+    baumarktprogramm = stufe2.load_baumarktprogramm()
+    if rohdaten is None or baumarktprogramm is None:
+        return
+
+    rohdaten_agg = stufe2.agg_Rohdaten(rohdaten)
+    plan_agg = stufe2.agg_Baumarktprogramm(baumarktprogramm)
+
+    # Abgleich gegen genau den Plan, der oben aggregiert wurde (Rohdaten nur einmal lesen)
+    df_forecast = stufe3.prepare_forecast(rohdaten)
+    if df_forecast.empty:
+        return
+    df_plan = stufe3.prepare_plan(plan_agg)
+    df_final = stufe3.run_reconciliation(df_forecast, df_plan)
+    if df_final.empty:
+        return
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    daten = baue_dashboard_daten(rohdaten_agg, plan_agg, df_final)
+    exportiere_arrow(rohdaten_agg, plan_agg, df_final)
+    schreibe_dashboard(daten)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+import time
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/testdaten"
+CHUNK_SERIEN = 20_000           # Reihen (Artikel x Kunde) pro Schreibblock
+XLSX_MAX_ZEILEN = 1_048_575     # Excel-Grenze pro Blatt (ohne Kopfzeile)
+
+KUNDEN = ["Hornbach", "Toom", "Obi ", "Bauhaus", "Globus Baumarkt"]   # wie im BAUMARKTPROGRAMM (inkl. "Obi ")
+KUNDENNUMMERN = [81900301, 81900305, 81900307, 81900311, 81900315]
+TEILEGRUPPEN = [
+    "Terrassenplatten", "Kaminöfen", "Werkzeugmaschinen", "Lacke & Lasuren", "Bauelemente",
+    "Befestigungswinkel", "Sicherheitsausrüstung", "Lichttechnik", "Pumpen & Zubehör",
+]
+MODULGRUPPEN = ["Elektroinstallation", "Gartenbedarf", "Baustoffe", "Werkzeug", "Sanitär"]
+REGIONEN = ["Ost", "West", "Nord", "Süd"]
+LIEFERORTE = [("CZ", "Slezska Ostrava"), ("DE", "Stuttgart"), ("DE", "Leipzig"), ("PL", "Gliwice"), ("HU", "Miskolc")]
+LADEEINHEITEN = [  # (Länge, Breite, Höhe in mm, Bruttogewicht kg)
+    (400, 300, 280, 2.05), (600, 400, 280, 3.1), (600, 400, 420, 4.2), (1200, 800, 1000, 25.0),
+]
+INHALT_JE_LT = [50, 100, 250, 550, 1000]
+CT_KAPA = 76.4                  # 40-Fuß-HC-Container (m³)
+PALETTEN_ZUSCHLAG_M3 = 0.1772   # Palettenanteil je Ladeeinheit (aus Beispiel_Prognosenberechnung)
+NACHKOMMASTELLEN = 6
+
+# Fehlende Werte wie in FehlendeZeilen.txt (Anzahl), umgerechnet auf Anteile.
+# Die Zeilenzahl des damaligen Extrakts ist nicht dokumentiert -> Annahme.
+FEHLENDE_WERTE = {
+    "Baumarktartikel": 11464, "Baumarkt": 243, "progmo": 20303, "progmo2": 31190,
+    "bedmo_mg": 1506, "ct_kapa": 1749,
+}
+REFERENZ_ZEILEN = 120_000       # Annahme für die Umrechnung oben
+
+PLAN_JAHRE = [2025, 2026, 2027, 2028]
+MONATSNAMEN = ["JAN", "FEB", "MAR", "APR", "MAI", "JUN", "JUL", "AUG", "SEP", "OKT", "NOV", "DEZ"]
+PLAN_FAKTOR = 1.76              # Plan liegt im Mittel so weit über der Bottom-up-Prognose (vgl. Schritt 3)
+
+# ---------------------------------------------------------
+# 1. PARAMETER UND STAMMDATEN
+# ---------------------------------------------------------
+
+def standard_parameter(**aenderungen):
+    """Alle Stellschrauben des Generators; einzelne Werte per Schlüsselwort überschreiben."""
+    parameter = {
+        "artikel": 2_000,
+        "kunden": 5,
+        "start": 202410,            # erster Bedarfsmonat (JJJJMM)
+        "monate": 24,
+        "listung": 0.6,             # Anteil der Artikel x Kunde-Kombinationen, die gelistet sind
+        "anteil_intermittierend": 0.3,
+        "saison_staerke": 0.3,      # Amplitude der Saisonkurve (relativ zum Niveau)
+        "fehlquote": 1.0,           # Faktor auf die Fehlquoten aus FehlendeZeilen.txt (0 = keine Lücken)
+        "seed": 42,
+    }
+    unbekannt = set(aenderungen) - set(parameter)
+    if unbekannt:
+        raise ValueError(f"Unbekannte Parameter: {sorted(unbekannt)}")
+    parameter.update(aenderungen)
+    return parameter
+
+
+def _monate(start, anzahl):
+    jahr, monat = divmod(start, 100)
+    index = jahr * 12 + monat - 1 + np.arange(anzahl)
+    return (index // 12) * 100 + index % 12 + 1
+
+
+def _plus_monate(monat, n):
+    index = (monat // 100) * 12 + monat % 100 - 1 + n
+    return (index // 12) * 100 + index % 12 + 1
+
+
+def kunden_liste(anzahl):
+    namen = KUNDEN[:anzahl] + [f"Baumarkt {i + 1}" for i in range(len(KUNDEN), anzahl)]
+    nummern = KUNDENNUMMERN[:anzahl] + [81901000 + i for i in range(len(KUNDEN), anzahl)]
+    return namen, nummern
+
+
+def artikel_stammdaten(parameter, rng):
+    """Eine Zeile pro Artikel: Gruppe, Ladeeinheit, Gewicht, Lieferort, Niveau, Saisonphase."""
+    n = parameter["artikel"]
+    lt = rng.integers(0, len(LADEEINHEITEN), n)
+    ort = rng.integers(0, len(LIEFERORTE), n)
+    masse = np.array(LADEEINHEITEN)[lt]
+    gruppe = rng.integers(0, len(TEILEGRUPPEN), n)
+    return pd.DataFrame({
+        "matnr": [f"R{i:010d}" for i in rng.choice(10**10, n, replace=False)],
+        "gruppe": gruppe,
+        "modulgruppen": np.array(MODULGRUPPEN)[gruppe % len(MODULGRUPPEN)],
+        "Baumarktartikel": np.array(TEILEGRUPPEN)[gruppe],
+        "zin_lt_1_menge": rng.choice(INHALT_JE_LT, n),
+        "lt_1_laenge": masse[:, 0].astype(int), "lt_1_breite": masse[:, 1].astype(int), "lt_1_hoehe": masse[:, 2].astype(int),
+        "lt_1_bruttogew_in_kg": masse[:, 3],
+        "gew_bto_kg": np.round(rng.lognormal(-4, 1.2, n), 4),
+        "lft_land": np.array([o[0] for o in LIEFERORTE])[ort],
+        "lft_ort": np.array([o[1] for o in LIEFERORTE])[ort],
+        "ct_auslastung": np.round(rng.uniform(0.65, 0.9, n), 6),
+        # Niveau log-normal -> wenige Artikel mit sehr großen Mengen (Pareto wie in 'Top 10 Artikel')
+        "niveau": rng.lognormal(6, 1.5, n),
+        "phase": rng.uniform(0, 2 * np.pi, len(TEILEGRUPPEN))[gruppe],
+    })
+
+
+# ---------------------------------------------------------
+# 2. BEWEGUNGSDATEN (blockweise, vektorisiert)
+# ---------------------------------------------------------
+
+def _reihen_block(artikel, kunden_idx, parameter, rng, monate):
+    """Mengenmatrix (Reihen x Monate) mit Saison, leichtem Trend, Rauschen und intermittierenden Reihen."""
+    n, t = len(artikel), len(monate)
+    monat_im_jahr = monate % 100 - 1
+    saison = 1 + parameter["saison_staerke"] * np.sin(
+        2 * np.pi * monat_im_jahr[None, :] / 12 + artikel["phase"].to_numpy()[:, None]
+    )
+    trend = 1 + rng.normal(0, 0.01, n)[:, None] * np.arange(t)[None, :]
+    kunden_gewicht = (1.0 / (1 + kunden_idx))[:, None]     # erster Kunde am größten
+    mittel = artikel["niveau"].to_numpy()[:, None] * kunden_gewicht * saison * np.clip(trend, 0.2, None)
+    mengen = rng.gamma(4.0, mittel / 4.0)
+
+    intermittierend = rng.random(n) < parameter["anteil_intermittierend"]
+    p_bedarf = rng.uniform(0.1, 0.5, n)
+    bedarf = ~intermittierend[:, None] | (rng.random((n, t)) < p_bedarf[:, None])
+    return np.where(bedarf, np.round(mengen), 0.0), bedarf
+
+
+def generiere(parameter=None):
+    """
+    Erzeugt den Extrakt blockweise (Generator von DataFrames im Schema von rohdaten.xlsx).
+    Monate ohne Bedarf erzeugen keine Zeile – wie im ERP-Extrakt.
+    Zusätzlich werden die Summen je Kunde und Monat für das BAUMARKTPROGRAMM gesammelt
+    (im Dictionary parameter['_plan_summen']).
+    """
+    parameter = standard_parameter() if parameter is None else parameter
+    rng = np.random.default_rng(parameter["seed"])
+    monate = _monate(parameter["start"], parameter["monate"])
+    kunden, kundennummern = kunden_liste(parameter["kunden"])
+    artikel = artikel_stammdaten(parameter, rng)
+
+    # Gelistete Kombinationen Artikel x Kunde
+    a_idx, k_idx = np.nonzero(rng.random((len(artikel), len(kunden))) < parameter["listung"])
+    plan_summen = np.zeros((len(kunden), len(monate)))
+    parameter["_plan_summen"] = (kunden, monate, plan_summen)
+    fehl = {s: min(1.0, parameter["fehlquote"] * a / REFERENZ_ZEILEN) for s, a in FEHLENDE_WERTE.items()}
+
+    for start in range(0, len(a_idx), CHUNK_SERIEN):
+        block_a = a_idx[start:start + CHUNK_SERIEN]
+        block_k = k_idx[start:start + CHUNK_SERIEN]
+        block_artikel = artikel.iloc[block_a].reset_index(drop=True)
+        mengen, bedarf = _reihen_block(block_artikel, block_k, parameter, rng, monate)
+        np.add.at(plan_summen, block_k, mengen)
+
+        reihe, spalte = np.nonzero(bedarf & (mengen > 0))
+        df = block_artikel.iloc[reihe].reset_index(drop=True)
+        yield _baue_zeilen(df, block_k[reihe], monate[spalte], mengen[reihe, spalte].astype(np.int64),
+                           kunden, kundennummern, rng, fehl)
+
+
+def _baue_zeilen(df, kunde, bedmo, menge, kunden, kundennummern, rng, fehl):
+    """Rechnet alle abgeleiteten ERP-Spalten wie in Beispiel_Prognosenberechnung.xlsx."""
+    n = len(df)
+    zin = df["zin_lt_1_menge"].to_numpy()
+    lt_volumen = np.round(df["lt_1_laenge"] * df["lt_1_breite"] * df["lt_1_hoehe"] / 1e9, 4).to_numpy()
+    anz_lt = np.maximum(np.ceil(menge / zin), 1).astype(int)
+    anz_le = np.round(1 / rng.choice([20, 40, 80], n), 4)
+    vol_gesamt = anz_lt * lt_volumen + anz_le * PALETTEN_ZUSCHLAG_M3
+    ct_volds = CT_KAPA * df["ct_auslastung"].to_numpy()
+
+    versatz = rng.integers(2, 4, n)
+    versmo = _plus_monate(bedmo, -versatz)
+    liefermenge = np.round(menge * rng.uniform(0.85, 1.15, n))
+    prog_mg1 = liefermenge * rng.lognormal(0, 0.25, n)
+    prog_mg2 = liefermenge * rng.lognormal(0, 0.35, n)
+    progmo = _plus_monate(bedmo, 12).astype(float)
+    progmo2 = _plus_monate(bedmo, 24).astype(float)
+
+    out = pd.DataFrame({
+        "modulgruppen": df["modulgruppen"],
+        "matnr": df["matnr"],
+        "kundnr": np.asarray(kundennummern)[kunde],
+        "vkbel": rng.integers(30_000_000, 31_000_000, n),
+        "kundabl": "801X",
+        "wavor_bme": "ST",
+        "bedkw": (bedmo // 100) * 100 + np.minimum((bedmo % 100 - 1) * 52 // 12 + rng.integers(1, 5, n), 52),
+        "bedmo": bedmo,
+        "verskw": (versmo // 100) * 100 + np.minimum((versmo % 100 - 1) * 52 // 12 + rng.integers(1, 5, n), 52),
+        "versmo": versmo,
+        "wavor_bstlmg": menge,
+        "wavor_anteilpromonat": 1.0,
+        "wavor_bstlmengemonat": menge,
+        "wavor_bstlmgjahr": menge,
+        "cc_bez": np.asarray(REGIONEN)[kunde % len(REGIONEN)],
+        "vbap_bstlmg": menge,
+        "bstlmgeh": "ST",
+        "Baumarkt": np.asarray(kunden, dtype=object)[kunde],
+        "Baumarktartikel": df["Baumarktartikel"],
+        "gew_bto": df["gew_bto_kg"],
+        "geweh": "KG",
+        "gew_bto_kg": df["gew_bto_kg"],
+        "loevm": np.nan,
+        "lft_land": df["lft_land"],
+        "lft_ort": df["lft_ort"],
+        "ltm_zin_lt_kategorie": "Stapelbehälter",
+        "zin_lt_1_menge": zin,
+        "ltm_zout_lt_klasse": "Packmittel",
+        "ltm_zout_lt_kategorie": "Stapelbehälter",
+        "lt_1_bezeichnung": "Stapelbehälter Standard VDA-KLT R-Reihe",
+        "lt_1_bruttogew_in_kg": df["lt_1_bruttogew_in_kg"],
+        "lt_1_laenge": df["lt_1_laenge"],
+        "lt_1_breite": df["lt_1_breite"],
+        "lt_1_hoehe": df["lt_1_hoehe"],
+        "lt_1_me": "mm",
+        "lt_1_flaeche": np.round(df["lt_1_laenge"] * df["lt_1_breite"] / 1e6, 4),
+        "lt_1_feh": "qmm",
+        "lt_1_volumen": lt_volumen,
+        "lt_1_veh": "cM",
+        "lt_1_menge_in_lt": zin,
+        "bedmo_mg": liefermenge,
+        "progmo": progmo,
+        "prog_mg1": prog_mg1,
+        "progmo2": progmo2,
+        "kundbez_progmo2": "BBAC" + progmo2.astype(int).astype(str),
+        "prog_mg2": prog_mg2,
+        "diff_faktorjahr_wpp1": np.where(rng.random(n) < 0.3, np.round(rng.uniform(0.8, 1.2, n), 6), 0.0),
+        "diff_faktorjahr_wpp2": 0.0,
+        "anz_ps_lt1": anz_lt,
+        "anz_ps_lt1_monat": anz_lt,
+        "vol_anz_lt1": anz_lt * lt_volumen,
+        "anz_le": anz_le,
+        "vol_gesamt_lab_mg": vol_gesamt,
+        "vol_gesamt_lab_mg_monat": vol_gesamt,
+        "ct_kapa": CT_KAPA,
+        "ct_auslastung": df["ct_auslastung"],
+        "ct_volds": ct_volds,
+        "vol_anteil_ct": vol_gesamt / ct_volds,
+        "vol_anteil_ct_monat": vol_gesamt / ct_volds,
+        "verbauquote": np.round(rng.uniform(0.02, 0.2, n), 6),
+    })
+    out["prog_anz_ps1"] = out["prog_mg1"] / zin
+    out["prog_anz_ps2"] = out["prog_mg2"] / zin
+    out["prog_vol1"] = out["prog_anz_ps1"] * vol_gesamt
+    out["prog_vol2"] = out["prog_anz_ps2"] * vol_gesamt
+    out["pro_ct1"] = out["prog_vol1"] / ct_volds
+    out["pro_ct2"] = out["prog_vol2"] / ct_volds
+    # Nachkommastellen wie im ERP-Extrakt begrenzen (macht CSV/XLSX deutlich schneller und kleiner)
+    gleitkomma = out.select_dtypes("float").columns
+    out[gleitkomma] = out[gleitkomma].round(NACHKOMMASTELLEN)
+    return _luecken(out, rng, fehl)
+
+
+def _luecken(df, rng, fehl):
+    """Setzt fehlende Werte mit den Quoten aus FehlendeZeilen.txt (ct_* fehlen immer gemeinsam)."""
+    n = len(df)
+    for spalte, quote in fehl.items():
+        maske = rng.random(n) < quote
+        if spalte == "ct_kapa":
+            df.loc[maske, ["ct_kapa", "ct_auslastung", "ct_volds"]] = np.nan
+        else:
+            df.loc[maske, spalte] = np.nan
+    return df
+
+
+# ---------------------------------------------------------
+# 3. BAUMARKTPROGRAMM (gleiches Layout wie BAUMARKTPROGRAMM 2025-09.xlsx)
+# ---------------------------------------------------------
+
+def baumarktprogramm(plan_summen, rng=None):
+    """
+    Vertriebsplan in Tausend Stück je Baumarkt, Jahresblöcke mit 'Ergebnis' + 12 Monaten
+    (Spalten 3..54), zwei Kopfzeilen wie im Original. Monate außerhalb der generierten
+    Historie werden aus dem Vorjahr fortgeschrieben.
+    """
+    rng = np.random.default_rng(0) if rng is None else rng
+    kunden, monate, summen = plan_summen
+    je_monat = pd.DataFrame(summen, index=kunden, columns=monate)
+
+    kopf_jahr = [np.nan, np.nan, "Gesamtergebnis"]
+    kopf_monat = ["Baumarkt", "Baureihe", np.nan]
+    for jahr in PLAN_JAHRE:
+        kopf_jahr += [jahr] * 13
+        kopf_monat += ["Ergebnis"] + MONATSNAMEN
+
+    zeilen = [kopf_jahr, kopf_monat]
+    for kunde in kunden:
+        werte = []
+        for jahr in PLAN_JAHRE:
+            monatswerte = []
+            for m in range(1, 13):
+                monat = jahr * 100 + m
+                # Fortschreiben: gleicher Monat im nächstliegenden vorhandenen Jahr
+                kandidaten = [c for c in je_monat.columns if c % 100 == m]
+                if monat in je_monat.columns:
+                    basis = je_monat.at[kunde, monat]
+                elif kandidaten:
+                    basis = je_monat.at[kunde, min(kandidaten, key=lambda c: abs(c - monat))]
+                else:
+                    basis = 0.0
+                monatswerte.append(round(basis * PLAN_FAKTOR * rng.uniform(0.9, 1.1) / 1000))
+            werte += [sum(monatswerte)] + monatswerte
+        gesamt = sum(werte[i] for i in range(0, len(werte), 13))
+        zeilen.append([kunde, "Ergebnis", gesamt] + werte)
+    return pd.DataFrame(zeilen)
+
+
+# ---------------------------------------------------------
+# 4. SCHREIBEN (XLSX / CSV / PARQUET)
+# ---------------------------------------------------------
+
+def schreibe(chunks, pfad, format="csv"):
+    """
+    Schreibt die Blöcke nacheinander, ohne den ganzen Extrakt im Speicher zu halten.
+    - csv:     ein offener Datei-Handle, Blöcke werden angehängt
+    - parquet: pyarrow.ParquetWriter (Row Groups je Block), falls installiert
+    - xlsx:    openpyxl write_only; Excel fasst max. 1.048.576 Zeilen -> Rest wird verworfen
+
+    Returns:
+        Anzahl geschriebener Zeilen
+    """
+    zeilen = 0
+    if format == "csv":
+        with open(pfad, "w", encoding="utf-8", newline="") as datei:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(datei, header=(i == 0), index=False)
+                zeilen += len(chunk)
+                print(f"   ... {zeilen:,} Zeilen")
+        return zeilen
+
+    if format == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("❌ Fehler: pyarrow ist für Parquet nötig (pip install pyarrow).")
+            return 0
+        writer = None
+        try:
+            for chunk in chunks:
+                tabelle = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(pfad, tabelle.schema)
+                writer.write_table(tabelle.cast(writer.schema))
+                zeilen += len(chunk)
+                print(f"   ... {zeilen:,} Zeilen")
+        finally:
+            if writer is not None:
+                writer.close()
+        return zeilen
+
+    if format == "xlsx":
+        from openpyxl import Workbook
+        mappe = Workbook(write_only=True)
+        blatt = mappe.create_sheet()
+        kopf = False
+        verworfen = 0
+        for chunk in chunks:
+            if not kopf:
+                blatt.append(list(chunk.columns))
+                kopf = True
+            platz = XLSX_MAX_ZEILEN - zeilen
+            verworfen += max(0, len(chunk) - platz)
+            chunk = chunk.iloc[:max(platz, 0)]
+            chunk = chunk.astype(object).where(chunk.notna(), None)   # NaN -> leere Zelle
+            for zeile in chunk.itertuples(index=False, name=None):
+                blatt.append(zeile)
+            zeilen += len(chunk)
+            print(f"   ... {zeilen:,} Zeilen")
+        if verworfen:
+            print(f"   ⚠️ Excel-Grenze erreicht: {verworfen:,} Zeilen nicht geschrieben. Für große Extrakte csv/parquet nutzen.")
+        mappe.save(pfad)
+        return zeilen
+
+    raise ValueError(f"Unbekanntes Format: '{format}'")
+
+
+def _gemessen(chunks, zeiten):
+    """Reicht die Blöcke durch und summiert die reine Erzeugungszeit in zeiten['erzeugen']."""
+    iterator = iter(chunks)
+    while True:
+        start = time.perf_counter()
+        chunk = next(iterator, None)
+        zeiten["erzeugen"] += time.perf_counter() - start
+        if chunk is None:
+            return
+        yield chunk
+
+
+def erzeuge_datensatz(out_dir=OUTPUT_DIR, format="xlsx", **parameter):
+    """
+    Schreibt rohdaten.<format> und BAUMARKTPROGRAMM.xlsx in 'out_dir' und agg_baumarktprogramm.xlsx
+    nach 'out_dir/output' (Eingabe von Schritt 3) – direkt als Arbeitsverzeichnis für die Pipeline nutzbar.
+
+    Erzeugen und Schreiben werden getrennt gemessen: das Erzeugen schafft einige 100.000 Zeilen/s,
+    das Schreiben ist der Engpass (CSV ca. 15-20 Tsd. Zeilen/s, XLSX ca. 1 Tsd. Zeilen/s).
+    """
+    parameter = standard_parameter(**parameter)
+    os.makedirs(os.path.join(out_dir, "output"), exist_ok=True)
+    pfad = os.path.join(out_dir, f"rohdaten.{format}")
+
+    zeiten = {"erzeugen": 0.0}
+    start = time.perf_counter()
+    zeilen = schreibe(_gemessen(generiere(parameter), zeiten), pfad, format)
+    dauer = time.perf_counter() - start
+    schreiben = max(dauer - zeiten["erzeugen"], 1e-9)
+    print(f"   ✅ {zeilen:,} Zeilen in {dauer:.1f}s: {pfad}")
+    print(f"      - Erzeugen:  {zeiten['erzeugen']:.1f}s ({zeilen / max(zeiten['erzeugen'], 1e-9):,.0f} Zeilen/s)")
+    print(f"      - Schreiben: {schreiben:.1f}s ({zeilen / schreiben:,.0f} Zeilen/s, {format})")
+
+    programm = baumarktprogramm(parameter["_plan_summen"])
+    programm.to_excel(os.path.join(out_dir, "BAUMARKTPROGRAMM.xlsx"), index=False, header=False)
+
+    # Langes Format wie agg_Baumarktprogramm (Schritt 2) -> Eingabe von Schritt 3
+    lang = programm.iloc[2:].melt(id_vars=[0], value_vars=[c for c in programm.columns if c >= 3 and (c - 3) % 13],
+                                  var_name="spalte", value_name="Zahl")
+    lang["Monat"] = [PLAN_JAHRE[(c - 3) // 13] * 100 + (c - 3) % 13 for c in lang["spalte"]]
+    lang = lang.rename(columns={0: "Baumarkt"})[["Baumarkt", "Monat", "Zahl"]]
+    lang["Baumarkt"] = lang["Baumarkt"].str.strip()
+    agg_pfad = os.path.join(out_dir, "output", "agg_baumarktprogramm.xlsx")
+    lang.sort_values(["Baumarkt", "Monat"]).to_excel(agg_pfad, index=False)
+    print(f"   ✅ BAUMARKTPROGRAMM.xlsx in {out_dir}, agg_baumarktprogramm.xlsx in {os.path.dirname(agg_pfad)}")
+    return pfad, zeilen
+
+
+# ---------------------------------------------------------
+# 5. MAIN
+# ---------------------------------------------------------
+
+def main():
+    std = standard_parameter()
+    parser = argparse.ArgumentParser(description="Synthetische Rohdaten im Schema von rohdaten.xlsx")
+    parser.add_argument("--ziel", default=OUTPUT_DIR)
+    parser.add_argument("--format", choices=["xlsx", "csv", "parquet"], default="xlsx")
+    for name, wert in std.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(wert), default=wert)
+    args = parser.parse_args()
+
+    parameter = {name: getattr(args, name) for name in std}
+    print(f"=== DATENGENERATOR: {parameter['artikel']:,} Artikel x {parameter['kunden']} Kunden x {parameter['monate']} Monate ===")
+    erzeuge_datensatz(args.ziel, args.format, **parameter)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+import argparse
+import copy
+import os
+import sys
+import time
+import traceback
+
+import pandas as pd
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+import backend
+import cache
+import planversionen
+import profiling
+import snapshots
+import sql_abfragen
+import validierung
+from stufen import lade_stufe
+
+# --- KONFIGURATION ---
+STANDARD_CONFIG = {
+    "dateien": {
+        "rohdaten": "rohdaten.xlsx",
+        "baumarktprogramm": "BAUMARKTPROGRAMM.xlsx",
+        "plan_agg": "./output/agg_baumarktprogramm.xlsx",   # dorthin schreibt Stufe 2
+        "forecast_final": "./output/final/Final_Forecast_2026_2027.xlsx",
+    },
+    "ausgabe": {
+        "verzeichnis": "./output",
+        "final": "./output/final",
+        "plots": "./output/plots",
+        "cache": "./output/cache",
+        "snapshots": "./output/snapshots",
+    },
+    "backend": {
+        "name": "pandas",
+    },
+    "validierung": {
+        "aktiv": True,
+    },
+    "snapshots": {
+        "aktiv": True,
+        "plan_version": "",
+    },
+}
+CONFIG_DATEI = "erp.toml"
+STUFEN = ["stage1", "stage2", "stage3", "stage4", "stage5"]
+PLOT_STUFEN = ["stage1", "stage2", "stage5"]
+
+# ---------------------------------------------------------
+# 1. KONFIGURATION
+# ---------------------------------------------------------
+
+def lade_config(pfad=None):
+    """
+    Liest die TOML-Konfiguration und ergänzt fehlende Werte aus STANDARD_CONFIG.
+    Ohne Angabe wird 'erp.toml' im Arbeitsverzeichnis genutzt, falls vorhanden.
+    """
+    config = copy.deepcopy(STANDARD_CONFIG)
+    if pfad is None:
+        if not os.path.exists(CONFIG_DATEI):
+            return config
+        pfad = CONFIG_DATEI
+    if not os.path.exists(pfad):
+        raise FileNotFoundError(f"Konfigurationsdatei '{pfad}' nicht gefunden")
+    if tomllib is None:
+        print(f"   ⚠️ tomllib nicht verfügbar (Python < 3.11) – '{pfad}' wird ignoriert.")
+        return config
+
+    with open(pfad, "rb") as f:
+        eigene = tomllib.load(f)
+    for bereich, werte in eigene.items():
+        config.setdefault(bereich, {}).update(werte)
+    print(f"   ℹ️  Konfiguration geladen: {pfad}")
+    return config
+
+
+# ---------------------------------------------------------
+# 2. GEMEINSAME DATENSITZUNG
+# ---------------------------------------------------------
+
+class DatenSitzung:
+    """
+    Hält alle in einem Lauf geladenen bzw. berechneten Tabellen.
+    Jede Datei wird höchstens einmal gelesen; Ergebnisse einer Stufe
+    (z.B. der aggregierte Plan aus Stufe 2) werden direkt an die nächste weitergegeben.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.daten = {}
+        self.backend = backend.waehle_backend(config["backend"]["name"])
+        cache.CACHE_DIR = config["ausgabe"]["cache"]
+
+    def datei(self, name):
+        return self.config["dateien"][name]
+
+    def ausgabe(self, name, *unterordner):
+        pfad = os.path.join(self.config["ausgabe"][name], *unterordner)
+        os.makedirs(pfad, exist_ok=True)
+        return pfad
+
+    def hole(self, name, erzeuge):
+        if name not in self.daten:
+            self.daten[name] = erzeuge()
+        return self.daten[name]
+
+    def setze(self, name, wert):
+        self.daten[name] = wert
+
+    # --- Eingaben ---
+    def rohdaten(self):
+        def erzeuge():
+            df = _pruefe(lade_stufe(2).load_rohdaten(self.datei("rohdaten")), "Rohdaten")
+            if not self.config["validierung"]["aktiv"]:
+                return df
+            # Fehlerhafte Zeilen in die Quarantäne, der Lauf geht mit den übrigen weiter
+            df_ok, quarantaene, bericht = validierung.validiere(df, "rohdaten")
+            validierung.drucke_bericht(bericht[bericht["Verstoesse"] > 0])
+            if len(quarantaene):
+                print(f"   ⚠️ {len(quarantaene)} Zeilen in Quarantäne.")
+            self.setze("validierung", (bericht, quarantaene))
+            validierung.speichere(bericht, {"rohdaten": quarantaene}, self.ausgabe("verzeichnis", "validierung"))
+            return df_ok
+        return self.hole("rohdaten", erzeuge)
+
+    def baumarktprogramm(self):
+        return self.hole(
+            "baumarktprogramm",
+            lambda: _pruefe(lade_stufe(2).load_baumarktprogramm(self.datei("baumarktprogramm")), "Baumarktprogramm"),
+        )
+
+    def plan_agg(self):
+        """Aggregierter Plan: aus Stufe 2 dieses Laufs, sonst aus der Datei, sonst neu aggregiert."""
+        def erzeuge():
+            pfad = self.datei("plan_agg")
+            if os.path.exists(pfad):
+                print(f"   ℹ️  Lade aggregierten Plan aus {pfad}")
+                return pd.read_excel(pfad)
+            return lade_stufe(2).agg_Baumarktprogramm(self.baumarktprogramm())
+        return self.hole("plan_agg", erzeuge)
+
+    # --- Abgeleitete Tabellen ---
+    def forecast(self):
+        return self.hole("forecast", lambda: _pruefe(lade_stufe(3).prepare_forecast(self.rohdaten()), "Prognose"))
+
+    def plan(self):
+        return self.hole("plan", lambda: lade_stufe(3).prepare_plan(self.plan_agg()))
+
+    def final(self):
+        """Finaler Forecast: aus Stufe 3 dieses Laufs, sonst aus der Datei."""
+        def erzeuge():
+            pfad = self.datei("forecast_final")
+            if not os.path.exists(pfad):
+                raise FileNotFoundError(f"Finaler Forecast fehlt ({pfad}). Bitte erst stage3 ausführen.")
+            return pd.read_excel(pfad)
+        return self.hole("final", erzeuge)
+
+
+def _pruefe(df, name):
+    """Die Stufen melden Fehler mit None / leerem DataFrame – hier wird daraus ein Abbruch der Stufe."""
+    if df is None or (isinstance(df, pd.DataFrame) and df.empty):
+        raise RuntimeError(f"{name} konnten nicht geladen werden")
+    return df
+
+
+# ---------------------------------------------------------
+# 3. STUFEN
+# ---------------------------------------------------------
+
+def stufe_1(sitzung, schreiben=True, plots=True):
+    # Stufe 1 erzeugt ausschließlich Analyse-Plots
+    if not plots:
+        print("   ℹ️  Info: stage1 übersprungen (nur Plots, --ohne-plots gesetzt).")
+        return
+    stufe1 = lade_stufe(1)
+    data = _pruefe(stufe1.prepare_data(sitzung.rohdaten()), "Rohdaten (Stufe 1)")
+    stufe1.run_analysis(data, sitzung.ausgabe("plots", "1"))
+
+
+def stufe_2(sitzung, schreiben=True, plots=True):
+    stufe2 = lade_stufe(2)
+    rohdaten_agg = sitzung.hole("rohdaten_agg", lambda: backend.agg_rohdaten(sitzung.rohdaten(), sitzung.backend))
+    plan_agg = stufe2.agg_Baumarktprogramm(sitzung.baumarktprogramm())
+    sitzung.setze("plan_agg", plan_agg)
+    sitzung.daten.pop("plan", None)
+
+    if schreiben:
+        out_dir = sitzung.ausgabe("verzeichnis")
+        rohdaten_agg.to_excel(os.path.join(out_dir, "agg_rohdaten.xlsx"), index=False)
+        # Dieselbe Datei, die Stufe 3/4 ohne vorherige Stufe 2 lesen
+        plan_agg.to_excel(sitzung.datei("plan_agg"), index=False)
+    if plots:
+        stufe2.plot_vergleich_baumarkt(rohdaten_agg, plan_agg, out_dir=sitzung.ausgabe("plots", "2"))
+
+
+def stufe_3(sitzung, schreiben=True, plots=True):
+    stufe3 = lade_stufe(3)
+    if sitzung.config["validierung"]["aktiv"]:
+        beziehungen = validierung.pruefe_beziehungen(sitzung.rohdaten(), sitzung.plan_agg())
+        validierung.drucke_bericht(beziehungen)
+    df_final = _pruefe(backend.run_reconciliation(sitzung.forecast(), sitzung.plan(), sitzung.backend), "Abgleich")
+    sitzung.setze("final", df_final)
+    if schreiben:
+        stufe3.save_results(df_final, sitzung.ausgabe("final"))
+        if sitzung.config["snapshots"]["aktiv"]:
+            snapshots.speichere_snapshot(
+                df_final,
+                eingaben={name: sitzung.datei(name) for name in ["rohdaten", "baumarktprogramm"]},
+                plan_version=sitzung.config["snapshots"]["plan_version"]
+                or planversionen.version_aus_datei(sitzung.datei("baumarktprogramm")),
+                store=sitzung.ausgabe("snapshots"),
+            )
+
+
+def stufe_4(sitzung, schreiben=True, plots=True):
+    lade_stufe(4).check_consistency(sitzung.final(), sitzung.plan(), sitzung.ausgabe("final"))
+
+
+def stufe_5(sitzung, schreiben=True, plots=True):
+    if not plots:
+        print("   ℹ️  Info: stage5 übersprungen (nur Plots, --ohne-plots gesetzt).")
+        return
+    stufe5 = lade_stufe(5)
+    stufe5.OUTPUT_DIR_PLOTS = sitzung.ausgabe("final", "plots")
+    df = stufe5.prepare_data(sitzung.final())
+    stufe5.plot_management_summary(df)
+    stufe5.plot_correction_heatmap(df)
+    stufe5.plot_detail_structure(df)
+
+
+STUFEN_FUNKTIONEN = {
+    "stage1": stufe_1,
+    "stage2": stufe_2,
+    "stage3": stufe_3,
+    "stage4": stufe_4,
+    "stage5": stufe_5,
+}
+
+
+def fuehre_aus(sitzung, stufen, schreiben=True, plots=True):
+    """
+    Führt die Stufen nacheinander im selben Prozess aus.
+    Ein Fehler bricht nur die betroffene Stufe ab; die Rückgabe ist die Liste der fehlgeschlagenen Stufen.
+    """
+    fehlgeschlagen = []
+    for name in stufen:
+        print(f"\n{'=' * 60}\n▶ {name}\n{'=' * 60}")
+        start = time.perf_counter()
+        try:
+            STUFEN_FUNKTIONEN[name](sitzung, schreiben=schreiben, plots=plots)
+            print(f"✅ {name} fertig in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            fehlgeschlagen.append(name)
+            print(f"❌ {name} fehlgeschlagen: {e}")
+            traceback.print_exc(limit=3)
+    return fehlgeschlagen
+
+
+# ---------------------------------------------------------
+# 4. KOMMANDOZEILE
+# ---------------------------------------------------------
+
+def _stufen_auswahl(angaben, erlaubt):
+    if not angaben or "all" in angaben:
+        return list(erlaubt)
+    unbekannt = [s for s in angaben if s not in erlaubt]
+    if unbekannt:
+        raise SystemExit(f"❌ Unbekannte Stufe(n): {', '.join(unbekannt)} (erlaubt: {', '.join(erlaubt)}, all)")
+    # Immer in Pipeline-Reihenfolge, egal wie angegeben
+    return [s for s in erlaubt if s in angaben]
+
+
+def erstelle_parser():
+    parser = argparse.ArgumentParser(prog="erp", description="Prognose-Pipeline Baumarktartikel")
+    parser.add_argument("--config", help=f"TOML-Konfiguration (Standard: {CONFIG_DATEI}, falls vorhanden)")
+    parser.add_argument("--profil", action="store_true", help="Zeiten, Speicher, Zeilen und Bytes je Funktion messen")
+    parser.add_argument("--backend", choices=backend.BACKENDS, help="DataFrame-Backend für Aggregation und Abgleich")
+    befehle = parser.add_subparsers(dest="befehl", required=True)
+
+    run = befehle.add_parser("run", help="Stufen ausführen (stage1..stage5 oder all)")
+    run.add_argument("stufen", nargs="*", default=["all"])
+    run.add_argument("--ohne-plots", action="store_true", help="keine Plots erzeugen")
+
+    plot = befehle.add_parser("plot", help="nur Plots erzeugen (stage1, stage2, stage5 oder all)")
+    plot.add_argument("stufen", nargs="*", default=["all"])
+
+    sql = befehle.add_parser("sql", help="SQL über rohdaten, plan, final (oder Name einer fertigen Abfrage)")
+    sql.add_argument("abfrage", nargs="+")
+    sql.add_argument("--neu-laden", action="store_true", help="Tabellen neu einlesen, auch wenn die Dateien unverändert sind")
+    return parser
+
+
+def sql_befehl(sitzung, abfrage, neu_laden=False):
+    """
+    Öffnet die eingebettete Datenbank im Cache-Verzeichnis. Tabellen werden nur neu geladen,
+    wenn sich die Quelldatei geändert hat – sonst läuft die Abfrage ohne Excel-Zugriff.
+    """
+    con = sql_abfragen.verbinde(os.path.join(sitzung.ausgabe("cache"), "erp.sqlite"))
+    if neu_laden:
+        sql_abfragen.vergiss_quellen(con)
+    sql_abfragen.aktualisiere(con, {
+        "rohdaten": (sitzung.datei("rohdaten"), sitzung.rohdaten),
+        "plan": (sitzung.datei("plan_agg"), sitzung.plan_agg),
+        "final": (sitzung.datei("forecast_final"), sitzung.final),
+    })
+    ergebnis = sql_abfragen.fuehre_aus(con, abfrage)
+    con.close()
+    return 0 if ergebnis is not None else 1
+
+
+def main(argv=None):
+    args = erstelle_parser().parse_args(argv)
+    config = lade_config(args.config)
+    if args.backend:
+        config["backend"]["name"] = args.backend
+    sitzung = DatenSitzung(config)
+    if args.profil:
+        profiling.aktiviere()
+        for name, funktion in STUFEN_FUNKTIONEN.items():
+            STUFEN_FUNKTIONEN[name] = profiling.messe(f"erp.{name}", funktion)
+
+    if args.befehl == "sql":
+        return sql_befehl(sitzung, " ".join(args.abfrage), args.neu_laden)
+
+    start = time.perf_counter()
+    if args.befehl == "run":
+        stufen = _stufen_auswahl(args.stufen, STUFEN)
+        fehlgeschlagen = fuehre_aus(sitzung, stufen, schreiben=True, plots=not args.ohne_plots)
+    else:
+        stufen = _stufen_auswahl(args.stufen, PLOT_STUFEN)
+        fehlgeschlagen = fuehre_aus(sitzung, stufen, schreiben=False, plots=True)
+
+    if args.profil:
+        profiling.schreibe_bericht(sitzung.ausgabe("verzeichnis", "profil"), titel=" ".join(argv or sys.argv[1:]))
+
+    print(f"\n{'=' * 60}")
+    print(f"Lauf beendet in {time.perf_counter() - start:.1f}s: {len(stufen) - len(fehlgeschlagen)}/{len(stufen)} Stufen erfolgreich")
+    if fehlgeschlagen:
+        print(f"❌ Fehlgeschlagen: {', '.join(fehlgeschlagen)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
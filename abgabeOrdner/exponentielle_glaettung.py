@@ -0,0 +1,279 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+import warnings
+
+from stufen import lade_stufe
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/final"
+OUTPUT_FILE_EXCEL = "Baseline_Prognose_2026_2027.xlsx"
+HORIZONT = 24          # Monate
+SAISON_LAENGE = 12     # Monate pro Saison
+
+# Parameter-Gitter: jede Kombination wird für ALLE Reihen gleichzeitig gerechnet,
+# anschließend gewinnt pro Reihe die Kombination mit dem kleinsten Fehler.
+ALPHA_GITTER = [0.1, 0.2, 0.3, 0.5, 0.7, 0.9]
+BETA_GITTER = [0.05, 0.1, 0.2]
+GAMMA_GITTER = [0.05, 0.1, 0.3]
+
+# ---------------------------------------------------------
+# 1. HILFSFUNKTIONEN (MONATE & MATRIX)
+# ---------------------------------------------------------
+
+def monat_zu_index(monate):
+    """JJJJMM -> fortlaufender Monatsindex (Jahr * 12 + Monat - 1)."""
+    monate = np.asarray(monate, dtype=np.int64)
+    return (monate // 100) * 12 + (monate % 100) - 1
+
+
+def index_zu_monat(index):
+    """Fortlaufender Monatsindex -> JJJJMM."""
+    index = np.asarray(index, dtype=np.int64)
+    return (index // 12) * 100 + (index % 12) + 1
+
+
+def serien_matrix(df, schluessel=("matnr", "Baumarkt"), monat_col="bedmo", wert_col="bedmo_mg", aggfunc="sum"):
+    """
+    Legt alle Reihen als eine 2-D-Matrix ab (Reihen x Monate).
+    Fehlende Monate innerhalb des Zeitraums werden mit 0 gefüllt (= keine Bestellung).
+
+    Returns:
+        werte (np.ndarray), schluessel_df (pd.DataFrame), monate (np.ndarray JJJJMM)
+    """
+    schluessel = list(schluessel)
+    daten = df[schluessel + [monat_col, wert_col]].copy()
+    daten[monat_col] = pd.to_numeric(daten[monat_col], errors="coerce")
+    daten[wert_col] = pd.to_numeric(daten[wert_col], errors="coerce")
+    daten = daten.dropna(subset=schluessel + [monat_col])
+    daten[monat_col] = daten[monat_col].astype(np.int64)
+
+    agg = daten.groupby(schluessel + [monat_col], as_index=False)[wert_col].agg(aggfunc)
+
+    # agg ist nach Schlüsseln sortiert -> Reihennummer in Reihenfolge des Auftretens
+    codes = agg.groupby(schluessel, sort=False).ngroup().to_numpy()
+    schluessel_df = agg.loc[~agg.duplicated(schluessel), schluessel].reset_index(drop=True)
+
+    idx = monat_zu_index(agg[monat_col].to_numpy())
+    erster = idx.min()
+    n_monate = idx.max() - erster + 1
+
+    werte = np.zeros((len(schluessel_df), n_monate))
+    werte[codes, idx - erster] = agg[wert_col].fillna(0).to_numpy()
+    monate = index_zu_monat(np.arange(erster, erster + n_monate))
+    return werte, schluessel_df, monate
+
+
+def matrix_zu_lang(werte, schluessel_df, monate, wert_col="Menge"):
+    """Gegenstück zu serien_matrix: Matrix -> langes DataFrame (ein Eintrag pro Reihe & Monat)."""
+    n, t = werte.shape
+    lang = schluessel_df.loc[np.repeat(np.arange(n), t)].reset_index(drop=True)
+    lang["Monat"] = np.tile(np.asarray(monate), n)
+    lang[wert_col] = werte.reshape(-1)
+    return lang
+
+
+# ---------------------------------------------------------
+# 2. GLÄTTUNGS-REKURSIONEN (vektorisiert über alle Reihen)
+# ---------------------------------------------------------
+
+def _glaetten(werte_t, alpha, beta=None, gamma=None, m=SAISON_LAENGE, eval_start=1):
+    """
+    Eine Rekursion über die Zeit, vektorisiert über alle Reihen.
+    - nur alpha:            einfache exponentielle Glättung
+    - alpha + beta:         Holt (Trend)
+    - alpha + beta + gamma: Holt-Winters (additive Saison)
+    Erwartet die Matrix transponiert (Monate x Reihen), damit jeder Zeitschritt
+    auf zusammenhängendem Speicher arbeitet. Fehlende Werte (NaN) aktualisieren
+    den Zustand nicht. Der Ein-Schritt-Fehler wird direkt in der Schleife
+    aufsummiert (ab 'eval_start'), statt eine Matrix der Fits aufzubauen.
+
+    Returns:
+        mse (n,), level (n,), trend (n,), saison_t (m x n)
+    """
+    t_max, n = werte_t.shape
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        mittel = np.nan_to_num(np.nanmean(werte_t, axis=0))
+        if gamma is not None:
+            # Reihen, die erst später beginnen (z.B. nach einem Strukturbruch): Start beim Gesamtmittel
+            erste = np.nanmean(werte_t[:m], axis=0)
+            erste = np.where(np.isnan(erste), mittel, erste)
+            zweite = np.nanmean(werte_t[m:2 * m], axis=0)
+            zweite = np.where(np.isnan(zweite), erste, zweite)
+            level = erste
+            trend = (zweite - erste) / m if beta is not None else np.zeros(n)
+            saison_t = np.nan_to_num(werte_t[:m] - erste[None, :])
+            start = m
+        else:
+            level = np.where(np.isnan(werte_t[0]), mittel, werte_t[0])
+            trend = np.zeros(n)
+            saison_t = np.zeros((m, n))
+            start = 1
+
+    sse = np.zeros(n)
+    anzahl = np.zeros(n)
+    for t in range(start, t_max):
+        s = saison_t[t % m]
+        prognose = level + trend + s
+
+        y = werte_t[t]
+        fehlt = np.isnan(y)
+        if t >= eval_start:
+            fehler = np.where(fehlt, 0.0, y - prognose)
+            sse += fehler * fehler
+            anzahl += ~fehlt
+        y = np.where(fehlt, prognose, y)
+
+        level_neu = alpha * (y - s) + (1 - alpha) * (level + trend)
+        if beta is not None:
+            trend = beta * (level_neu - level) + (1 - beta) * trend
+        if gamma is not None:
+            saison_t[t % m] = gamma * (y - level_neu) + (1 - gamma) * s
+        level = level_neu
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mse = np.where(anzahl > 0, sse / anzahl, np.inf)
+    return mse, level, trend, saison_t
+
+
+def _prognose(level, trend, saison_t, t_max, horizont, m=SAISON_LAENGE):
+    """Schreibt den Endzustand über den Horizont fort (negative Mengen -> 0)."""
+    h = np.arange(1, horizont + 1)
+    saison_idx = (t_max - 1 + h) % m
+    prognose = level[:, None] + trend[:, None] * h[None, :] + saison_t[saison_idx].T
+    return np.clip(prognose, 0, None)
+
+
+def fit_methode(werte, methode, horizont=HORIZONT, m=SAISON_LAENGE, start=None):
+    """
+    Passt eine Methode ('ses', 'holt', 'hw') für alle Reihen gleichzeitig an.
+    Pro Reihe wird die beste Parameterkombination aus dem Gitter gewählt.
+
+    Returns:
+        mse (n,), prognose (n, horizont)
+    """
+    n, t_max = werte.shape
+    if methode == "hw" and t_max < 2 * m:
+        # Holt-Winters braucht mindestens zwei volle Saisons
+        return np.full(n, np.inf), np.zeros((n, horizont))
+    if start is None:
+        start = m if t_max >= 2 * m else 1
+
+    gitter = {
+        "ses": [(a, None, None) for a in ALPHA_GITTER],
+        "holt": [(a, b, None) for a in ALPHA_GITTER for b in BETA_GITTER],
+        "hw": [(a, b, g) for a in ALPHA_GITTER for b in BETA_GITTER for g in GAMMA_GITTER],
+    }[methode]
+
+    werte_t = np.ascontiguousarray(werte.T, dtype=float)
+    bester_mse = np.full(n, np.inf)
+    beste_prognose = np.zeros((n, horizont))
+    for alpha, beta, gamma in gitter:
+        mse, level, trend, saison_t = _glaetten(werte_t, alpha, beta, gamma, m, start)
+        besser = np.flatnonzero(mse < bester_mse)
+        if len(besser):
+            bester_mse[besser] = mse[besser]
+            beste_prognose[besser] = _prognose(
+                level[besser], trend[besser], saison_t[:, besser], t_max, horizont, m
+            )
+
+    return bester_mse, beste_prognose
+
+
+def prognose_matrix(werte, methoden=("ses", "holt", "hw"), horizont=HORIZONT, m=SAISON_LAENGE):
+    """
+    Rechnet alle Methoden und wählt pro Reihe die mit dem kleinsten Ein-Schritt-Fehler.
+    Alle Methoden werden auf demselben Zeitfenster bewertet, damit der Vergleich fair ist.
+
+    Returns:
+        prognose (n, horizont), gewaehlte Methode je Reihe (np.ndarray von Strings)
+    """
+    n, t_max = werte.shape
+    start = m if t_max >= 2 * m else 1
+
+    ergebnisse = {methode: fit_methode(werte, methode, horizont, m, start) for methode in methoden}
+    alle_mse = np.vstack([ergebnisse[methode][0] for methode in methoden])
+    alle_prognosen = np.stack([ergebnisse[methode][1] for methode in methoden])
+
+    beste = np.argmin(alle_mse, axis=0)
+    prognose = alle_prognosen[beste, np.arange(n)]
+    return prognose, np.asarray(methoden)[beste]
+
+
+# ---------------------------------------------------------
+# 3. BASELINE FÜR ALLE ARTIKEL x BAUMARKT
+# ---------------------------------------------------------
+
+def prognose_baseline(df_raw, horizont=HORIZONT, methoden=("ses", "holt", "hw"), wert_col="bedmo_mg", nach_bruch=True):
+    """
+    Unabhängige statistische Baseline für alle matnr x Baumarkt Reihen.
+    Mit 'nach_bruch' wird pro Reihe nur die Historie seit dem letzten Strukturbruch
+    (Umbau, Listungsänderung) verwendet, siehe strukturbrueche.py.
+    Ausgabe im selben langen Format wie die Prognose in Schritt 3 (Kunde/Gruppe wie clean_keys bereinigt):
+    ['Artikel', 'Kunde', 'Gruppe', 'Monat', 'Menge', 'Methode']
+    """
+    stufe3 = lade_stufe(3)
+    # Schlüssel vor dem Aufbau der Matrix bereinigen: 'Obi ' und 'OBI' sind dieselbe Reihe
+    df = pd.DataFrame({
+        "matnr": df_raw["matnr"],
+        "Baumarkt": stufe3.norm_kunde(df_raw["Baumarkt"]),
+        "bedmo": df_raw["bedmo"],
+        wert_col: df_raw[wert_col],
+    })
+    werte, schluessel_df, monate = serien_matrix(df, ("matnr", "Baumarkt"), "bedmo", wert_col)
+    print(f"   Serienmatrix: {werte.shape[0]:,} Reihen x {werte.shape[1]} Monate")
+    if nach_bruch:
+        from strukturbrueche import regime_matrix
+        werte = regime_matrix(werte, monate)
+        print(f"   Strukturbrüche: {np.isnan(werte[:, 0]).sum():,} Reihen nur ab letztem Bruch")
+
+    prognose, gewaehlt = prognose_matrix(werte, methoden, horizont)
+
+    letzter = monat_zu_index(monate[-1])
+    zukunft = index_zu_monat(np.arange(letzter + 1, letzter + 1 + horizont))
+
+    schluessel_df = schluessel_df.rename(columns={"matnr": "Artikel", "Baumarkt": "Kunde"})
+    schluessel_df["Methode"] = gewaehlt
+    gruppen = (
+        pd.DataFrame({"Artikel": df["matnr"], "Kunde": df["Baumarkt"], "Gruppe": df_raw["Baumarktartikel"]})
+        .dropna(subset=["Gruppe"]).drop_duplicates(["Artikel", "Kunde"])
+    )
+    schluessel_df = schluessel_df.merge(gruppen, on=["Artikel", "Kunde"], how="left")
+    schluessel_df["Gruppe"] = stufe3.norm_gruppe(schluessel_df["Gruppe"])
+    df_baseline = matrix_zu_lang(prognose, schluessel_df, zukunft, "Menge")
+    df_baseline["Menge"] = df_baseline["Menge"].round(0).astype(int)
+    return df_baseline[["Artikel", "Kunde", "Gruppe", "Monat", "Menge", "Methode"]]
+
+
+# ---------------------------------------------------------
+# 4. MAIN
+# ---------------------------------------------------------
+
+def main():
+    print("=== STATISTISCHE BASELINE (EXPONENTIELLE GLÄTTUNG) ===")
+    stufe2 = lade_stufe(2)
+    rohdaten = stufe2.load_rohdaten()
+    if rohdaten is None:
+        return
+
+    start = time.perf_counter()
+    df_baseline = prognose_baseline(rohdaten)
+    dauer = time.perf_counter() - start
+
+    print(f"   ✅ Baseline berechnet in {dauer:.1f}s: {len(df_baseline):,} Zeilen")
+    print("   Gewählte Methoden:")
+    methoden = df_baseline.drop_duplicates(["Artikel", "Kunde"])["Methode"].value_counts()
+    for methode, anzahl in methoden.items():
+        print(f"      - {methode}: {anzahl:,} Reihen")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE_EXCEL)
+    df_baseline.to_excel(out_path, index=False)
+    print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
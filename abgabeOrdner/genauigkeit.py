@@ -0,0 +1,239 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+
+from stufen import lade_stufe
+from exponentielle_glaettung import monat_zu_index
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/final"
+OUTPUT_FILE_EXCEL = "Genauigkeit_Kennzahlen.xlsx"
+
+# Hierarchie: matnr -> Baumarktartikel -> Baumarkt -> Gesamt
+# (Artikel und Teilegruppen sind immer pro Kunde zu sehen)
+EBENEN = {
+    "Artikel": ["Artikel", "Kunde"],
+    "Teilegruppe": ["Gruppe", "Kunde"],
+    "Kunde": ["Kunde"],
+    "Gesamt": [],
+}
+
+# Spaltennamen aus fistStep.py -> Rohdaten-Namen
+SPALTEN_FISTSTEP = {
+    "Artikelnummer": "matnr",
+    "Produktname": "Baumarktartikel",
+    "Kunde": "Baumarkt",
+    "Bedarfsmonat": "bedmo",
+    "Prognosemonat 1": "progmo",
+    "Prognosemonat 2": "progmo2",
+    "Tatsächliche Liefermenge": "bedmo_mg",
+    "Prognosemenge 1": "prog_mg1",
+    "Prognosemenge 2": "prog_mg2",
+}
+
+# ---------------------------------------------------------
+# 1. VERGLEICHSTABELLE (Ist vs. Prognose Jahr 1 / Jahr 2)
+# ---------------------------------------------------------
+
+def vergleichstabelle(df):
+    """
+    Stellt Ist (bedmo_mg im Bedarfsmonat) und Prognose (prog_mg1 im progmo,
+    prog_mg2 im progmo2) auf denselben Zielmonat.
+    Funktioniert mit den Rohdaten-Namen und mit den Namen aus fistStep.py.
+
+    Returns:
+        DataFrame: Artikel, Gruppe, Kunde, Monat, Horizont (1/2), Ist, Prognose
+    """
+    if "Prognosemenge 1" in df.columns:
+        df = df.rename(columns=SPALTEN_FISTSTEP)
+
+    stufe3 = lade_stufe(3)
+    basis = pd.DataFrame({
+        "Artikel": df["matnr"],
+        "Gruppe": stufe3.norm_gruppe(df["Baumarktartikel"]),
+        "Kunde": stufe3.norm_kunde(df["Baumarkt"]),
+    })
+    schluessel = ["Artikel", "Gruppe", "Kunde", "Monat"]
+
+    ist = basis.assign(Monat=pd.to_numeric(df["bedmo"], errors="coerce"), Ist=df["bedmo_mg"])
+    ist = ist.dropna(subset=["Monat"]).astype({"Monat": int})
+    ist = ist.groupby(schluessel, as_index=False)["Ist"].sum()
+    von, bis = ist["Monat"].min(), ist["Monat"].max()
+
+    teile = []
+    for horizont, (monat_col, menge_col) in enumerate([("progmo", "prog_mg1"), ("progmo2", "prog_mg2")], start=1):
+        prognose = basis.assign(Monat=pd.to_numeric(df[monat_col], errors="coerce"), Prognose=df[menge_col])
+        prognose = prognose.dropna(subset=["Monat"]).astype({"Monat": int})
+        # Nur Zielmonate, für die es Ist-Daten UND Prognosen gibt
+        prognose = prognose[(prognose["Monat"] >= von) & (prognose["Monat"] <= bis)]
+        if prognose.empty:
+            continue
+        prognose = prognose.groupby(schluessel, as_index=False)["Prognose"].sum()
+        ist_fenster = ist[(ist["Monat"] >= prognose["Monat"].min()) & (ist["Monat"] <= prognose["Monat"].max())]
+
+        teil = pd.merge(ist_fenster, prognose, on=schluessel, how="outer")
+        teil[["Ist", "Prognose"]] = teil[["Ist", "Prognose"]].fillna(0)
+        teil["Horizont"] = horizont
+        teile.append(teil)
+
+    if not teile:
+        return pd.DataFrame(columns=schluessel + ["Ist", "Prognose", "Horizont"])
+    return pd.concat(teile, ignore_index=True)
+
+
+# ---------------------------------------------------------
+# 2. KENNZAHLEN-ENGINE (ein Durchlauf über alle Ebenen)
+# ---------------------------------------------------------
+
+def kennzahlen(vergleich, ebenen=EBENEN):
+    """
+    Berechnet WAPE, MAPE, Bias, MASE und Tracking-Signal für jeden Knoten jeder Ebene
+    und jeden Horizont in einem Durchlauf:
+    1. Jede Ebene bekommt ganzzahlige Knoten-Codes (mit Versatz, damit alle Ebenen
+       in einem gemeinsamen Array liegen).
+    2. Einmal sortieren nach (Horizont, Knoten, Monat).
+    3. np.add.reduceat summiert erst auf Zellen (Knoten x Monat), dann auf Knoten.
+
+    Erwartet: Spalten aus 'ebenen', 'Monat', 'Ist', 'Prognose' und optional 'Horizont'.
+    """
+    n_zeilen = len(vergleich)
+    if n_zeilen == 0:
+        return pd.DataFrame()
+
+    codes, knoten_ebene, knoten_name = [], [], []
+    versatz = 0
+    for ebene, schluessel in ebenen.items():
+        if schluessel:
+            code = vergleich.groupby(schluessel, sort=False, dropna=False).ngroup().to_numpy()
+            namen = vergleich.loc[~vergleich.duplicated(schluessel), schluessel].astype(str)
+            namen = namen.agg(" / ".join, axis=1).tolist()
+        else:
+            code = np.zeros(n_zeilen, dtype=np.int64)
+            namen = ["Gesamt"]
+        codes.append(code + versatz)
+        knoten_ebene.extend([ebene] * len(namen))
+        knoten_name.extend(namen)
+        versatz += len(namen)
+
+    n_ebenen = len(ebenen)
+    knoten = np.concatenate(codes)
+    monat = np.tile(monat_zu_index(vergleich["Monat"].to_numpy()), n_ebenen)
+    horizont = np.tile(
+        vergleich["Horizont"].to_numpy() if "Horizont" in vergleich else np.ones(n_zeilen, dtype=int), n_ebenen
+    )
+    ist = np.tile(vergleich["Ist"].to_numpy(dtype=float), n_ebenen)
+    prognose = np.tile(vergleich["Prognose"].to_numpy(dtype=float), n_ebenen)
+
+    reihenfolge = np.lexsort((monat, knoten, horizont))
+    knoten, monat, horizont = knoten[reihenfolge], monat[reihenfolge], horizont[reihenfolge]
+    ist, prognose = ist[reihenfolge], prognose[reihenfolge]
+
+    # Zellen: (Horizont, Knoten, Monat)
+    neue_zelle = np.r_[True, (horizont[1:] != horizont[:-1]) | (knoten[1:] != knoten[:-1]) | (monat[1:] != monat[:-1])]
+    z_start = np.flatnonzero(neue_zelle)
+    z_ist = np.add.reduceat(ist, z_start)
+    z_prognose = np.add.reduceat(prognose, z_start)
+    z_knoten, z_horizont = knoten[z_start], horizont[z_start]
+
+    # Knoten: (Horizont, Knoten)
+    neuer_knoten = np.r_[True, (z_horizont[1:] != z_horizont[:-1]) | (z_knoten[1:] != z_knoten[:-1])]
+    k_start = np.flatnonzero(neuer_knoten)
+    monate = np.diff(np.r_[k_start, len(z_ist)])
+
+    fehler = z_prognose - z_ist
+    abs_fehler = np.abs(fehler)
+    mit_ist = z_ist > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ape = np.where(mit_ist, abs_fehler / z_ist, 0.0)
+    naiv = np.abs(np.diff(z_ist, prepend=z_ist[:1]))
+    naiv[neuer_knoten] = 0.0  # kein Vormonat über Knotengrenzen hinweg
+
+    summe_ist = np.add.reduceat(z_ist, k_start)
+    summe_prognose = np.add.reduceat(z_prognose, k_start)
+    summe_fehler = np.add.reduceat(fehler, k_start)
+    summe_abs = np.add.reduceat(abs_fehler, k_start)
+    summe_ape = np.add.reduceat(ape, k_start)
+    anzahl_ape = np.add.reduceat(mit_ist.astype(float), k_start)
+    summe_naiv = np.add.reduceat(naiv, k_start)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mae = summe_abs / monate
+        skala = np.where(monate > 1, summe_naiv / (monate - 1), np.nan)
+        ergebnis = pd.DataFrame({
+            "Ebene": np.asarray(knoten_ebene)[z_knoten[k_start]],
+            "Knoten": np.asarray(knoten_name, dtype=object)[z_knoten[k_start]],
+            "Horizont": z_horizont[k_start],
+            "Monate": monate,
+            "Ist": summe_ist,
+            "Prognose": summe_prognose,
+            "Fehler": summe_fehler,
+            "Abs_Fehler": summe_abs,
+            "WAPE": np.where(summe_ist > 0, summe_abs / summe_ist, np.nan),
+            "MAPE": np.where(anzahl_ape > 0, summe_ape / anzahl_ape, np.nan),
+            "Bias": np.where(summe_ist > 0, summe_fehler / summe_ist, np.nan),
+            "MASE": np.where(skala > 0, mae / skala, np.nan),
+            "Tracking_Signal": np.where(mae > 0, summe_fehler / mae, 0.0),
+        })
+
+    reihenfolge_ebenen = {ebene: i for i, ebene in enumerate(ebenen)}
+    ergebnis["_ebene"] = ergebnis["Ebene"].map(reihenfolge_ebenen)
+    return ergebnis.sort_values(["_ebene", "Horizont", "Knoten"]).drop(columns="_ebene").reset_index(drop=True)
+
+
+def ebenen_uebersicht(metriken):
+    """Gewichtete Kennzahlen pro Ebene und Horizont (Summe der Knoten)."""
+    uebersicht = metriken.groupby(["Ebene", "Horizont"], as_index=False, sort=False).agg(
+        Knoten=("Knoten", "count"),
+        Ist=("Ist", "sum"),
+        Fehler=("Fehler", "sum"),
+        Abs_Fehler=("Abs_Fehler", "sum"),
+    )
+    uebersicht["WAPE"] = uebersicht["Abs_Fehler"] / uebersicht["Ist"].where(uebersicht["Ist"] > 0)
+    uebersicht["Bias"] = uebersicht["Fehler"] / uebersicht["Ist"].where(uebersicht["Ist"] > 0)
+    return uebersicht
+
+
+def schlechteste_knoten(metriken, ebene="Kunde", kennzahl="WAPE", horizont=1, n=10):
+    """Beantwortet z.B. 'Welche Kunden haben die schlechtesten Prognosen?'."""
+    auswahl = metriken[(metriken["Ebene"] == ebene) & (metriken["Horizont"] == horizont)]
+    return auswahl.dropna(subset=[kennzahl]).nlargest(n, kennzahl)
+
+
+# ---------------------------------------------------------
+# 3. MAIN
+# ---------------------------------------------------------
+
+def main():
+    print("=== PROGNOSEGENAUIGKEIT PRO HIERARCHIEEBENE ===")
+    stufe2 = lade_stufe(2)
+    rohdaten = stufe2.load_rohdaten()
+    if rohdaten is None:
+        return
+
+    start = time.perf_counter()
+    vergleich = vergleichstabelle(rohdaten)
+    metriken = kennzahlen(vergleich)
+    print(f"   ✅ {len(metriken):,} Knoten bewertet in {time.perf_counter() - start:.2f}s")
+
+    uebersicht = ebenen_uebersicht(metriken)
+    print(uebersicht[["Ebene", "Horizont", "Knoten", "WAPE", "Bias"]].to_string(index=False))
+
+    for horizont, name in [(1, "prog_mg1"), (2, "prog_mg2")]:
+        schlecht = schlechteste_knoten(metriken, "Kunde", "WAPE", horizont, n=5)
+        if schlecht.empty:
+            continue
+        print(f"\n   Schlechteste Kunden ({name}, WAPE):")
+        for _, row in schlecht.iterrows():
+            print(f"      {row['Knoten']:25} WAPE {row['WAPE']:6.1%} | Bias {row['Bias']:+6.1%} | MASE {row['MASE']:.2f}")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE_EXCEL)
+    with pd.ExcelWriter(out_path) as writer:
+        uebersicht.to_excel(writer, sheet_name="Ebenen", index=False)
+        metriken.to_excel(writer, sheet_name="Knoten", index=False)
+    print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+
+from stufen import lade_stufe
+from exponentielle_glaettung import serien_matrix, matrix_zu_lang, monat_zu_index, index_zu_monat
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/final"
+OUTPUT_FILE_EXCEL = "Intermittierende_Prognose.xlsx"
+HORIZONT = 24
+
+# Grenzwerte nach Syntetos/Boylan
+ADI_GRENZE = 1.32
+CV2_GRENZE = 0.49
+
+ALPHA = 0.1       # Glättung von Bedarfsgröße und -intervall (Croston / SBA)
+BETA_TSB = 0.1    # Glättung der Bedarfswahrscheinlichkeit (TSB)
+
+# ---------------------------------------------------------
+# 1. KLASSIFIKATION (ADI / CV²)
+# ---------------------------------------------------------
+
+def _ab_erstem_bedarf(bedarf):
+    """
+    Erster Monat mit Bedarf und Länge der Historie ab dort (je Reihe).
+    Die gemeinsame Matrix reicht vom ältesten Monat aller Reihen – Monate vor dem
+    ersten Bedarf (Artikel noch nicht gelistet) zählen nicht als Null-Bedarf.
+    """
+    t_max = bedarf.shape[1]
+    erster = np.where(bedarf.any(axis=1), bedarf.argmax(axis=1), t_max)
+    return erster, t_max - erster
+
+
+def klassifiziere(werte):
+    """
+    Klassifiziert alle Reihen in einem Durchlauf:
+    - ADI: durchschnittlicher Abstand zwischen zwei Bedarfen (Monate ab dem ersten Bedarf / Monate mit Bedarf)
+    - CV²: quadrierter Variationskoeffizient der Bedarfsgrößen (nur Monate mit Bedarf)
+
+    Returns:
+        DataFrame mit ADI, CV2, Anteil_Null und Klasse (eine Zeile pro Reihe)
+    """
+    werte = np.nan_to_num(werte)
+    bedarf = werte > 0
+    anzahl = bedarf.sum(axis=1)
+    _, laenge = _ab_erstem_bedarf(bedarf)
+
+    summe = np.where(bedarf, werte, 0).sum(axis=1)
+    summe_qu = np.where(bedarf, werte ** 2, 0).sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        adi = np.where(anzahl > 0, laenge / anzahl, np.inf)
+        mittel = np.where(anzahl > 0, summe / anzahl, 0.0)
+        varianz = np.where(anzahl > 1, summe_qu / anzahl - mittel ** 2, 0.0)
+        cv2 = np.where(mittel > 0, np.clip(varianz, 0, None) / mittel ** 2, 0.0)
+
+    klasse = np.select(
+        [
+            anzahl == 0,
+            (adi < ADI_GRENZE) & (cv2 < CV2_GRENZE),
+            (adi < ADI_GRENZE) & (cv2 >= CV2_GRENZE),
+            (adi >= ADI_GRENZE) & (cv2 < CV2_GRENZE),
+        ],
+        ["ohne Bedarf", "glatt", "erratisch", "intermittierend"],
+        default="sporadisch",
+    )
+
+    return pd.DataFrame({
+        "ADI": adi,
+        "CV2": cv2,
+        "Anteil_Null": np.where(anzahl > 0, 1 - anzahl / np.maximum(laenge, 1), 1.0),
+        "Klasse": klasse,
+    })
+
+
+# ---------------------------------------------------------
+# 2. CROSTON / SBA / TSB (vektorisiert über alle Reihen)
+# ---------------------------------------------------------
+
+def croston(werte, methode="sba", alpha=ALPHA, beta=BETA_TSB):
+    """
+    Eine Rekursion über die Zeit für alle Reihen gleichzeitig.
+    - 'croston': Größe / Intervall
+    - 'sba':     Syntetos-Boylan-Korrektur (1 - alpha/2) * Größe / Intervall
+    - 'tsb':     Teunter-Syntetos-Babai, Wahrscheinlichkeit wird jeden Monat
+                 aktualisiert (reagiert auf auslaufende Artikel)
+
+    Returns:
+        np.ndarray (n,) – Prognose pro Monat (flach über den Horizont)
+    """
+    werte_t = np.ascontiguousarray(np.nan_to_num(werte).T)
+    t_max, n = werte_t.shape
+    bedarf_t = werte_t > 0
+    anzahl = bedarf_t.sum(axis=0)
+    erster, laenge = _ab_erstem_bedarf(bedarf_t.T)
+
+    # Start: Mittelwerte über die Historie ab dem ersten Bedarf statt nur erster Bedarf (robuster bei kurzen Reihen)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        groesse = np.where(anzahl > 0, werte_t.sum(axis=0) / anzahl, 0.0)
+        intervall = np.where(anzahl > 0, laenge / anzahl, 1.0)
+        wahrscheinlichkeit = np.where(anzahl > 0, anzahl / laenge, 0.0)
+    seit_bedarf = np.zeros(n)
+
+    for t in range(t_max):
+        y = werte_t[t]
+        hat_bedarf = bedarf_t[t]
+        seit_bedarf += 1
+
+        groesse = np.where(hat_bedarf, groesse + alpha * (y - groesse), groesse)
+        if methode == "tsb":
+            # vor dem ersten Bedarf keine Null-Beobachtungen einrechnen
+            aktiv = t >= erster
+            wahrscheinlichkeit = np.where(aktiv, wahrscheinlichkeit + beta * (hat_bedarf - wahrscheinlichkeit), wahrscheinlichkeit)
+        else:
+            # erster Bedarf hat keinen Vorgänger -> kein Intervall
+            intervall = np.where(hat_bedarf & (t > erster), intervall + alpha * (seit_bedarf - intervall), intervall)
+        seit_bedarf = np.where(hat_bedarf, 0, seit_bedarf)
+
+    if methode == "tsb":
+        return wahrscheinlichkeit * groesse
+    prognose = groesse / intervall
+    if methode == "sba":
+        prognose = (1 - alpha / 2) * prognose
+    return prognose
+
+
+# ---------------------------------------------------------
+# 3. ANWENDUNG AUF DAS LANGE FORMAT AUS SCHRITT 3
+# ---------------------------------------------------------
+
+def historie_lang(df_raw):
+    """Ist-Historie (bedmo/bedmo_mg) im langen Format von Schritt 3 (Kunde/Gruppe wie clean_keys bereinigt)."""
+    stufe3 = lade_stufe(3)
+    df = df_raw[["matnr", "Baumarkt", "Baumarktartikel", "bedmo", "bedmo_mg"]].copy()
+    df.columns = ["Artikel", "Kunde", "Gruppe", "Monat", "Menge"]
+    df["Kunde"] = stufe3.norm_kunde(df["Kunde"])
+    df["Gruppe"] = stufe3.norm_gruppe(df["Gruppe"])
+    return df
+
+
+def prognose_intermittierend(df_lang, methode="sba", horizont=HORIZONT, nur_intermittierend=True):
+    """
+    Klassifiziert alle Artikel x Kunde Reihen und prognostiziert die
+    intermittierenden/sporadischen mit Croston, SBA oder TSB.
+
+    Erwartet das lange Format aus '3-Prognoseglättung.load_data'
+    (Spalten 'Artikel', 'Kunde', 'Monat', 'Menge').
+
+    Returns:
+        klassen (eine Zeile pro Reihe), prognose (lang: Artikel, Kunde, Monat, Menge, Klasse, Methode)
+    """
+    werte, schluessel_df, monate = serien_matrix(df_lang, ("Artikel", "Kunde"), "Monat", "Menge")
+    klassen = pd.concat([schluessel_df, klassifiziere(werte)], axis=1)
+
+    auswahl = np.ones(len(klassen), dtype=bool)
+    if nur_intermittierend:
+        auswahl = klassen["Klasse"].isin(["intermittierend", "sporadisch"]).to_numpy()
+
+    pro_monat = croston(werte[auswahl], methode)
+
+    letzter = monat_zu_index(monate[-1])
+    zukunft = index_zu_monat(np.arange(letzter + 1, letzter + 1 + horizont))
+    prognose_werte = np.repeat(pro_monat[:, None], horizont, axis=1)
+
+    schluessel = klassen.loc[auswahl, ["Artikel", "Kunde", "Klasse"]].reset_index(drop=True)
+    prognose = matrix_zu_lang(prognose_werte, schluessel, zukunft, "Menge")
+    prognose["Menge"] = prognose["Menge"].round(0).astype(int)
+    prognose["Methode"] = methode
+    return klassen, prognose[["Artikel", "Kunde", "Monat", "Menge", "Klasse", "Methode"]]
+
+
+# ---------------------------------------------------------
+# 4. MAIN
+# ---------------------------------------------------------
+
+def main():
+    print("=== INTERMITTIERENDE NACHFRAGE (CROSTON / SBA / TSB) ===")
+    stufe2 = lade_stufe(2)
+    rohdaten = stufe2.load_rohdaten()
+    if rohdaten is None:
+        return
+
+    start = time.perf_counter()
+    klassen, prognose = prognose_intermittierend(historie_lang(rohdaten))
+    dauer = time.perf_counter() - start
+
+    print(f"   ✅ {len(klassen):,} Reihen klassifiziert in {dauer:.2f}s:")
+    for klasse, anzahl in klassen["Klasse"].value_counts().items():
+        print(f"      - {klasse}: {anzahl:,} Reihen")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE_EXCEL)
+    with pd.ExcelWriter(out_path) as writer:
+        prognose.to_excel(writer, sheet_name="Prognose", index=False)
+        klassen.to_excel(writer, sheet_name="Klassen", index=False)
+    print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
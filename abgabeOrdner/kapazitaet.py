@@ -0,0 +1,272 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+
+from stufen import lade_stufe
+from cache import daten_fingerprint, lade_cache, speichere_cache
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/final"
+OUTPUT_FILE_EXCEL = "Kapazitaet_2026_2027.xlsx"
+
+KAPAZITAETS_GRUPPE = "modulgruppen"   # Spalte der Rohdaten, die die Kapazitätsgruppe bildet
+HORIZONT_MONATE = [j * 100 + m for j in (2026, 2027) for m in range(1, 13)]
+
+# Container pro Monat je Kapazitätsgruppe (Kapazität = ct_kapa * Anzahl), z.B. {"Modul A": 4}.
+# Pflichtangabe: fehlt eine Gruppe hier oder ihr ct_kapa in den Rohdaten, bricht die Rechnung ab.
+CONTAINER_PRO_MONAT = {}
+UEBERLAST_GRENZE = 1.0
+
+# ---------------------------------------------------------
+# 1. STAMMDATEN (pro Artikel x Kunde)
+# ---------------------------------------------------------
+
+def stammdaten(df_raw, spalten, gruppe_col=None):
+    """
+    Ein Datensatz pro Artikel x Kunde mit den angegebenen Stammdatenspalten
+    (Zahlen: Median über die Historie, Texte: häufigster Wert).
+    Schlüssel werden wie in Schritt 3 (norm_kunde / norm_gruppe) bereinigt, damit der Join
+    auf die abgeglichene Prognose passt; ohne Gruppe -> OHNE_GRUPPE.
+    """
+    stufe3 = lade_stufe(3)
+    cols = ["matnr", "Baumarkt"] + ([gruppe_col] if gruppe_col else []) + list(spalten)
+    df = df_raw[cols].rename(columns={"matnr": "Artikel", "Baumarkt": "Kunde"})
+    df["Kunde"] = stufe3.norm_kunde(df["Kunde"])
+    if gruppe_col:
+        df[gruppe_col] = stufe3.norm_gruppe(df[gruppe_col])
+
+    zahlen = [c for c in df.columns[2:] if pd.api.types.is_numeric_dtype(df[c])]
+    texte = [c for c in df.columns[2:] if c not in zahlen]
+    gruppiert = df.groupby(["Artikel", "Kunde"], sort=False)
+    teile = [gruppiert[zahlen].median()] if zahlen else []
+    if texte:
+        teile.append(gruppiert[texte].agg(lambda s: s.mode().iat[0] if s.notna().any() else np.nan))
+    return pd.concat(teile, axis=1).reset_index()
+
+
+def kapazitaets_stammdaten(df_raw, gruppe_col=KAPAZITAETS_GRUPPE):
+    """
+    Volumen pro Stück wie in der ERP-Rechnung (prog_vol = Menge / zin_lt_1_menge * vol_gesamt_lab_mg)
+    und die Containerwerte ct_kapa / ct_auslastung je Kapazitätsgruppe.
+    """
+    stamm = stammdaten(df_raw, ["vol_gesamt_lab_mg", "zin_lt_1_menge", "ct_kapa", "ct_auslastung"], gruppe_col)
+    stamm = stamm.rename(columns={gruppe_col: "Kapazitaetsgruppe"})
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stamm["Vol_pro_Stueck"] = np.where(
+            stamm["zin_lt_1_menge"] > 0, stamm["vol_gesamt_lab_mg"] / stamm["zin_lt_1_menge"], 0.0
+        )
+    stamm["Vol_pro_Stueck"] = stamm["Vol_pro_Stueck"].fillna(0.0)
+    return stamm
+
+
+# ---------------------------------------------------------
+# 2. MATRIZEN (Inzidenz Gruppe x Artikel/Kunde, Menge Artikel/Kunde x Monat)
+# ---------------------------------------------------------
+
+def _sparse():
+    try:
+        from scipy import sparse
+        return sparse
+    except ImportError:
+        return None
+
+
+def inzidenzmatrix(stamm):
+    """
+    Gruppen x (Artikel, Kunde), Eintrag = m³ pro Stück.
+    Mit scipy als CSR-Matrix, sonst dicht (gleiche Rechenregeln).
+
+    Returns:
+        dict mit 'matrix', 'gruppen', 'schluessel' (Index Artikel/Kunde -> Spalte)
+    """
+    gruppen, gruppe_idx = np.unique(stamm["Kapazitaetsgruppe"].astype(str), return_inverse=True)
+    n_schluessel = len(stamm)
+    werte = stamm["Vol_pro_Stueck"].to_numpy(dtype=float)
+
+    sparse = _sparse()
+    if sparse is not None:
+        matrix = sparse.csr_matrix((werte, (gruppe_idx, np.arange(n_schluessel))), shape=(len(gruppen), n_schluessel))
+    else:
+        matrix = np.zeros((len(gruppen), n_schluessel))
+        matrix[gruppe_idx, np.arange(n_schluessel)] = werte
+
+    schluessel = pd.MultiIndex.from_frame(stamm[["Artikel", "Kunde"]])
+    return {"matrix": matrix, "gruppen": gruppen, "schluessel": schluessel}
+
+
+def mengenmatrix(df_final, schluessel, monate, mengen_col="Menge_Geglaettet"):
+    """
+    (Artikel, Kunde) x Monat aus der abgeglichenen Prognose.
+    Zeilen ohne Stammdaten fallen heraus (werden gezählt).
+
+    Returns:
+        matrix (n_schluessel x n_monate), Anzahl Zeilen ohne Stammdaten
+    """
+    df = df_final[df_final["Monat"].isin(monate)]
+    zeile = schluessel.get_indexer(pd.MultiIndex.from_frame(df[["Artikel", "Kunde"]]))
+    spalte = np.searchsorted(monate, df["Monat"].to_numpy())
+    gefunden = zeile >= 0
+    mengen = df[mengen_col].to_numpy(dtype=float)[gefunden]
+
+    sparse = _sparse()
+    if sparse is not None:
+        # Doppelte Einträge werden beim Umwandeln aufsummiert
+        matrix = sparse.coo_matrix(
+            (mengen, (zeile[gefunden], spalte[gefunden])), shape=(len(schluessel), len(monate))
+        ).tocsr()
+    else:
+        matrix = np.zeros((len(schluessel), len(monate)))
+        np.add.at(matrix, (zeile[gefunden], spalte[gefunden]), mengen)
+    return matrix, int((~gefunden).sum())
+
+
+def _dicht(matrix):
+    return matrix.toarray() if hasattr(matrix, "toarray") else np.asarray(matrix)
+
+
+# ---------------------------------------------------------
+# 3. AUSLASTUNG
+# ---------------------------------------------------------
+
+def lade_inzidenz(df_raw, gruppe_col=KAPAZITAETS_GRUPPE, container_pro_monat=None):
+    """
+    Stammdaten, Inzidenzmatrix und Kapazität je Gruppe – aus dem Cache, solange sich die
+    Rohdaten und die Containerangaben nicht ändern. Nach einer Planänderung bleibt nur das
+    Matrixprodukt zu rechnen.
+    """
+    container_pro_monat = CONTAINER_PRO_MONAT if container_pro_monat is None else container_pro_monat
+    spalten = ["matnr", "Baumarkt", gruppe_col, "vol_gesamt_lab_mg", "zin_lt_1_menge", "ct_kapa", "ct_auslastung"]
+    fingerprint = daten_fingerprint(df_raw[spalten], gruppe_col, sorted(container_pro_monat.items()))
+    inzidenz = lade_cache("kapazitaet", fingerprint)
+    if inzidenz is not None:
+        print(f"   ℹ️  Kapazitäts-Stammdaten aus Cache geladen ({fingerprint}).")
+        return inzidenz
+
+    stamm = kapazitaets_stammdaten(df_raw, gruppe_col)
+    inzidenz = inzidenzmatrix(stamm)
+    inzidenz["kapazitaet"] = kapazitaet_je_gruppe(stamm, inzidenz, container_pro_monat)
+    speichere_cache("kapazitaet", fingerprint, inzidenz)
+    return inzidenz
+
+
+def kapazitaet_je_gruppe(stamm, inzidenz, container_pro_monat=None):
+    """
+    Containerkapazität je Gruppe und Monat: ct_kapa (m³) und geplante Füllung ct_auslastung
+    aus den Rohdaten, Anzahl Container aus CONTAINER_PRO_MONAT.
+    Fehlt für eine Gruppe die Containeranzahl oder ct_kapa, gibt es keine Ersatzannahme:
+    ValueError mit allen betroffenen Gruppen.
+    """
+    container_pro_monat = CONTAINER_PRO_MONAT if container_pro_monat is None else container_pro_monat
+    gruppen = inzidenz["gruppen"]
+    je_gruppe = stamm.groupby("Kapazitaetsgruppe")[["ct_kapa", "ct_auslastung"]].median().reindex(gruppen)
+    ct_kapa = je_gruppe["ct_kapa"].to_numpy()
+    ct_auslastung = je_gruppe["ct_auslastung"].fillna(1.0).to_numpy()
+
+    ohne_container = [g for g in gruppen if g not in container_pro_monat]
+    ohne_kapa = [g for g, k in zip(gruppen, ct_kapa) if not k > 0]
+    fehler = []
+    if ohne_container:
+        fehler.append(f"keine Containeranzahl in CONTAINER_PRO_MONAT für {ohne_container}")
+    if ohne_kapa:
+        fehler.append(f"kein ct_kapa in den Rohdaten für {ohne_kapa}")
+    if fehler:
+        raise ValueError("Kapazität nicht bestimmbar: " + "; ".join(fehler))
+    container = np.array([container_pro_monat[g] for g in gruppen], dtype=float)
+
+    return pd.DataFrame({
+        "Kapazitaetsgruppe": gruppen,
+        "ct_kapa": ct_kapa,
+        "ct_auslastung": ct_auslastung,
+        "Container_pro_Monat": container,
+        "Kapazitaet_m3": ct_kapa * container,
+    })
+
+
+def kapazitaetslast(df_final, inzidenz, monate=HORIZONT_MONATE):
+    """
+    Volumen je Kapazitätsgruppe und Monat = Inzidenz (Gruppe x Artikel) @ Mengen (Artikel x Monat).
+
+    Returns:
+        DataFrame: Kapazitaetsgruppe, Monat, Volumen_m3, Container, Kapazitaet_m3,
+        Auslastung, Plan_Auslastung, Ueber_Plan, Ueberlast
+    """
+    monate = np.asarray(sorted(monate))
+    mengen, ohne_stamm = mengenmatrix(df_final, inzidenz["schluessel"], monate)
+    if ohne_stamm:
+        print(f"   ⚠️ {ohne_stamm} Prognosezeilen ohne Stammdaten (nicht in der Kapazität enthalten).")
+    volumen = _dicht(inzidenz["matrix"] @ mengen)
+
+    kap = inzidenz["kapazitaet"]
+    n_gruppen = len(inzidenz["gruppen"])
+    df = pd.DataFrame({
+        "Kapazitaetsgruppe": np.repeat(inzidenz["gruppen"], len(monate)),
+        "Monat": np.tile(monate, n_gruppen),
+        "Volumen_m3": volumen.reshape(-1),
+    })
+    kap_m3 = np.repeat(kap["Kapazitaet_m3"].to_numpy(), len(monate))
+    ct_volds = np.repeat((kap["ct_kapa"] * kap["ct_auslastung"]).to_numpy(), len(monate))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["Container"] = np.where(ct_volds > 0, df["Volumen_m3"] / ct_volds, 0.0)
+        df["Auslastung"] = np.where(kap_m3 > 0, df["Volumen_m3"] / kap_m3, 0.0)
+    df["Kapazitaet_m3"] = kap_m3
+    df["Plan_Auslastung"] = np.repeat(kap["ct_auslastung"].to_numpy(), len(monate))
+    df["Ueber_Plan"] = df["Auslastung"] > df["Plan_Auslastung"]
+    df["Ueberlast"] = df["Auslastung"] > UEBERLAST_GRENZE
+    return df
+
+
+# ---------------------------------------------------------
+# 4. MAIN
+# ---------------------------------------------------------
+
+def main():
+    print("=== KAPAZITÄTSAUSLASTUNG 2026-2027 ===")
+    stufe2 = lade_stufe(2)
+    stufe3 = lade_stufe(3)
+
+    rohdaten = stufe2.load_rohdaten()
+    if rohdaten is None:
+        return
+    if not os.path.exists(stufe3.INPUT_FILE_PLAN):
+        print(f"❌ Fehler: {stufe3.INPUT_FILE_PLAN} fehlt.")
+        return
+    # Rohdaten nur einmal lesen: Prognose direkt aus den geladenen Zeilen
+    df_forecast = stufe3.prepare_forecast(rohdaten)
+    df_plan = stufe3.prepare_plan(pd.read_excel(stufe3.INPUT_FILE_PLAN))
+    if df_forecast.empty or df_plan.empty:
+        return
+    df_final = stufe3.run_reconciliation(df_forecast, df_plan)
+    if df_final.empty:
+        return
+
+    start = time.perf_counter()
+    try:
+        inzidenz = lade_inzidenz(rohdaten)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    last = kapazitaetslast(df_final, inzidenz)
+    print(f"   ✅ Auslastung berechnet in {time.perf_counter() - start:.2f}s "
+          f"({len(inzidenz['gruppen'])} Gruppen x {last['Monat'].nunique()} Monate)")
+
+    ueberlast = last[last["Ueberlast"]]
+    if ueberlast.empty:
+        print("   ✅ Kein Monat über der Kapazität.")
+    else:
+        print(f"   ⚠️ {len(ueberlast)} Überlast-Monate:")
+        for _, row in ueberlast.sort_values("Auslastung", ascending=False).head(10).iterrows():
+            print(f"      {row['Kapazitaetsgruppe']:25} {row['Monat']}: {row['Auslastung']:.0%}")
+
+    matrix = last.pivot(index="Kapazitaetsgruppe", columns="Monat", values="Auslastung")
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE_EXCEL)
+    with pd.ExcelWriter(out_path) as writer:
+        matrix.to_excel(writer, sheet_name="Auslastung")
+        last.to_excel(writer, sheet_name="Details", index=False)
+        inzidenz["kapazitaet"].to_excel(writer, sheet_name="Kapazitaet", index=False)
+    print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
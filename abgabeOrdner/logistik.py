@@ -0,0 +1,145 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+
+from stufen import lade_stufe
+from kapazitaet import stammdaten, HORIZONT_MONATE
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/final"
+OUTPUT_FILE_EXCEL = "Logistik_2026_2027.xlsx"
+
+# Europalette 1200 x 800, Ladehöhe ca. 1 m
+PALETTE_VOLUMEN_M3 = 1.2 * 0.8 * 1.0
+PALETTE_FUELLGRAD = 0.85
+PALETTE_MAX_KG = 1000
+
+# Sattelzug (Standard-Auflieger)
+LKW_PALETTEN = 33
+LKW_MAX_KG = 24000
+
+LOGISTIK_SPALTEN = ["zin_lt_1_menge", "gew_bto_kg", "lt_1_bruttogew_in_kg", "lt_1_volumen"]
+
+# ---------------------------------------------------------
+# 1. LOOKUP-TABELLEN
+# ---------------------------------------------------------
+
+def lieferort_anteile(df_raw):
+    """
+    Anteil jedes Lieferorts an der bisherigen Bestellmenge pro Artikel x Kunde.
+    Liefert ein Artikel aus mehreren Orten, wird die Prognose in diesem Verhältnis aufgeteilt.
+    """
+    df = df_raw[["matnr", "Baumarkt", "lft_land", "lft_ort", "wavor_bstlmg"]].rename(
+        columns={"matnr": "Artikel", "Baumarkt": "Kunde"}
+    )
+    df["Kunde"] = lade_stufe(3).norm_kunde(df["Kunde"])
+    df[["lft_land", "lft_ort"]] = df[["lft_land", "lft_ort"]].fillna("Unbekannt")
+
+    mengen = df.groupby(["Artikel", "Kunde", "lft_land", "lft_ort"], as_index=False)["wavor_bstlmg"].sum()
+    summe = mengen.groupby(["Artikel", "Kunde"])["wavor_bstlmg"].transform("sum")
+    anzahl = mengen.groupby(["Artikel", "Kunde"])["wavor_bstlmg"].transform("size")
+    # Ohne Bestellmenge: gleichmäßig auf die bekannten Orte verteilen
+    mengen["Anteil"] = np.where(summe > 0, mengen["wavor_bstlmg"] / summe.where(summe > 0, 1), 1 / anzahl)
+    return mengen.drop(columns="wavor_bstlmg")
+
+
+# ---------------------------------------------------------
+# 2. UMRECHNUNG STÜCK -> LADEEINHEITEN / KG / M³
+# ---------------------------------------------------------
+
+def logistik_positionen(df_final, df_raw, monate=HORIZONT_MONATE, mengen_col="Menge_Geglaettet"):
+    """
+    Rechnet die abgeglichene Prognose pro Artikel, Kunde, Lieferort und Monat um:
+    - Ladeeinheiten (LT) = ceil(Menge / zin_lt_1_menge)
+    - Gewicht (kg)       = Menge * gew_bto_kg + LT * lt_1_bruttogew_in_kg
+    - Volumen (m³)       = LT * lt_1_volumen
+    """
+    df = df_final.loc[df_final["Monat"].isin(monate), ["Artikel", "Kunde", "Monat", mengen_col]]
+    df = df.groupby(["Artikel", "Kunde", "Monat"], as_index=False)[mengen_col].sum()
+
+    stamm = stammdaten(df_raw, LOGISTIK_SPALTEN)
+    df = df.merge(stamm, on=["Artikel", "Kunde"], how="left")
+    ohne_stamm = df["zin_lt_1_menge"].isna().sum()
+    if ohne_stamm:
+        print(f"   ⚠️ {ohne_stamm} Prognosezeilen ohne Logistik-Stammdaten (Werte = 0).")
+
+    df = df.merge(lieferort_anteile(df_raw), on=["Artikel", "Kunde"], how="left")
+    df[["lft_land", "lft_ort"]] = df[["lft_land", "lft_ort"]].fillna("Unbekannt")
+    df["Anteil"] = df["Anteil"].fillna(1.0)
+
+    menge = df[mengen_col].to_numpy(dtype=float) * df["Anteil"].to_numpy()
+    zin = df["zin_lt_1_menge"].to_numpy(dtype=float)
+    ladeeinheiten = np.where(zin > 0, np.ceil(menge / np.where(zin > 0, zin, 1)), 0.0)
+
+    df["Menge"] = menge
+    df["Ladeeinheiten"] = ladeeinheiten
+    df["Gewicht_kg"] = np.nan_to_num(menge * df["gew_bto_kg"].to_numpy(dtype=float)) + np.nan_to_num(
+        ladeeinheiten * df["lt_1_bruttogew_in_kg"].to_numpy(dtype=float)
+    )
+    df["Volumen_m3"] = np.nan_to_num(ladeeinheiten * df["lt_1_volumen"].to_numpy(dtype=float))
+    return df[["Artikel", "Kunde", "lft_land", "lft_ort", "Monat", "Menge", "Ladeeinheiten", "Gewicht_kg", "Volumen_m3"]]
+
+
+def versandplanung(positionen):
+    """
+    Summiert pro Lieferort und Monat und rechnet Paletten und LKW:
+    - Paletten nach Volumen bzw. Gewicht (der größere Wert zählt)
+    - LKW nach Stellplätzen bzw. Nutzlast
+    """
+    df = positionen.groupby(["lft_land", "lft_ort", "Monat"], as_index=False)[
+        ["Menge", "Ladeeinheiten", "Gewicht_kg", "Volumen_m3"]
+    ].sum()
+
+    paletten_vol = df["Volumen_m3"] / (PALETTE_VOLUMEN_M3 * PALETTE_FUELLGRAD)
+    paletten_kg = df["Gewicht_kg"] / PALETTE_MAX_KG
+    df["Paletten"] = np.ceil(np.maximum(paletten_vol, paletten_kg)).astype(int)
+    df["LKW"] = np.ceil(np.maximum(df["Paletten"] / LKW_PALETTEN, df["Gewicht_kg"] / LKW_MAX_KG)).astype(int)
+    return df
+
+
+# ---------------------------------------------------------
+# 3. MAIN
+# ---------------------------------------------------------
+
+def main():
+    print("=== LOGISTIKPLANUNG 2026-2027 (LT / KG / M³ / LKW) ===")
+    stufe2 = lade_stufe(2)
+    stufe3 = lade_stufe(3)
+
+    rohdaten = stufe2.load_rohdaten()
+    if rohdaten is None:
+        return
+    if not os.path.exists(stufe3.INPUT_FILE_PLAN):
+        print(f"❌ Fehler: {stufe3.INPUT_FILE_PLAN} fehlt.")
+        return
+    # Rohdaten nur einmal lesen: Prognose direkt aus den geladenen Zeilen
+    df_forecast = stufe3.prepare_forecast(rohdaten)
+    df_plan = stufe3.prepare_plan(pd.read_excel(stufe3.INPUT_FILE_PLAN))
+    if df_forecast.empty or df_plan.empty:
+        return
+    df_final = stufe3.run_reconciliation(df_forecast, df_plan)
+    if df_final.empty:
+        return
+
+    start = time.perf_counter()
+    positionen = logistik_positionen(df_final, rohdaten)
+    versand = versandplanung(positionen)
+    print(f"   ✅ Logistik berechnet in {time.perf_counter() - start:.2f}s: "
+          f"{versand['lft_ort'].nunique()} Lieferorte x {versand['Monat'].nunique()} Monate")
+
+    jahre = versand.assign(Jahr=versand["Monat"] // 100).groupby("Jahr")[["Paletten", "LKW", "Gewicht_kg", "Volumen_m3"]].sum()
+    for jahr, row in jahre.iterrows():
+        print(f"      {jahr}: {row['Paletten']:,.0f} Paletten | {row['LKW']:,.0f} LKW | "
+              f"{row['Gewicht_kg'] / 1000:,.1f} t | {row['Volumen_m3']:,.1f} m³")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE_EXCEL)
+    with pd.ExcelWriter(out_path) as writer:
+        versand.to_excel(writer, sheet_name="Versand", index=False)
+        positionen.to_excel(writer, sheet_name="Positionen", index=False)
+    print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
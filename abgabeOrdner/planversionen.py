@@ -0,0 +1,223 @@
+import pandas as pd
+import numpy as np
+import os
+import re
+import sys
+import glob
+import time
+import hashlib
+from datetime import datetime
+
+from stufen import lade_stufe
+from cache import lade_cache, speichere_cache
+
+# --- KONFIGURATION ---
+PLAN_MUSTER = "BAUMARKTPROGRAMM*.xlsx"
+OUTPUT_DIR = "./output/final"
+OUTPUT_FILE_EXCEL = "Planversionen.xlsx"
+REVISION_TOLERANZ = 1e-9            # Plan in Tausend Stück; kleinere Differenzen sind keine Revision
+
+# ---------------------------------------------------------
+# 1. VERSIONEN FINDEN UND LADEN
+# ---------------------------------------------------------
+
+def version_aus_datei(pfad):
+    """
+    'BAUMARKTPROGRAMM 2025-09.xlsx' -> '2025-09'.
+    Ohne Datum im Namen (z.B. 'BAUMARKTPROGRAMM.xlsx') zählt das Änderungsdatum der Datei,
+    ohne Datei None. Gemeinsamer Planstand für Planversionen, Snapshots, erp.py und Überwachung.
+    """
+    treffer = re.search(r"(\d{4})[-_.]?(\d{2})", os.path.basename(pfad))
+    if treffer:
+        return f"{treffer.group(1)}-{treffer.group(2)}"
+    if not os.path.exists(pfad):
+        return None
+    return datetime.fromtimestamp(os.path.getmtime(pfad)).strftime("%Y-%m-%d")
+
+
+def finde_versionen(verzeichnis=".", muster=PLAN_MUSTER):
+    """Alle Plandateien im Verzeichnis, nach Version sortiert (bei gleicher Version gewinnt die neueste Datei)."""
+    dateien = [p for p in glob.glob(os.path.join(verzeichnis, muster)) if not os.path.basename(p).startswith("~$")]
+    if not dateien:
+        return pd.DataFrame(columns=["Version", "Datei"])
+    df = pd.DataFrame({"Datei": dateien})
+    df["Version"] = df["Datei"].map(version_aus_datei)
+    df["mtime"] = df["Datei"].map(os.path.getmtime)
+    doppelt = df["Version"].duplicated(keep=False)
+    if doppelt.any():
+        print(f"   ⚠️ Mehrere Dateien für Version(en) {sorted(df.loc[doppelt, 'Version'].unique())} – neueste wird genutzt.")
+    df = df.sort_values("mtime").drop_duplicates("Version", keep="last")
+    return df.sort_values("Version")[["Version", "Datei"]].reset_index(drop=True)
+
+
+def _datei_schluessel(pfad):
+    info = os.stat(pfad)
+    return hashlib.sha1(f"{os.path.abspath(pfad)}|{info.st_size}|{info.st_mtime_ns}".encode()).hexdigest()[:16]
+
+
+def lade_version(pfad):
+    """
+    Eine Planversion im langen Format (Baumarkt, Monat, Zahl) – wie agg_Baumarktprogramm aus Schritt 2.
+    Das Ergebnis wird je Datei (Pfad, Größe, Änderungszeit) im Cache abgelegt:
+    unveränderte Versionen werden nie erneut aus Excel gelesen.
+
+    Returns:
+        (DataFrame, aus_cache)
+    """
+    schluessel = _datei_schluessel(pfad)
+    lang = lade_cache("planversionen", schluessel)
+    if lang is not None:
+        return lang, True
+    lang = lade_stufe(2).agg_Baumarktprogramm(pd.read_excel(pfad))
+    speichere_cache("planversionen", schluessel, lang)
+    return lang, False
+
+
+def lade_alle(verzeichnis=".", muster=PLAN_MUSTER):
+    """
+    Alle Planversionen in einer langen Tabelle: Version x Baumarkt x Monat -> Zahl.
+    """
+    start = time.perf_counter()
+    versionen = finde_versionen(verzeichnis, muster)
+    if versionen.empty:
+        print(f"❌ Keine Plandateien '{muster}' in '{verzeichnis}' gefunden!")
+        return pd.DataFrame(columns=["Version", "Baumarkt", "Monat", "Zahl"])
+
+    teile, gecacht = [], 0
+    for version, pfad in zip(versionen["Version"], versionen["Datei"]):
+        try:
+            lang, aus_cache = lade_version(pfad)
+        except Exception as e:
+            print(f"   ⚠️ {os.path.basename(pfad)} übersprungen: {e}")
+            continue
+        gecacht += aus_cache
+        teile.append(lang.assign(Version=version))
+    if not teile:
+        return pd.DataFrame(columns=["Version", "Baumarkt", "Monat", "Zahl"])
+
+    df = pd.concat(teile, ignore_index=True)[["Version", "Baumarkt", "Monat", "Zahl"]]
+    print(f"✅ {len(teile)} Planversionen geladen ({gecacht} aus Cache): {len(df):,} Zeilen "
+          f"in {time.perf_counter() - start:.2f}s")
+    return df
+
+
+# ---------------------------------------------------------
+# 2. PLANDRIFT
+# ---------------------------------------------------------
+
+def _monate_zwischen(version, monat):
+    """Vorlauf in Monaten vom Planstand (JJJJ-MM) bis zum Zielmonat (JJJJMM); NaN ohne datierte Version."""
+    stand = pd.to_datetime(version.str[:7], format="%Y-%m", errors="coerce")
+    return (monat // 100 - stand.dt.year) * 12 + (monat % 100 - stand.dt.month)
+
+
+def drift(lang):
+    """
+    Revisionen je Baumarkt/Monat zwischen aufeinanderfolgenden Versionen.
+    - Revision:      Zahl - Zahl der vorherigen Version (erste Version: NaN)
+    - Kum_Revision:  Zahl - Zahl der ersten Version
+    - Vorlauf:       Monate vom Planstand bis zum Zielmonat (negativ = Monat lag schon zurück)
+    """
+    if lang.empty:
+        return lang.assign(Revision=[], Kum_Revision=[], Vorlauf=[])
+    df = lang.sort_values(["Baumarkt", "Monat", "Version"]).reset_index(drop=True)
+    gruppe = df.groupby(["Baumarkt", "Monat"], sort=False)["Zahl"]
+    df["Revision"] = gruppe.diff()
+    df["Kum_Revision"] = df["Zahl"] - gruppe.transform("first")
+    df["Vorlauf"] = _monate_zwischen(df["Version"], df["Monat"])
+    return df
+
+
+def statistik(df_drift):
+    """Kumulierte Revisionsstatistik je Baumarkt und Monat über alle Versionen."""
+    if df_drift.empty:
+        return pd.DataFrame()
+    df = df_drift.assign(
+        Abs_Revision=df_drift["Revision"].abs(),
+        Ist_Revision=df_drift["Revision"].abs() > REVISION_TOLERANZ,
+    )
+    stat = df.groupby(["Baumarkt", "Monat"]).agg(
+        Versionen=("Version", "size"),
+        Revisionen=("Ist_Revision", "sum"),
+        Erste=("Zahl", "first"),
+        Letzte=("Zahl", "last"),
+        Summe_Abs_Revision=("Abs_Revision", "sum"),
+        Max_Abs_Revision=("Abs_Revision", "max"),
+    ).reset_index()
+    stat["Kum_Revision"] = stat["Letzte"] - stat["Erste"]
+    stat["Kum_Revision_Prozent"] = np.where(stat["Erste"] != 0, stat["Kum_Revision"] / stat["Erste"] * 100, np.nan)
+    # Hin und her: wie viel der bewegten Menge hebt sich am Ende wieder auf?
+    stat["Netto_Anteil"] = np.where(
+        stat["Summe_Abs_Revision"] > 0, stat["Kum_Revision"].abs() / stat["Summe_Abs_Revision"], np.nan
+    )
+    return stat
+
+
+def drift_je_version(df_drift):
+    """Summe der Revisionen je Version und Baumarkt (gegenüber der Vorversion)."""
+    df = df_drift.dropna(subset=["Revision"])
+    if df.empty:
+        return pd.DataFrame()
+    return (
+        df.assign(Abs_Revision=df["Revision"].abs())
+        .groupby(["Version", "Baumarkt"])
+        .agg(Plan=("Zahl", "sum"), Revision=("Revision", "sum"), Abs_Revision=("Abs_Revision", "sum"))
+        .reset_index()
+    )
+
+
+def drift_je_vorlauf(df_drift):
+    """Mittlere absolute Revision nach Vorlauf – wie stark wird kurz vor dem Zielmonat noch umgeplant?"""
+    df = df_drift.dropna(subset=["Revision", "Vorlauf"])
+    if df.empty:
+        return pd.DataFrame()
+    return (
+        df.assign(Abs_Revision=df["Revision"].abs())
+        .groupby("Vorlauf")
+        .agg(Anzahl=("Revision", "size"), Mittl_Abs_Revision=("Abs_Revision", "mean"), Revision=("Revision", "sum"))
+        .reset_index()
+    )
+
+
+# ---------------------------------------------------------
+# 3. SPEICHERN & MAIN
+# ---------------------------------------------------------
+
+def save_results(tabellen, out_dir=OUTPUT_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, OUTPUT_FILE_EXCEL)
+    with pd.ExcelWriter(out_path) as writer:
+        for name, df in tabellen.items():
+            if df is not None and not df.empty:
+                df.to_excel(writer, sheet_name=name, index=False)
+    print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+
+
+def main():
+    verzeichnis = sys.argv[1] if len(sys.argv) > 1 else "."
+    print("📂 Lade Planversionen...")
+    lang = lade_alle(verzeichnis)
+    if lang.empty:
+        return
+    print(f"   Versionen: {', '.join(lang['Version'].unique())}")
+
+    df_drift = drift(lang)
+    stat = statistik(df_drift)
+    if lang["Version"].nunique() < 2:
+        print("   ℹ️  Nur eine Planversion – keine Revisionen berechenbar.")
+    else:
+        je_kunde = stat.groupby("Baumarkt")[["Revisionen", "Summe_Abs_Revision", "Kum_Revision"]].sum()
+        print("\n📊 Plandrift je Baumarkt (Tausend Stück):")
+        print(je_kunde.sort_values("Summe_Abs_Revision", ascending=False).round(1).to_string())
+
+    save_results({
+        "Lang": lang,
+        "Drift": df_drift,
+        "Statistik": stat,
+        "Je_Version": drift_je_version(df_drift),
+        "Je_Vorlauf": drift_je_vorlauf(df_drift),
+    })
+
+
+if __name__ == "__main__":
+    main()
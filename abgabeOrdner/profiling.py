@@ -0,0 +1,266 @@
+import pandas as pd
+import os
+import sys
+import json
+import time
+import fnmatch
+import functools
+import threading
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from stufen import lade_stufe
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/profil"
+
+# Welche Funktionen der Stufen gemessen werden (Muster wie bei Dateinamen)
+PROFIL_FUNKTIONEN = {
+    1: ["load_data", "prepare_data", "aggregate_data", "run_analysis", "plot_*"],
+    2: ["load_rohdaten", "load_baumarktprogramm", "agg_Rohdaten", "agg_Baumarktprogramm", "plot_*"],
+    3: ["load_data", "prepare_forecast", "prepare_plan", "run_reconciliation", "save_results"],
+    4: ["check_consistency"],
+    5: ["load_data", "prepare_data", "plot_*"],
+}
+
+_AUFRUFE = []
+_START = time.perf_counter()
+_LOCK = threading.Lock()
+_AKTIV = False
+
+# ---------------------------------------------------------
+# 1. MESSUNG
+# ---------------------------------------------------------
+
+def _rss_peak_mb():
+    """Höchster Speicherverbrauch des Prozesses bisher (ru_maxrss: KB unter Linux, Bytes unter macOS)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _io_bytes():
+    """Gelesene / geschriebene Bytes des Prozesses aus /proc/self/io (nur Linux), sonst None."""
+    try:
+        with open("/proc/self/io") as f:
+            werte = dict(zeile.split(": ") for zeile in f.read().splitlines())
+        return int(werte["rchar"]), int(werte["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _zeilen(obj):
+    """Zeilen in DataFrames (auch in Tupeln/Listen, z.B. load_data -> (df_forecast, df_plan))."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, (tuple, list)):
+        return sum(_zeilen(o) for o in obj if isinstance(o, (pd.DataFrame, pd.Series)))
+    return 0
+
+
+def _dateigroesse(args, kwargs):
+    """Größe der ersten existierenden Datei in den Argumenten (Fallback ohne /proc/self/io)."""
+    for wert in list(args) + list(kwargs.values()):
+        if isinstance(wert, (str, os.PathLike)) and os.path.isfile(wert):
+            return os.path.getsize(wert)
+    return 0
+
+
+def messe(name, funktion, io_art=None):
+    """
+    Umhüllt eine Funktion und protokolliert pro Aufruf: Wall- und CPU-Zeit, Peak-RSS,
+    Zeilen rein/raus und gelesene/geschriebene Bytes. 'io_art' ('lesen'/'schreiben')
+    kennzeichnet Datei-Funktionen für den Fallback über die Dateigröße.
+    """
+    if getattr(funktion, "_profil_name", None):
+        return funktion
+
+    @functools.wraps(funktion)
+    def wrapper(*args, **kwargs):
+        io_vorher = _io_bytes()
+        rss_vorher = _rss_peak_mb()
+        t0 = time.perf_counter()
+        c0 = time.process_time()
+        ergebnis = None
+        fehler = None
+        try:
+            ergebnis = funktion(*args, **kwargs)
+            return ergebnis
+        except Exception as e:
+            fehler = repr(e)
+            raise
+        finally:
+            t1 = time.perf_counter()
+            c1 = time.process_time()
+            io_nachher = _io_bytes()
+            rss_nachher = _rss_peak_mb()
+            if io_vorher and io_nachher:
+                gelesen, geschrieben = io_nachher[0] - io_vorher[0], io_nachher[1] - io_vorher[1]
+            else:
+                groesse = _dateigroesse(args, kwargs)
+                gelesen = groesse if io_art == "lesen" else 0
+                geschrieben = groesse if io_art == "schreiben" else 0
+
+            zeilen_rein = _zeilen(list(args) + list(kwargs.values()))
+            if io_art == "schreiben" and args and isinstance(args[0], pd.DataFrame):
+                zeilen_rein = len(args[0])
+
+            with _LOCK:
+                _AUFRUFE.append({
+                    "name": name,
+                    "start_s": round(t0 - _START, 6),
+                    "wall_s": round(t1 - t0, 6),
+                    "cpu_s": round(c1 - c0, 6),
+                    "rss_peak_mb": None if rss_nachher is None else round(rss_nachher, 1),
+                    "rss_zuwachs_mb": None if rss_nachher is None else round(rss_nachher - rss_vorher, 1),
+                    "zeilen_rein": zeilen_rein,
+                    "zeilen_raus": _zeilen(ergebnis),
+                    "bytes_gelesen": gelesen,
+                    "bytes_geschrieben": geschrieben,
+                    "thread": threading.get_ident(),
+                    "fehler": fehler,
+                })
+
+    wrapper._profil_name = name
+    return wrapper
+
+
+# ---------------------------------------------------------
+# 2. INSTRUMENTIERUNG
+# ---------------------------------------------------------
+
+def instrumentiere_modul(modul, muster, praefix):
+    """Ersetzt passende Funktionen eines Moduls durch gemessene Varianten (Aufrufe über das Modul)."""
+    namen = []
+    for attr, wert in list(vars(modul).items()):
+        if callable(wert) and getattr(wert, "__module__", None) == modul.__name__:
+            if any(fnmatch.fnmatch(attr, m) for m in muster):
+                setattr(modul, attr, messe(f"{praefix}.{attr}", wert))
+                namen.append(attr)
+    return namen
+
+
+def instrumentiere_io():
+    """Misst alle Excel-Lese- und Schreibvorgänge (pd.read_excel, DataFrame.to_excel)."""
+    if not getattr(pd.read_excel, "_profil_name", None):
+        pd.read_excel = messe("pandas.read_excel", pd.read_excel, io_art="lesen")
+    if not getattr(pd.DataFrame.to_excel, "_profil_name", None):
+        pd.DataFrame.to_excel = messe("pandas.to_excel", pd.DataFrame.to_excel, io_art="schreiben")
+
+
+def aktiviere(funktionen=PROFIL_FUNKTIONEN):
+    """Schaltet die Messung für alle Stufen und die Excel-Ein-/Ausgabe ein."""
+    global _AKTIV
+    instrumentiere_io()
+    for nummer, muster in funktionen.items():
+        instrumentiere_modul(lade_stufe(nummer), muster, f"stufe{nummer}")
+    _AKTIV = True
+    print("   ℹ️  Profiling aktiv.")
+
+
+def ist_aktiv():
+    return _AKTIV
+
+
+# ---------------------------------------------------------
+# 3. BERICHTE (JSON + TRACE-EVENTS)
+# ---------------------------------------------------------
+
+def zusammenfassung(aufrufe=None):
+    """Summen pro Funktion, sortiert nach Wall-Zeit (für den Vergleich zwischen Läufen)."""
+    df = pd.DataFrame(_AUFRUFE if aufrufe is None else aufrufe)
+    if df.empty:
+        return df
+    agg = df.groupby("name").agg(
+        aufrufe=("name", "size"),
+        wall_s=("wall_s", "sum"),
+        cpu_s=("cpu_s", "sum"),
+        rss_peak_mb=("rss_peak_mb", "max"),
+        zeilen_rein=("zeilen_rein", "sum"),
+        zeilen_raus=("zeilen_raus", "sum"),
+        bytes_gelesen=("bytes_gelesen", "sum"),
+        bytes_geschrieben=("bytes_geschrieben", "sum"),
+    )
+    return agg.sort_values("wall_s", ascending=False).reset_index()
+
+
+def trace_events(aufrufe=None):
+    """Chrome-Trace-Format (chrome://tracing, Perfetto): ein 'X'-Event pro Aufruf, Zeiten in µs."""
+    pid = os.getpid()
+    return {
+        "traceEvents": [
+            {
+                "name": a["name"],
+                "cat": a["name"].split(".")[0],
+                "ph": "X",
+                "ts": round(a["start_s"] * 1e6),
+                "dur": round(a["wall_s"] * 1e6),
+                "pid": pid,
+                "tid": a["thread"],
+                "args": {k: v for k, v in a.items() if k not in ("name", "start_s", "wall_s", "thread")},
+            }
+            for a in (_AUFRUFE if aufrufe is None else aufrufe)
+        ],
+        "displayTimeUnit": "ms",
+    }
+
+
+def schreibe_bericht(out_dir=OUTPUT_DIR, titel=None):
+    """
+    Schreibt profil_<zeit>.json (Aufrufe + Zusammenfassung) und trace_<zeit>.json.
+
+    Returns:
+        (Pfad Bericht, Pfad Trace)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    stempel = datetime.now().strftime("%Y%m%d_%H%M%S")
+    bericht = {
+        "erstellt": datetime.now().isoformat(timespec="seconds"),
+        "titel": titel,
+        "python": sys.version.split()[0],
+        "zusammenfassung": zusammenfassung().to_dict(orient="records"),
+        "aufrufe": _AUFRUFE,
+    }
+    pfad_bericht = os.path.join(out_dir, f"profil_{stempel}.json")
+    pfad_trace = os.path.join(out_dir, f"trace_{stempel}.json")
+    with open(pfad_bericht, "w", encoding="utf-8") as f:
+        json.dump(bericht, f, indent=2, ensure_ascii=False, default=str)
+    with open(pfad_trace, "w", encoding="utf-8") as f:
+        json.dump(trace_events(), f, default=str)
+    print(f"   ✅ Profil gespeichert: {pfad_bericht}")
+    print(f"   ✅ Trace gespeichert:  {pfad_trace} (chrome://tracing oder ui.perfetto.dev)")
+    return pfad_bericht, pfad_trace
+
+
+def vergleiche_berichte(pfad_alt, pfad_neu):
+    """Stellt die Zusammenfassungen zweier Läufe gegenüber (Wall/CPU/RSS, Änderung in %)."""
+    teile = []
+    for pfad, suffix in [(pfad_alt, "_alt"), (pfad_neu, "_neu")]:
+        with open(pfad, encoding="utf-8") as f:
+            df = pd.DataFrame(json.load(f)["zusammenfassung"])
+        teile.append(df.set_index("name")[["wall_s", "cpu_s", "rss_peak_mb"]].add_suffix(suffix))
+    vergleich = teile[0].join(teile[1], how="outer")
+    vergleich["wall_aenderung"] = vergleich["wall_s_neu"] / vergleich["wall_s_alt"] - 1
+    return vergleich.sort_values("wall_s_neu", ascending=False)
+
+
+# ---------------------------------------------------------
+# 4. MAIN
+# ---------------------------------------------------------
+
+def main():
+    if len(sys.argv) != 3:
+        print("Aufruf: python profiling.py <profil_alt.json> <profil_neu.json>")
+        return
+    vergleich = vergleiche_berichte(sys.argv[1], sys.argv[2])
+    pd.set_option("display.width", 200)
+    print(vergleich.to_string(float_format=lambda x: f"{x:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
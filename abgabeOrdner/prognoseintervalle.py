@@ -0,0 +1,416 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib.pyplot as plt
+import matplotlib.ticker as ticker
+import seaborn as sns
+
+from stufen import lade_stufe
+from genauigkeit import vergleichstabelle
+from exponentielle_glaettung import serien_matrix
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/final"
+OUTPUT_FILE_EXCEL = "Prognoseintervalle.xlsx"
+OUTPUT_DIR_PLOTS = "./output/final/plots"
+STICHPROBEN = 500                 # Bootstrap-Pfade
+QUANTILE = [0.1, 0.5, 0.9]        # -> P10 / P50 / P90
+SPEICHER_MB = 256                 # Obergrenze für einen Block (Stichproben x Reihen x Monate) je Worker
+MAX_WORKER = None                 # None = alle Kerne
+MAX_RESIDUEN = 60                 # jüngste Fehlermonate je Reihe und Prognosejahr
+MIN_BEOBACHTUNGEN = 6             # weniger -> relative Fehler des Kunden, skaliert mit dem Prognoseniveau
+SEED = 42
+
+Q_NAMEN = [f"P{int(round(q * 100))}" for q in QUANTILE]
+
+sns.set_theme(style="whitegrid")
+
+# ---------------------------------------------------------
+# 1. KONTEXT AUFBAUEN (einmal pro Lauf)
+# ---------------------------------------------------------
+
+def faktoren(bottom_up, ziel, hat_plan):
+    """calculate_factor aus Schritt 3, vektorisiert: ohne Basis 0, ohne Plan (0 oder fehlend) 1."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        faktor = np.where(bottom_up == 0, 0.0, np.where(ziel == 0, 1.0, ziel / bottom_up))
+    return np.where(hat_plan, faktor, 1.0)
+
+
+def _residuen_pools(fehler, serien, kunde_code, niveau, rng):
+    """
+    Fehler (Ist - Prognose) je Reihe als gepolsterte Matrix (Reihen x MAX_RESIDUEN) plus Anzahl.
+    Kurze Reihen bekommen relative Fehler ihres Kunden, skaliert mit dem eigenen Prognoseniveau.
+    """
+    n_serien = len(serien)
+    pool = np.zeros((n_serien, MAX_RESIDUEN))
+    anzahl = np.zeros(n_serien, dtype=np.int64)
+
+    index = serien[["Artikel", "Kunde"]].reset_index().drop_duplicates(["Artikel", "Kunde"])
+    fehler = fehler.merge(index, on=["Artikel", "Kunde"], how="inner")
+    if not fehler.empty:
+        fehler = fehler.sort_values(["index", "Monat"], ascending=[True, False])
+        position = fehler.groupby("index").cumcount().to_numpy()
+        behalten = position < MAX_RESIDUEN
+        s = fehler["index"].to_numpy()[behalten]
+        pool[s, position[behalten]] = fehler["Fehler"].to_numpy()[behalten]
+        anzahl = np.bincount(s, minlength=n_serien)
+
+    # Relative Fehler je Kunde (Fehler / mittlere historische Prognose der Reihe)
+    hist_niveau = fehler.groupby("index")["Prognose"].transform("mean").to_numpy()
+    relativ = fehler["Fehler"].to_numpy() / np.where(hist_niveau > 0, hist_niveau, np.nan)
+    relativ_kunde = kunde_code[fehler["index"].to_numpy()]
+    kurz = np.flatnonzero(anzahl < MIN_BEOBACHTUNGEN)
+    for k in np.unique(kunde_code[kurz]):
+        reihen = kurz[kunde_code[kurz] == k]
+        werte = relativ[(relativ_kunde == k) & ~np.isnan(relativ)]
+        if len(werte) == 0:
+            pool[reihen] = 0.0
+            anzahl[reihen] = 0
+            continue
+        pool[reihen] = rng.choice(werte, (len(reihen), MAX_RESIDUEN)) * niveau[reihen, None]
+        anzahl[reihen] = MAX_RESIDUEN
+    return pool, anzahl
+
+
+def _bloecke(gruppe_code, max_reihen):
+    """
+    Zusammenhängende Reihenbereiche mit höchstens max_reihen Reihen, ohne eine Teilegruppe zu teilen
+    (eine einzelne größere Gruppe bildet einen eigenen Block).
+    """
+    anfaenge = np.concatenate([[0], np.flatnonzero(np.diff(gruppe_code)) + 1])
+    enden = np.concatenate([anfaenge[1:], [len(gruppe_code)]])
+    bloecke, start = [], 0
+    for anfang, ende in zip(anfaenge, enden):
+        if ende - start > max_reihen and anfang > start:
+            bloecke.append((start, int(anfang)))
+            start = int(anfang)
+    if len(gruppe_code):
+        bloecke.append((start, len(gruppe_code)))
+    return bloecke
+
+
+def baue_kontext(df_forecast, df_plan, df_raw, stichproben=STICHPROBEN, speicher_mb=SPEICHER_MB):
+    """
+    Bereitet alle Eingaben einmal auf:
+    - Punktprognose je Reihe (Kunde, Gruppe, Artikel) x Monat, Reihen nach Kunde und Gruppe sortiert,
+      zusätzlich aufgeteilt nach Prognosejahr (df_forecast aus prepare_forecast(..., mit_horizont=True)):
+      prog_mg1 und prog_mg2 können denselben Zielmonat treffen und werden dann getrennt gestört
+    - Vertriebsplan je Kunde x Monat
+    - Fehler-Pools je Reihe für Prognosejahr 1 (prog_mg1) und 2 (prog_mg2)
+    - Blöcke von Reihen, die nie eine Teilegruppe zerschneiden und in den Speicherrahmen passen
+    """
+    forecast = df_forecast.assign(
+        Gruppe=lade_stufe(3).norm_gruppe(df_forecast["Gruppe"]),
+        Menge_1=df_forecast["Menge"].where(df_forecast["Horizont"] == 1, 0.0),
+    )
+    # Gleiche Schlüssel und Monate -> beide Matrizen liegen auf denselben Reihen/Spalten
+    werte, serien, monate = serien_matrix(forecast, ("Kunde", "Gruppe", "Artikel"), "Monat", "Menge")
+    werte_1, _, _ = serien_matrix(forecast, ("Kunde", "Gruppe", "Artikel"), "Monat", "Menge_1")
+    werte_jahr = {1: werte_1, 2: werte - werte_1}
+    kunde_code, kunden = pd.factorize(serien["Kunde"])
+    gruppe_code = serien.groupby(["Kunde", "Gruppe"], sort=False).ngroup().to_numpy()
+
+    plan = (
+        df_plan.groupby(["Kunde", "Monat"])["Ziel_Summe"].sum()
+        .unstack("Monat").reindex(index=kunden, columns=monate)
+    )
+    hat_plan = plan.notna().to_numpy()
+    ziel = plan.fillna(0).to_numpy()
+
+    # Nur Monate mit Prognose: gestört werden ebenfalls nur Zellen mit Prognose > 0
+    vergleich = vergleichstabelle(df_raw)
+    vergleich = vergleich[vergleich["Prognose"] > 0].copy()
+    vergleich["Fehler"] = vergleich["Ist"] - vergleich["Prognose"]
+    rng = np.random.default_rng(SEED)
+    pools = {}
+    for j, w in werte_jahr.items():
+        positiv = w > 0
+        niveau = np.where(positiv.any(axis=1), w.sum(axis=1) / np.maximum(positiv.sum(axis=1), 1), 0.0)
+        pools[j] = _residuen_pools(vergleich[vergleich["Horizont"] == j], serien, kunde_code, niveau, rng)
+
+    # Blockgröße: Pfade, Indizes, Residuen und gestörter Jahresanteil gleichzeitig im Speicher (~4 Arrays)
+    max_reihen = max(1, int(speicher_mb * 1e6 / (4 * 8 * stichproben * max(len(monate), 1))))
+    bloecke = _bloecke(gruppe_code, max_reihen)
+
+    return {
+        "werte": werte, "serien": serien, "monate": monate,
+        "kunde_code": kunde_code, "kunden": np.asarray(kunden), "gruppe_code": gruppe_code,
+        "ziel": ziel, "hat_plan": hat_plan, "werte_jahr": werte_jahr, "pools": pools,
+        "stichproben": stichproben, "bloecke": bloecke,
+    }
+
+
+# ---------------------------------------------------------
+# 2. BOOTSTRAP-PFADE JE BLOCK (Stichprobe x Reihe x Monat)
+# ---------------------------------------------------------
+
+def block_daten(kontext, start, ende):
+    """
+    Ausschnitt des Kontexts für die Reihen start..ende – nur das geht an den Worker,
+    nicht der ganze Kontext (Pools, Matrizen und Reihen aller Blöcke).
+    """
+    return {
+        "start": start,
+        "monate": kontext["monate"],
+        "stichproben": kontext["stichproben"],
+        "n_kunden": len(kontext["kunden"]),
+        "werte": kontext["werte"][start:ende],
+        "werte_jahr": {j: w[start:ende] for j, w in kontext["werte_jahr"].items()},
+        "pools": {j: (pool[start:ende], anzahl[start:ende]) for j, (pool, anzahl) in kontext["pools"].items()},
+        "kunde_code": kontext["kunde_code"][start:ende],
+        "gruppe_code": kontext["gruppe_code"][start:ende],
+        "serien": kontext["serien"].iloc[start:ende].reset_index(drop=True),
+    }
+
+
+def pfade(block):
+    """
+    Bootstrap-Pfade für die Reihen eines Blocks: je Prognosejahr dessen Anteil der Punktprognose
+    (prog_mg1 bzw. prog_mg2) + zufällig gezogener historischer Fehler derselben Reihe aus dem Pool
+    dieses Jahres, nach unten bei 0 begrenzt; danach beide Anteile addiert. Nur Zellen mit Prognose > 0
+    werden gestört – wie im finalen Forecast, der nur diese Zeilen enthält.
+    Der Zufallsgenerator hängt nur vom Blockanfang ab: beide Durchläufe ziehen dieselben Pfade.
+    """
+    rng = np.random.default_rng([SEED, block["start"]])
+    b, n = block["stichproben"], len(block["werte"])
+    x = np.zeros((b, n, len(block["monate"])))
+    reihen = np.arange(n)[None, :, None]
+    for jahr, (pool, anzahl) in block["pools"].items():
+        teil = block["werte_jahr"][jahr]
+        spalten = np.flatnonzero((teil > 0).any(axis=0))
+        if len(spalten) == 0:
+            continue
+        teil = teil[:, spalten]
+        ziehung = (rng.random((b, n, len(spalten))) * anzahl[:, None]).astype(np.int64)
+        gestoert = teil + pool[reihen, ziehung] * (teil > 0)
+        x[:, :, spalten] += np.maximum(gestoert, 0.0, out=gestoert)
+    return x
+
+
+def _kunden_summen(x, kunde_code, n_kunden):
+    """Stichprobe x Kunde x Monat; Reihen sind nach Kunde sortiert -> wenige Kunden je Block."""
+    summen = np.zeros((x.shape[0], n_kunden, x.shape[2]))
+    for k in np.unique(kunde_code):
+        summen[:, k, :] = x[:, kunde_code == k, :].sum(axis=1)
+    return summen
+
+
+def _quantil_tabelle(ebene, schluessel, monate, punkt, abgeglichen, basis):
+    """Lange Tabelle je Knoten x Monat mit Punktprognose, P10/P50/P90 (abgeglichen und Basis)."""
+    q_abgl = np.quantile(abgeglichen, QUANTILE, axis=0)
+    q_basis = np.quantile(basis, QUANTILE, axis=0)
+    zeilen, spalten = np.nonzero(punkt > 0)
+    df = schluessel.iloc[zeilen].reset_index(drop=True)
+    df.insert(0, "Ebene", ebene)
+    df["Monat"] = np.asarray(monate)[spalten]
+    df["Prognose"] = punkt[zeilen, spalten]
+    for i, name in enumerate(Q_NAMEN):
+        df[name] = q_abgl[i][zeilen, spalten]
+    for i, name in enumerate(Q_NAMEN):
+        df[f"{name}_Basis"] = q_basis[i][zeilen, spalten]
+    return df
+
+
+# ---------------------------------------------------------
+# 3. PARALLELE AUSFÜHRUNG IN BLÖCKEN
+# ---------------------------------------------------------
+
+def _basis_summen(block):
+    """Durchlauf 1: Bottom-Up-Summen je Stichprobe, Kunde und Monat (Grundlage der Abgleichsfaktoren)."""
+    return _kunden_summen(pfade(block), block["kunde_code"], block["n_kunden"])
+
+
+def _intervalle(aufgabe):
+    """
+    Durchlauf 2: dieselben Pfade mit den Faktoren der jeweiligen Stichprobe abgleichen,
+    Quantile für Artikel und Teilegruppe (je Kunde) direkt im Block bilden.
+    """
+    block, stich_faktoren, punkt_faktoren = aufgabe
+    kunde_code = block["kunde_code"]
+    x = pfade(block)
+    y = x * stich_faktoren[:, kunde_code, :]
+    punkt = block["werte"] * punkt_faktoren[kunde_code]
+    serien = block["serien"]
+
+    tabellen = [_quantil_tabelle("Artikel", serien, block["monate"], punkt, y, x)]
+
+    gruppe_code = block["gruppe_code"]
+    codes = gruppe_code - gruppe_code[0]
+    n_gruppen = codes.max() + 1
+    gruppen = serien.drop_duplicates(["Kunde", "Gruppe"])[["Kunde", "Gruppe"]].reset_index(drop=True)
+    g_y = np.zeros((y.shape[0], n_gruppen, y.shape[2]))
+    g_x = np.zeros_like(g_y)
+    g_punkt = np.zeros((n_gruppen, y.shape[2]))
+    for g in range(n_gruppen):
+        maske = codes == g
+        g_y[:, g, :] = y[:, maske, :].sum(axis=1)
+        g_x[:, g, :] = x[:, maske, :].sum(axis=1)
+        g_punkt[g] = punkt[maske].sum(axis=0)
+    tabellen.append(_quantil_tabelle("Teilegruppe", gruppen, block["monate"], g_punkt, g_y, g_x))
+
+    return pd.concat(tabellen, ignore_index=True), _kunden_summen(y, kunde_code, block["n_kunden"])
+
+
+def berechne(kontext, max_worker=MAX_WORKER):
+    """
+    Zwei Durchläufe über die Reihen-Blöcke im Prozess-Pool:
+      1. Bottom-Up-Summen je Stichprobe -> Abgleichsfaktoren je Stichprobe (wie run_reconciliation)
+      2. Pfade abgleichen und Quantile je Ebene bilden
+    Im Hauptprozess liegen nur Stichprobe x Kunde x Monat-Arrays; die großen Pfad-Arrays
+    entstehen blockweise im Worker. Jeder Worker bekommt nur den Ausschnitt seines Blocks (block_daten).
+
+    Returns:
+        DataFrame: Ebene, Kunde, Gruppe, Artikel, Monat, Prognose, P10, P50, P90, P10_Basis, ...
+    """
+    start = time.perf_counter()
+    n_kunden, n_monate = len(kontext["kunden"]), len(kontext["monate"])
+    bloecke = [block_daten(kontext, a, e) for a, e in kontext["bloecke"]]
+    print(f"   {kontext['stichproben']} Pfade x {len(kontext['serien']):,} Reihen x {n_monate} Monate "
+          f"in {len(bloecke)} Blöcken")
+
+    punkt_summen = _kunden_summen(kontext["werte"][None], kontext["kunde_code"], n_kunden)[0]
+    punkt_faktoren = faktoren(punkt_summen, kontext["ziel"], kontext["hat_plan"])
+
+    basis_summen = np.zeros((kontext["stichproben"], n_kunden, n_monate))
+    abgl_summen = np.zeros_like(basis_summen)
+    tabellen = []
+    with ProcessPoolExecutor(max_workers=max_worker) as pool:
+        for summen in pool.map(_basis_summen, bloecke):
+            basis_summen += summen
+        stich_faktoren = faktoren(basis_summen, kontext["ziel"][None], kontext["hat_plan"][None])
+        aufgaben = [(block, stich_faktoren, punkt_faktoren) for block in bloecke]
+        for tabelle, summen in pool.map(_intervalle, aufgaben):
+            tabellen.append(tabelle)
+            abgl_summen += summen
+
+    kunden = pd.DataFrame({"Kunde": kontext["kunden"]})
+    punkt_kunde = punkt_summen * punkt_faktoren
+    tabellen.append(_quantil_tabelle("Kunde", kunden, kontext["monate"], punkt_kunde, abgl_summen, basis_summen))
+    tabellen.append(_quantil_tabelle(
+        "Gesamt", pd.DataFrame({"Kunde": ["Gesamt"]}), kontext["monate"],
+        punkt_kunde.sum(axis=0)[None], abgl_summen.sum(axis=1)[:, None], basis_summen.sum(axis=1)[:, None],
+    ))
+    ergebnis = pd.concat(tabellen, ignore_index=True)
+    spalten = ["Ebene", "Kunde", "Gruppe", "Artikel", "Monat", "Prognose"] + Q_NAMEN + [f"{q}_Basis" for q in Q_NAMEN]
+    print(f"   ✅ Intervalle für {len(ergebnis):,} Knoten x Monate in {time.perf_counter() - start:.1f}s")
+    return ergebnis.reindex(columns=spalten)
+
+
+# ---------------------------------------------------------
+# 4. PLOT, SPEICHERN & MAIN
+# ---------------------------------------------------------
+
+def relative_breite(df, basis=False):
+    """(P90 - P10) / P50 je Zeile; NaN, wo der Median 0 ist."""
+    endung = "_Basis" if basis else ""
+    median = df[f"{Q_NAMEN[len(Q_NAMEN) // 2]}{endung}"]
+    return (df[f"{Q_NAMEN[-1]}{endung}"] - df[f"{Q_NAMEN[0]}{endung}"]) / median.where(median > 0)
+
+
+def bandbreiten(ergebnis):
+    """
+    Median der relativen Bandbreite je Ebene, abgeglichen und vor dem Abgleich.
+    Auf Kunde/Gesamt ist die abgeglichene Breite 0, wo ein Vertriebsplan existiert (der Abgleich
+    setzt jede Stichprobe auf den Plan) – aussagekräftig sind dort nur die Basis-Intervalle.
+    """
+    zeilen = []
+    for ebene, teil in ergebnis.groupby("Ebene", sort=False):
+        zeilen.append({
+            "Ebene": ebene,
+            "Knoten_Monate": len(teil),
+            "Breite_Abgeglichen": relative_breite(teil).median(),
+            "Breite_Basis": relative_breite(teil, basis=True).median(),
+        })
+    return pd.DataFrame(zeilen)
+
+
+def plot_intervalle(ergebnis, out_dir=OUTPUT_DIR_PLOTS):
+    """
+    Links: Gesamtvolumen mit P10-P90-Band vor dem Abgleich (nach dem Abgleich liegt das Gesamt auf dem Plan,
+    das Band ist dort leer). Rechts: Median der relativen Bandbreite je Monat auf Ebene Artikel x Kunde,
+    vor und nach dem Abgleich.
+    """
+    gesamt = ergebnis[ergebnis["Ebene"] == "Gesamt"].sort_values("Monat")
+    artikel = ergebnis[ergebnis["Ebene"] == "Artikel"]
+    if gesamt.empty or artikel.empty:
+        return
+    breite = pd.DataFrame({
+        "Monat": artikel["Monat"],
+        "Abgeglichen": relative_breite(artikel),
+        "Basis": relative_breite(artikel, basis=True),
+    }).groupby("Monat").median().sort_index()
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(20, 8))
+    x = gesamt["Monat"].astype(str)
+    ax1.fill_between(x, gesamt[f"{Q_NAMEN[0]}_Basis"], gesamt[f"{Q_NAMEN[-1]}_Basis"],
+                     color="grey", alpha=0.3, label=f"{Q_NAMEN[0]}-{Q_NAMEN[-1]} Bottom-Up")
+    ax1.plot(x, gesamt[f"{Q_NAMEN[len(Q_NAMEN) // 2]}_Basis"], color="grey", linewidth=2, marker="o",
+             label=f"{Q_NAMEN[len(Q_NAMEN) // 2]} Bottom-Up")
+    ax1.yaxis.set_major_formatter(ticker.FuncFormatter(lambda v, p: format(int(v), ",").replace(",", ".")))
+    ax1.set_title("Gesamtvolumen vor dem Abgleich", fontsize=14, fontweight="bold")
+    ax1.set_ylabel("Absatzmenge (Stück)")
+    ax1.tick_params(axis="x", rotation=45)
+    ax1.legend(loc="upper center", bbox_to_anchor=(0.5, -0.15), ncol=2, frameon=False)
+
+    xb = breite.index.astype(str)
+    ax2.plot(xb, breite["Basis"], color="grey", linewidth=2, marker="o", label="Bottom-Up")
+    ax2.plot(xb, breite["Abgeglichen"], color="#2ecc71", linewidth=3, marker="o", label="Angepasst (Final)")
+    ax2.yaxis.set_major_formatter(ticker.PercentFormatter(1.0))
+    ax2.set_title(f"Artikel x Kunde: Median ({Q_NAMEN[-1]} - {Q_NAMEN[0]}) / {Q_NAMEN[len(Q_NAMEN) // 2]}",
+                  fontsize=14, fontweight="bold")
+    ax2.set_ylabel("Relative Bandbreite")
+    ax2.tick_params(axis="x", rotation=45)
+    ax2.legend(loc="upper center", bbox_to_anchor=(0.5, -0.15), ncol=2, frameon=False)
+
+    fig.suptitle("Prognoseintervalle", fontsize=16, fontweight="bold")
+    plt.tight_layout()
+    os.makedirs(out_dir, exist_ok=True)
+    save_path = os.path.join(out_dir, "6_Prognoseintervalle.png")
+    plt.savefig(save_path, dpi=150, bbox_inches="tight")
+    plt.close()
+    print(f"   ✅ Gespeichert: {save_path}")
+
+
+def save_results(ergebnis, breiten, out_dir=OUTPUT_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, OUTPUT_FILE_EXCEL)
+    with pd.ExcelWriter(out_path) as writer:
+        breiten.to_excel(writer, sheet_name="Bandbreite", index=False)
+        for ebene, teil in ergebnis.groupby("Ebene", sort=False):
+            teil.dropna(axis=1, how="all").to_excel(writer, sheet_name=ebene, index=False)
+    print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+
+
+def main():
+    print("=== BOOTSTRAP-PROGNOSEINTERVALLE ===")
+    stufe3 = lade_stufe(3)
+    rohdaten = lade_stufe(2).load_rohdaten()
+    if rohdaten is None:
+        return
+    if not os.path.exists(stufe3.INPUT_FILE_PLAN):
+        print(f"❌ Fehler: {stufe3.INPUT_FILE_PLAN} fehlt.")
+        return
+    df_forecast = stufe3.prepare_forecast(rohdaten, mit_horizont=True)
+    df_plan = stufe3.prepare_plan(pd.read_excel(stufe3.INPUT_FILE_PLAN))
+    if df_forecast.empty or df_plan.empty:
+        return
+
+    kontext = baue_kontext(df_forecast, df_plan, rohdaten)
+    ergebnis = berechne(kontext)
+
+    # Kunde/Gesamt liegen nach dem Abgleich auf dem Plan (P10 = P50 = P90) -> Basis-Intervalle zeigen
+    gesamt = ergebnis[ergebnis["Ebene"] == "Gesamt"]
+    print("\n📊 Gesamtvolumen vor dem Abgleich (Stück):")
+    print(gesamt[["Monat"] + [f"{q}_Basis" for q in Q_NAMEN]].round(0).to_string(index=False))
+
+    breiten = bandbreiten(ergebnis)
+    print(f"\n📊 Median relative Bandbreite ({Q_NAMEN[-1]} - {Q_NAMEN[0]}) / {Q_NAMEN[len(Q_NAMEN) // 2]} je Ebene:")
+    print(breiten.round(3).to_string(index=False))
+    plot_intervalle(ergebnis)
+    save_results(ergebnis, breiten)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+
+from stufen import lade_stufe
+from cache import daten_fingerprint, lade_cache, speichere_cache
+from exponentielle_glaettung import serien_matrix
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/final"
+OUTPUT_FILE_EXCEL = "Saisonprofile.xlsx"
+WERT_COL = "wavor_bstlmg"   # wie in Schritt 1 (plot_task_seasonality)
+
+PROFIL_EBENEN = {
+    "Teilegruppe": ["Baumarktartikel"],
+    "Kunde": ["Baumarkt"],
+    "Teilegruppe x Kunde": ["Baumarktartikel", "Baumarkt"],
+    "Artikel x Kunde": ["matnr", "Baumarkt"],   # für Ausreißer- und Strukturbruchtests je Reihe
+}
+SCHLUESSEL_SPALTEN = ["Baumarktartikel", "Baumarkt", "matnr"]
+INDEX_SPALTEN = [f"Index_{m:02d}" for m in range(1, 13)]
+KENNZAHL_SPALTEN = ["Mittelwert", "CV", "Mittelwert_Beobachtet", "CV_Beobachtet", "Saisonstaerke", "Monate"]
+
+# ---------------------------------------------------------
+# 1. BERECHNUNG (vektorisiert über alle Reihen einer Ebene)
+# ---------------------------------------------------------
+
+def _profile_matrix(werte, monate):
+    """
+    Für eine Matrix (Reihen x Monate) in einem Durchlauf:
+    - normierte 12-Monats-Saisonindizes (Mittel = 1.0)
+    - Mittelwert und Variationskoeffizient (Std / Mittel, wie in plot_task_seasonality)
+    - Saisonstärke: max(0, 1 - Var(Rest) / Var(trendbereinigt)), Trend linear
+    """
+    n, t_max = werte.shape
+    monat_im_jahr = np.asarray(monate) % 100 - 1
+    one_hot = np.zeros((t_max, 12))
+    one_hot[np.arange(t_max), monat_im_jahr] = 1.0
+    anzahl = one_hot.sum(axis=0)
+    belegt = anzahl > 0
+
+    mittel = werte.mean(axis=1)
+    std = werte.std(axis=1, ddof=1) if t_max > 1 else np.zeros(n)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        monatsmittel = np.where(belegt, (werte @ one_hot) / anzahl, np.nan)
+        index = monatsmittel / np.nanmean(monatsmittel, axis=1, keepdims=True)
+        cv = np.where(mittel > 0, std / mittel, 0.0)
+
+        # Linearer Trend pro Reihe (kleinste Quadrate, für alle Reihen gleichzeitig)
+        t = np.arange(t_max) - (t_max - 1) / 2
+        steigung = (werte @ t) / max((t ** 2).sum(), 1)
+        bereinigt = werte - mittel[:, None] - steigung[:, None] * t[None, :]
+        saison = np.where(belegt, (bereinigt @ one_hot) / anzahl, 0.0)
+        saison = saison - saison[:, belegt].mean(axis=1, keepdims=True)
+        rest = bereinigt - saison[:, monat_im_jahr]
+        var_bereinigt = bereinigt.var(axis=1)
+        staerke = np.where(var_bereinigt > 0, np.clip(1 - rest.var(axis=1) / var_bereinigt, 0, 1), 0.0)
+
+    index = np.nan_to_num(index, nan=1.0)
+    return index, mittel, cv, staerke
+
+
+def _beobachtete_kennzahlen(werte, beobachtet):
+    """
+    Mittelwert und CV nur über Monate mit Daten – genau wie plot_task_seasonality in Schritt 1
+    (groupby().agg(std, mean) kennt keine aufgefüllten Nullmonate).
+    """
+    anzahl = beobachtet.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mittel = werte.sum(axis=1) / anzahl
+        abweichung = np.where(beobachtet, werte - mittel[:, None], 0.0)
+        std = np.sqrt((abweichung ** 2).sum(axis=1) / (anzahl - 1))
+        cv = np.nan_to_num(std / mittel, nan=0.0)
+    return mittel, cv
+
+
+def berechne_saisonprofile(df, wert_col=WERT_COL, ebenen=PROFIL_EBENEN):
+    """
+    Saisonprofile für jede Teilegruppe, jeden Kunden und jede Kombination.
+
+    Mittelwert/CV laufen über alle Monate des Zeitraums (fehlende = 0), Mittelwert_Beobachtet/
+    CV_Beobachtet nur über Monate mit Daten (Definition aus Schritt 1).
+
+    Returns:
+        DataFrame: Ebene, Baumarktartikel, Baumarkt, matnr, Index_01..Index_12, Mittelwert, CV,
+                   Mittelwert_Beobachtet, CV_Beobachtet, Saisonstaerke, Monate
+    """
+    teile = []
+    for ebene, schluessel in ebenen.items():
+        werte, schluessel_df, monate = serien_matrix(df, schluessel, "bedmo", wert_col)
+        zeilen, _, _ = serien_matrix(df.assign(_zeilen=1), schluessel, "bedmo", "_zeilen")
+        index, mittel, cv, staerke = _profile_matrix(werte, monate)
+        mittel_beob, cv_beob = _beobachtete_kennzahlen(werte, zeilen > 0)
+
+        teil = schluessel_df.copy()
+        teil.insert(0, "Ebene", ebene)
+        teil[INDEX_SPALTEN] = index
+        teil["Mittelwert"] = mittel
+        teil["CV"] = cv
+        teil["Mittelwert_Beobachtet"] = mittel_beob
+        teil["CV_Beobachtet"] = cv_beob
+        teil["Saisonstaerke"] = staerke
+        teil["Monate"] = len(monate)
+        teile.append(teil)
+
+    profile = pd.concat(teile, ignore_index=True)
+    for col in SCHLUESSEL_SPALTEN:
+        if col not in profile.columns:
+            profile[col] = np.nan
+    return profile[["Ebene"] + SCHLUESSEL_SPALTEN + INDEX_SPALTEN + KENNZAHL_SPALTEN]
+
+
+# ---------------------------------------------------------
+# 2. PERSISTENTER SPEICHER (Fingerabdruck der Daten)
+# ---------------------------------------------------------
+
+def saisonprofile(df, wert_col=WERT_COL):
+    """
+    Gibt die Saisonprofile zurück – aus dem Cache, solange sich die Daten nicht geändert haben.
+    Genutzt von Schritt 1 (Saisonalitäts-Plot), ausreisser.py und strukturbrueche.py.
+    """
+    spalten = SCHLUESSEL_SPALTEN + ["bedmo", wert_col]
+    fingerprint = daten_fingerprint(df[spalten], wert_col, list(PROFIL_EBENEN.items()), KENNZAHL_SPALTEN)
+
+    profile = lade_cache("saisonprofile", fingerprint)
+    if profile is not None:
+        print(f"   ℹ️  Saisonprofile aus Cache geladen ({fingerprint}).")
+        return profile
+
+    start = time.perf_counter()
+    profile = berechne_saisonprofile(df, wert_col)
+    speichere_cache("saisonprofile", fingerprint, profile)
+    print(f"   ✅ Saisonprofile berechnet in {time.perf_counter() - start:.2f}s: {len(profile):,} Profile")
+    return profile
+
+
+def saisonindex_matrix(profile, ebene, schluessel_df):
+    """
+    Die 12 Indizes je Reihe aus dem Speicher, in der Reihenfolge von 'schluessel_df'
+    (z.B. die Schlüssel aus serien_matrix mit den Spalten von PROFIL_EBENEN[ebene]).
+    Reihen ohne Profil bekommen ein flaches Profil (1.0).
+
+    Returns:
+        np.ndarray (n, 12)
+    """
+    schluessel = PROFIL_EBENEN[ebene]
+    auswahl = profile.loc[profile["Ebene"] == ebene, schluessel + INDEX_SPALTEN]
+    index = schluessel_df[schluessel].merge(auswahl, on=schluessel, how="left")[INDEX_SPALTEN]
+    return index.fillna(1.0).to_numpy()
+
+
+def saisonindizes(werte, monate):
+    """
+    Saisonindizes (n, 12) direkt aus einer Matrix – nur für Ausschnitte, die nicht im
+    Speicher liegen (z.B. Backtest-Fenster, die nur die Historie bis zum Ursprung sehen dürfen).
+    """
+    return _profile_matrix(werte, monate)[0]
+
+
+# ---------------------------------------------------------
+# 3. MAIN
+# ---------------------------------------------------------
+
+def main():
+    print("=== SAISONPROFILE (TEILEGRUPPE / KUNDE) ===")
+    stufe2 = lade_stufe(2)
+    rohdaten = stufe2.load_rohdaten()
+    if rohdaten is None:
+        return
+
+    profile = saisonprofile(rohdaten)
+
+    staerkste = profile[profile["Ebene"] == "Teilegruppe"].nlargest(5, "Saisonstaerke")
+    print("   Stärkste Saisonalität (Teilegruppen):")
+    for _, row in staerkste.iterrows():
+        print(f"      {str(row['Baumarktartikel']):25} Stärke {row['Saisonstaerke']:.2f} | CV {row['CV']:.2f}")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE_EXCEL)
+    profile.to_excel(out_path, index=False)
+    print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+
+from stufen import lade_stufe
+from cache import daten_fingerprint, lade_cache, speichere_cache
+from exponentielle_glaettung import serien_matrix, matrix_zu_lang, prognose_matrix, monat_zu_index, index_zu_monat
+from strukturbrueche import regime_matrix
+from intermittierende_nachfrage import croston
+from ausreisser import erkenne_ausreisser
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/final"
+OUTPUT_FILE_EXCEL = "ABC_XYZ_Segmentierung.xlsx"
+OUTPUT_FILE_PROGNOSE = "Prognose_nach_Segment.xlsx"
+WERT_COL = "bedmo_mg"   # Tatsächliche Liefermenge (wie fourthStep.py / Top 10 Artikel)
+HORIZONT = 24
+
+A_GRENZE = 0.80         # kumulierter Mengenanteil bis 80% -> A
+B_GRENZE = 0.95         # bis 95% -> B, Rest C
+X_GRENZE = 0.5          # Variationskoeffizient bis 0.5 -> X
+Y_GRENZE = 1.0          # bis 1.0 -> Y, Rest Z
+
+SEGMENT_EBENEN = {
+    "Artikel": ["matnr"],
+    "Artikel x Kunde": ["matnr", "Baumarkt"],
+}
+
+# Welche Prognose (Namen wie backtest.METHODEN) und welche Ausreißer-Ersetzung
+# (ausreisser.ersetze) eine Reihe bekommt – nach XYZ-Klasse, C-Teile ohne eigenes Modell.
+PROGNOSE_JE_KLASSE = {"X": "exp_glaettung", "Y": "exp_glaettung_regime", "Z": "sba"}
+GLAETTUNG_JE_KLASSE = {"X": "saison", "Y": "median", "Z": "kappen"}
+PROGNOSE_C_TEILE = "erp_jahr1"
+
+# ---------------------------------------------------------
+# 1. KLASSIFIKATION (ein sortierter Durchlauf pro Ebene)
+# ---------------------------------------------------------
+
+def abc_klassen(summen, a_grenze=A_GRENZE, b_grenze=B_GRENZE):
+    """
+    Sortiert einmal absteigend und klassifiziert über die kumulierte Summe.
+    Entscheidend ist der Anteil VOR dem Element, damit das größte Element immer A ist.
+
+    Returns:
+        klassen (np.ndarray von 'A'/'B'/'C'), kumulierter Anteil (inkl. Element), Rang (1 = größtes)
+    """
+    summen = np.asarray(summen, dtype=float)
+    reihenfolge = np.argsort(-summen, kind="stable")
+    gesamt = summen.sum()
+    kumuliert = np.cumsum(summen[reihenfolge]) / gesamt if gesamt > 0 else np.zeros(len(summen))
+    davor = np.concatenate([[0.0], kumuliert[:-1]])
+
+    klassen_sortiert = np.where(davor < a_grenze, "A", np.where(davor < b_grenze, "B", "C"))
+    klassen_sortiert[summen[reihenfolge] <= 0] = "C"
+
+    klassen = np.empty(len(summen), dtype=object)
+    anteil = np.empty(len(summen))
+    rang = np.empty(len(summen), dtype=int)
+    klassen[reihenfolge] = klassen_sortiert
+    anteil[reihenfolge] = kumuliert
+    rang[reihenfolge] = np.arange(1, len(summen) + 1)
+    return klassen, anteil, rang
+
+
+def xyz_klassen(werte, x_grenze=X_GRENZE, y_grenze=Y_GRENZE):
+    """
+    Variationskoeffizient der Monatsmengen (Std / Mittel) pro Reihe, ab dem ersten Monat mit Bedarf:
+    Monate vor der Listung (die gemeinsame Matrix beginnt beim ältesten Artikel) sind kein Null-Bedarf.
+    Reihen mit weniger als zwei Monaten sind Z.
+    """
+    n, t_max = werte.shape
+    bedarf = werte > 0
+    erster = np.where(bedarf.any(axis=1), bedarf.argmax(axis=1), t_max)
+    aktiv = np.arange(t_max)[None, :] >= erster[:, None]
+    anzahl = aktiv.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mittel = np.where(aktiv, werte, 0).sum(axis=1) / anzahl
+        varianz = np.where(aktiv, (werte - mittel[:, None]) ** 2, 0).sum(axis=1) / (anzahl - 1)
+        cv = np.where((anzahl > 1) & (mittel > 0), np.sqrt(varianz) / mittel, np.inf)
+    klassen = np.where(cv <= x_grenze, "X", np.where(cv <= y_grenze, "Y", "Z")).astype(object)
+    return klassen, cv
+
+
+def berechne_segmente(df, wert_col=WERT_COL, ebenen=SEGMENT_EBENEN):
+    """
+    ABC/XYZ-Klassen für alle Artikel und alle Artikel x Kunde (Baumarkt wie clean_keys bereinigt).
+
+    Returns:
+        DataFrame: Ebene, matnr, Baumarkt, Menge, Anteil_kumuliert, Rang, ABC, CV, XYZ, Klasse,
+        Prognosemethode, Glaettung
+    """
+    df = _normierte_reihen(df, wert_col)
+    teile = []
+    for ebene, schluessel in ebenen.items():
+        werte, schluessel_df, _ = serien_matrix(df, schluessel, "bedmo", wert_col)
+        summen = werte.sum(axis=1)
+        abc, anteil, rang = abc_klassen(summen)
+        xyz, cv = xyz_klassen(werte)
+
+        teil = schluessel_df.copy()
+        teil.insert(0, "Ebene", ebene)
+        teil["Menge"] = summen
+        teil["Anteil_kumuliert"] = anteil
+        teil["Rang"] = rang
+        teil["ABC"] = abc
+        teil["CV"] = cv
+        teil["XYZ"] = xyz
+        teile.append(teil)
+
+    segmente = pd.concat(teile, ignore_index=True)
+    if "Baumarkt" not in segmente.columns:
+        segmente["Baumarkt"] = np.nan
+    segmente["Klasse"] = segmente["ABC"] + segmente["XYZ"]
+    return routing(segmente)
+
+
+def _normierte_reihen(df, wert_col):
+    """matnr, Baumarkt (norm_kunde), bedmo und Wert – dieselben Reihen wie in Schritt 3."""
+    return pd.DataFrame({
+        "matnr": df["matnr"],
+        "Baumarkt": lade_stufe(3).norm_kunde(df["Baumarkt"]),
+        "bedmo": df["bedmo"],
+        wert_col: df[wert_col],
+    })
+
+
+def routing(segmente):
+    """Ordnet jeder Reihe Prognose- und Glättungsmethode nach ihrer Klasse zu."""
+    segmente["Prognosemethode"] = np.where(
+        segmente["ABC"] == "C", PROGNOSE_C_TEILE, segmente["XYZ"].map(PROGNOSE_JE_KLASSE)
+    )
+    segmente["Glaettung"] = segmente["XYZ"].map(GLAETTUNG_JE_KLASSE)
+    return segmente
+
+
+# ---------------------------------------------------------
+# 2. PERSISTENTE KLASSEN (Fingerabdruck der Daten)
+# ---------------------------------------------------------
+
+def segmentierung(df, wert_col=WERT_COL):
+    """
+    Gibt die Klassen zurück – aus dem Cache, solange sich die Daten nicht geändert haben.
+    Der Fingerabdruck steht in jeder Zeile, damit nachgelagerte Stufen prüfen können,
+    ob die Klassen zu ihren Daten passen.
+    """
+    grenzen = (A_GRENZE, B_GRENZE, X_GRENZE, Y_GRENZE)
+    zuordnung = (PROGNOSE_JE_KLASSE, GLAETTUNG_JE_KLASSE, PROGNOSE_C_TEILE)
+    fingerprint = daten_fingerprint(
+        _normierte_reihen(df, wert_col), wert_col, grenzen, zuordnung, list(SEGMENT_EBENEN.items())
+    )
+
+    segmente = lade_cache("segmentierung", fingerprint)
+    if segmente is not None:
+        print(f"   ℹ️  ABC/XYZ-Klassen aus Cache geladen ({fingerprint}).")
+        return segmente
+
+    start = time.perf_counter()
+    segmente = berechne_segmente(df, wert_col)
+    segmente["Fingerprint"] = fingerprint
+    speichere_cache("segmentierung", fingerprint, segmente)
+    print(f"   ✅ ABC/XYZ-Klassen berechnet in {time.perf_counter() - start:.2f}s: {len(segmente):,} Reihen")
+    return segmente
+
+
+# ---------------------------------------------------------
+# 3. PROGNOSE NACH SEGMENT (Routing anwenden)
+# ---------------------------------------------------------
+
+def _rechne_methode(methode, werte, monate, horizont):
+    """Prognosematrix (n, horizont) für die statistischen Methoden aus PROGNOSE_JE_KLASSE."""
+    if methode == "exp_glaettung":
+        return prognose_matrix(werte, horizont=horizont)[0]
+    if methode == "exp_glaettung_regime":
+        return prognose_matrix(regime_matrix(werte, monate), horizont=horizont)[0]
+    if methode == "sba":
+        return np.repeat(croston(werte, "sba")[:, None], horizont, axis=1)
+    raise ValueError(f"Unbekannte Prognosemethode: '{methode}'")
+
+
+def _erp_matrix(df_raw, schluessel_df, zukunft):
+    """ERP-Prognose (prog_mg1 / prog_mg2 wie in Schritt 3) für die gewählten Reihen und Monate."""
+    erp = lade_stufe(3).prepare_forecast(df_raw)
+    erp = erp[erp["Monat"].isin(zukunft)].groupby(["Artikel", "Kunde", "Monat"])["Menge"].sum()
+    erp = erp.unstack("Monat").reindex(columns=zukunft)
+    index = pd.MultiIndex.from_frame(schluessel_df[["matnr", "Baumarkt"]])
+    return erp.reindex(index).fillna(0.0).to_numpy()
+
+
+def prognose_geroutet(df_raw, segmente, horizont=HORIZONT, wert_col=WERT_COL):
+    """
+    Prognose für alle Artikel x Kunde Reihen nach ihrer Klasse (routing):
+    erst die Ausreißer-Ersetzung aus 'Glaettung', dann die Methode aus 'Prognosemethode'
+    (C-Teile: ERP-Prognose ohne eigenes Modell).
+
+    Returns:
+        DataFrame: Artikel, Kunde, Gruppe, Monat, Menge, Methode, Klasse (Format wie prognose_baseline)
+    """
+    werte, schluessel_df, monate = serien_matrix(_normierte_reihen(df_raw, wert_col), ("matnr", "Baumarkt"),
+                                                 "bedmo", wert_col)
+    zuordnung = segmente[segmente["Ebene"] == "Artikel x Kunde"].set_index(["matnr", "Baumarkt"])
+    zuordnung = zuordnung.reindex(pd.MultiIndex.from_frame(schluessel_df))
+    methode = zuordnung["Prognosemethode"].fillna(PROGNOSE_JE_KLASSE["Z"]).to_numpy()
+    glaettung = zuordnung["Glaettung"].fillna(GLAETTUNG_JE_KLASSE["Z"]).to_numpy()
+
+    letzter = monat_zu_index(monate[-1])
+    zukunft = index_zu_monat(np.arange(letzter + 1, letzter + 1 + horizont))
+
+    bereinigt = werte.copy()
+    for strategie in np.unique(glaettung):
+        zeilen = glaettung == strategie
+        bereinigt[zeilen] = erkenne_ausreisser(werte[zeilen], monate, strategie)["geglaettet"]
+
+    prognose = np.zeros((len(werte), horizont))
+    for name in np.unique(methode):
+        zeilen = methode == name
+        if name == PROGNOSE_C_TEILE:
+            prognose[zeilen] = _erp_matrix(df_raw, schluessel_df[zeilen], zukunft)
+        else:
+            prognose[zeilen] = _rechne_methode(name, bereinigt[zeilen], monate, horizont)
+
+    schluessel = schluessel_df.rename(columns={"matnr": "Artikel", "Baumarkt": "Kunde"})
+    schluessel["Methode"] = methode
+    schluessel["Klasse"] = zuordnung["Klasse"].to_numpy()
+    stufe3 = lade_stufe(3)
+    gruppen = pd.DataFrame({
+        "Artikel": df_raw["matnr"],
+        "Kunde": stufe3.norm_kunde(df_raw["Baumarkt"]),
+        "Gruppe": df_raw["Baumarktartikel"],
+    }).dropna(subset=["Gruppe"]).drop_duplicates(["Artikel", "Kunde"])
+    schluessel = schluessel.merge(gruppen, on=["Artikel", "Kunde"], how="left")
+    schluessel["Gruppe"] = stufe3.norm_gruppe(schluessel["Gruppe"])
+
+    df_prognose = matrix_zu_lang(np.clip(prognose, 0, None), schluessel, zukunft, "Menge")
+    df_prognose["Menge"] = df_prognose["Menge"].round(0).astype(int)
+    return df_prognose[["Artikel", "Kunde", "Gruppe", "Monat", "Menge", "Methode", "Klasse"]]
+
+
+# ---------------------------------------------------------
+# 4. MAIN
+# ---------------------------------------------------------
+
+def main():
+    print("=== ABC/XYZ-SEGMENTIERUNG ===")
+    stufe2 = lade_stufe(2)
+    rohdaten = stufe2.load_rohdaten()
+    if rohdaten is None:
+        return
+
+    segmente = segmentierung(rohdaten)
+
+    for ebene, teil in segmente.groupby("Ebene", sort=False):
+        print(f"\n   {ebene}:")
+        matrix = pd.crosstab(teil["ABC"], teil["XYZ"])
+        print("      " + matrix.to_string().replace("\n", "\n      "))
+
+    start = time.perf_counter()
+    df_prognose = prognose_geroutet(rohdaten, segmente)
+    print(f"\n   ✅ Prognose nach Segment in {time.perf_counter() - start:.1f}s: {len(df_prognose):,} Zeilen")
+    for methode, anzahl in df_prognose.drop_duplicates(["Artikel", "Kunde"])["Methode"].value_counts().items():
+        print(f"      - {methode}: {anzahl:,} Reihen")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE_EXCEL)
+    segmente.to_excel(out_path, index=False)
+    prognose_pfad = os.path.join(OUTPUT_DIR, OUTPUT_FILE_PROGNOSE)
+    df_prognose.to_excel(prognose_pfad, index=False)
+    print(f"\n✅ FERTIG! Dateien gespeichert: {out_path}, {prognose_pfad}")
+
+
+if __name__ == "__main__":
+    main()
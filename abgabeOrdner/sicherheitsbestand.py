@@ -0,0 +1,202 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+
+from stufen import lade_stufe
+from genauigkeit import vergleichstabelle
+from exponentielle_glaettung import serien_matrix
+
+# --- KONFIGURATION ---
+INPUT_FILE_FINAL = "./output/final/Final_Forecast_2026_2027.xlsx"
+OUTPUT_DIR = "./output/final"            # neben dem abgeglichenen Forecast
+OUTPUT_FILE_EXCEL = "Sicherheitsbestand.xlsx"
+SERVICEGRAD = 0.95                       # Zielwahrscheinlichkeit, dass der Bestand den Bedarf deckt
+WIEDERBESCHAFFUNGSZEIT = 1               # Monate
+MIN_BEOBACHTUNGEN = 6                    # weniger Fehlermonate -> Quantil der Teilegruppe x Kunde
+# Rückfallebenen für kurze Reihen (relative Fehler), von eng nach weit
+RUECKFALL_EBENEN = {
+    "Teilegruppe x Kunde": ["Gruppe", "Kunde"],
+    "Kunde": ["Kunde"],
+    "Gesamt": [],
+}
+HORIZONT = 1                             # prog_mg1 (Jahr 1) vs. bedmo_mg
+
+# ---------------------------------------------------------
+# 1. GRUPPIERTE EMPIRISCHE QUANTILE
+# ---------------------------------------------------------
+
+def gruppen_quantil(codes, werte, q):
+    """
+    Quantil je Gruppe in einem Durchlauf (einmal sortieren statt Schleife über Reihen).
+    Lineare Interpolation wie np.quantile / groupby().quantile().
+
+    Args:
+        codes: Gruppennummer 0..n-1 je Beobachtung
+        werte: Beobachtungen (NaN wird ignoriert)
+
+    Returns:
+        quantile (n,), anzahl (n,)
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    werte = np.asarray(werte, dtype=float)
+    n_gruppen = codes.max() + 1 if len(codes) else 0
+    gueltig = ~np.isnan(werte)
+    codes, werte = codes[gueltig], werte[gueltig]
+
+    reihenfolge = np.lexsort((werte, codes))
+    sortiert = werte[reihenfolge]
+    anzahl = np.bincount(codes, minlength=n_gruppen)
+    start = np.concatenate([[0], np.cumsum(anzahl)[:-1]])
+
+    quantile = np.full(n_gruppen, np.nan)
+    vorhanden = anzahl > 0
+    position = q * (anzahl[vorhanden] - 1)
+    unten = np.floor(position).astype(np.int64)
+    oben = np.minimum(unten + 1, anzahl[vorhanden] - 1)
+    anteil = position - unten
+    a = sortiert[start[vorhanden] + unten]
+    b = sortiert[start[vorhanden] + oben]
+    quantile[vorhanden] = a + (b - a) * anteil
+    return quantile, anzahl
+
+
+# ---------------------------------------------------------
+# 2. SICHERHEITSBESTAND JE ARTIKEL x KUNDE
+# ---------------------------------------------------------
+
+def prognosefehler(df_raw, horizont=HORIZONT):
+    """
+    Historische Fehler je Artikel x Kunde x Monat: Ist (bedmo_mg) - Prognose (prog_mg1).
+    Positiv = Bedarf höher als prognostiziert (diese Seite muss der Sicherheitsbestand abdecken).
+    Nur Monate mit Prognose > 0 (wie in prognoseintervalle.py): ohne Prognose ergänzt vergleichstabelle
+    eine 0, der "Fehler" wäre dann das ganze Ist und der Sicherheitsbestand viel zu hoch.
+    """
+    vergleich = vergleichstabelle(df_raw)
+    vergleich = vergleich[(vergleich["Horizont"] == horizont) & (vergleich["Prognose"] > 0)].copy()
+    vergleich["Fehler"] = vergleich["Ist"] - vergleich["Prognose"]
+    return vergleich
+
+
+def sicherheitsbestand(fehler, servicegrad=SERVICEGRAD, wbz=WIEDERBESCHAFFUNGSZEIT, min_beobachtungen=MIN_BEOBACHTUNGEN):
+    """
+    Sicherheitsbestand je Artikel x Kunde = Servicegrad-Quantil der Monatsfehler x Wurzel(WBZ).
+
+    Reihen mit weniger als min_beobachtungen Fehlermonaten nutzen das Quantil der relativen Fehler
+    (Fehler / mittlere Prognose) ihrer Teilegruppe x Kunde, skaliert mit der eigenen mittleren Prognose.
+    Ist dort kein Quantil bestimmbar, wird die nächst weitere Ebene aus RUECKFALL_EBENEN genommen.
+    Bleibt es ohne Quantil, steht Quantil_Quelle auf "ohne Quantil" und der Sicherheitsbestand auf NaN
+    (nicht stillschweigend 0). Negative Quantile (Prognose systematisch zu hoch) ergeben Sicherheitsbestand 0.
+
+    Returns:
+        DataFrame: Artikel, Kunde, Gruppe, Beobachtungen, Mittl_Prognose, Fehler_Quantil, Quantil_Quelle, Sicherheitsbestand
+    """
+    if fehler.empty:
+        return pd.DataFrame(columns=["Artikel", "Kunde", "Gruppe", "Beobachtungen", "Mittl_Prognose",
+                                     "Fehler_Quantil", "Quantil_Quelle", "Sicherheitsbestand"])
+
+    reihen_codes = fehler.groupby(["Artikel", "Kunde"], sort=False, dropna=False).ngroup().to_numpy()
+    reihen = fehler.drop_duplicates(["Artikel", "Kunde"])[["Artikel", "Kunde", "Gruppe"]].reset_index(drop=True)
+    quantil, anzahl = gruppen_quantil(reihen_codes, fehler["Fehler"].to_numpy(), servicegrad)
+    niveau = np.bincount(reihen_codes, weights=fehler["Prognose"].to_numpy()) / np.maximum(anzahl, 1)
+
+    kurz = anzahl < min_beobachtungen
+    fehler_quantil = np.where(kurz, np.nan, quantil)
+    quelle = np.where(kurz, "ohne Quantil", "Artikel x Kunde").astype(object)
+
+    # Rückfall für kurze Reihen: relative Fehler, erst Teilegruppe x Kunde, dann weiter
+    relativ = fehler["Fehler"].to_numpy() / np.where(niveau[reihen_codes] > 0, niveau[reihen_codes], np.nan)
+    for ebene, spalten in RUECKFALL_EBENEN.items():
+        offen = np.isnan(fehler_quantil)
+        if not offen.any():
+            break
+        if spalten:
+            codes_reihe = reihen.groupby(spalten, sort=False, dropna=False).ngroup().to_numpy()
+        else:
+            codes_reihe = np.zeros(len(reihen), dtype=np.int64)
+        ebenen_quantile, _ = gruppen_quantil(codes_reihe[reihen_codes], relativ, servicegrad)
+        rueckfall = ebenen_quantile[codes_reihe] * niveau
+        neu = offen & ~np.isnan(rueckfall)
+        fehler_quantil[neu] = rueckfall[neu]
+        quelle[neu] = ebene
+
+    reihen["Beobachtungen"] = anzahl
+    reihen["Mittl_Prognose"] = niveau
+    reihen["Fehler_Quantil"] = fehler_quantil
+    reihen["Quantil_Quelle"] = quelle
+    reihen["Sicherheitsbestand"] = np.ceil(np.clip(fehler_quantil, 0, None) * np.sqrt(wbz))
+    return reihen
+
+
+# ---------------------------------------------------------
+# 3. MELDEBESTAND NEBEN DEM ABGEGLICHENEN FORECAST
+# ---------------------------------------------------------
+
+def meldebestand(df_final, bestand, wbz=WIEDERBESCHAFFUNGSZEIT):
+    """
+    Je Artikel x Kunde x Monat: abgeglichener Bedarf (Menge_Geglaettet), Bedarf während der
+    Wiederbeschaffungszeit (dieser + folgende wbz-1 Monate) und Meldebestand = WBZ-Bedarf + Sicherheitsbestand.
+    """
+    final = df_final.assign(Kunde=lade_stufe(3).norm_kunde(df_final["Kunde"]))
+    werte, schluessel_df, monate = serien_matrix(final, ("Artikel", "Kunde"), "Monat", "Menge_Geglaettet")
+
+    # Vorwärtssumme über wbz Monate für alle Reihen auf einmal
+    kum = np.concatenate([np.zeros((len(werte), 1)), np.cumsum(werte, axis=1)], axis=1)
+    ende = np.minimum(np.arange(werte.shape[1]) + wbz, werte.shape[1])
+    wbz_bedarf = kum[:, ende] - kum[:, :-1]
+
+    df = schluessel_df.loc[schluessel_df.index.repeat(len(monate))].reset_index(drop=True)
+    df["Monat"] = np.tile(monate, len(schluessel_df))
+    df["Menge_Geglaettet"] = werte.ravel()
+    df["Bedarf_WBZ"] = wbz_bedarf.ravel()
+    df = df.merge(bestand[["Artikel", "Kunde", "Sicherheitsbestand", "Quantil_Quelle"]], on=["Artikel", "Kunde"], how="left")
+    # nur Reihen ohne Fehlerhistorie bekommen 0; "ohne Quantil" bleibt NaN und damit sichtbar
+    ohne_historie = df["Quantil_Quelle"].isna()
+    df.loc[ohne_historie, "Sicherheitsbestand"] = 0
+    df["Quantil_Quelle"] = df["Quantil_Quelle"].fillna("ohne Historie")
+    df["Meldebestand"] = np.ceil(df["Bedarf_WBZ"] + df["Sicherheitsbestand"])
+    return df[df["Menge_Geglaettet"] != 0].reset_index(drop=True)
+
+
+def berechne(df_raw, df_final, servicegrad=SERVICEGRAD, wbz=WIEDERBESCHAFFUNGSZEIT):
+    start = time.perf_counter()
+    bestand = sicherheitsbestand(prognosefehler(df_raw), servicegrad, wbz)
+    df = meldebestand(df_final, bestand, wbz)
+    print(f"   ✅ Sicherheitsbestand für {len(bestand):,} Artikel x Kunde, {len(df):,} Forecast-Zeilen "
+          f"in {time.perf_counter() - start:.2f}s (Servicegrad {servicegrad:.0%}, WBZ {wbz} Monat(e))")
+    return bestand, df
+
+
+# ---------------------------------------------------------
+# 4. SPEICHERN & MAIN
+# ---------------------------------------------------------
+
+def save_results(bestand, df, out_dir=OUTPUT_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, OUTPUT_FILE_EXCEL)
+    with pd.ExcelWriter(out_path) as writer:
+        bestand.to_excel(writer, sheet_name="Je Artikel", index=False)
+        df.to_excel(writer, sheet_name="Meldebestand", index=False)
+    print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+
+
+def main():
+    print("=== SICHERHEITSBESTAND & MELDEBESTAND ===")
+    rohdaten = lade_stufe(2).load_rohdaten()
+    if rohdaten is None:
+        return
+    if not os.path.exists(INPUT_FILE_FINAL):
+        print(f"❌ Fehler: {INPUT_FILE_FINAL} fehlt. Bitte erst Schritt 3 ausführen.")
+        return
+    df_final = pd.read_excel(INPUT_FILE_FINAL)
+
+    bestand, df = berechne(rohdaten, df_final)
+    quellen = bestand["Quantil_Quelle"].value_counts()
+    for quelle, anzahl in quellen.items():
+        print(f"   {quelle:22} {anzahl:6,} Reihen")
+    print(f"   Summe Sicherheitsbestand: {bestand['Sicherheitsbestand'].sum():,.0f} Stück")
+    save_results(bestand, df)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import json
+import stat
+import time
+import shutil
+import hashlib
+from datetime import datetime
+
+from cache import daten_fingerprint
+
+# --- KONFIGURATION ---
+SNAPSHOT_DIR = "./output/snapshots"
+KATALOG_DATEI = "katalog.jsonl"
+SCHLUESSEL_DATEI = "schluessel.json"
+MANIFEST_DATEI = "manifest.json"
+SPERR_DATEI = "schreiben.lock"      # nur ein Schreiber je Ablage (Versionsnummer + Schlüsselliste)
+SPERRE_WARTEN = 300                 # Sekunden, die ein zweiter Lauf auf die Sperre wartet
+PARTITION_COL = "Jahr"              # eine Datei pro Prognosejahr
+DIFF_WERTE = ["Menge", "Menge_Geglaettet"]
+DIFF_TOLERANZ = 0.5                 # kleinere Abweichungen gelten als unverändert (Rundung)
+
+# Bit-Aufteilung des int64-Schlüssels: Artikel | Kunde (16 Bit) | Monat seit 2000 (12 Bit)
+KUNDE_BITS = 16
+MONAT_BITS = 12
+
+# ---------------------------------------------------------
+# 1. HILFSFUNKTIONEN
+# ---------------------------------------------------------
+
+def _format():
+    """Parquet (spaltenweise, komprimiert), falls pyarrow installiert ist, sonst gzip-Pickle."""
+    try:
+        import pyarrow  # noqa: F401
+        return "parquet"
+    except ImportError:
+        return "pkl.gz"
+
+
+def datei_hash(pfad, block=1 << 20):
+    """SHA-256 über den Dateiinhalt (blockweise, auch für große Extrakte)."""
+    h = hashlib.sha256()
+    with open(pfad, "rb") as f:
+        for teil in iter(lambda: f.read(block), b""):
+            h.update(teil)
+    return h.hexdigest()
+
+
+def _schreibgeschuetzt(pfad):
+    os.chmod(pfad, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+
+def _prozess_laeuft(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def _sperre(store, warten=SPERRE_WARTEN):
+    """
+    Sperrdatei (O_EXCL) für die Ablage: Versionsnummer vergeben, Schlüsselliste erweitern und
+    Katalog schreiben darf immer nur ein Lauf. Ein zweiter wartet; die Sperre eines beendeten
+    Prozesses wird übernommen.
+    """
+    pfad = os.path.join(store, SPERR_DATEI)
+    ende = time.monotonic() + warten
+    while True:
+        try:
+            fd = os.open(pfad, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return pfad
+        except FileExistsError:
+            try:
+                with open(pfad) as f:
+                    pid = int(f.read().strip() or 0)
+            except (FileNotFoundError, ValueError):
+                pid = 0
+            if pid and not _prozess_laeuft(pid):
+                print(f"   ⚠️ Verwaiste Snapshot-Sperre (PID {pid}) wird übernommen.")
+                try:
+                    os.remove(pfad)
+                except FileNotFoundError:
+                    pass
+                continue
+            if time.monotonic() > ende:
+                raise TimeoutError(f"Snapshot-Ablage gesperrt (PID {pid}); sonst {pfad} löschen.")
+            time.sleep(0.2)
+
+
+# ---------------------------------------------------------
+# 2. GANZZAHLIGE SCHLÜSSEL (über alle Versionen stabil)
+# ---------------------------------------------------------
+
+def lade_schluessel(store=SNAPSHOT_DIR):
+    pfad = os.path.join(store, SCHLUESSEL_DATEI)
+    if not os.path.exists(pfad):
+        return {"Artikel": [], "Kunde": []}
+    with open(pfad, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _kodiere(werte, liste):
+    """Text -> Code über eine Liste, die nur wächst. Neue Werte bekommen die nächsten Codes."""
+    werte = werte.astype(str)
+    bekannt = pd.Index(liste)
+    neu = pd.Index(werte.unique()).difference(bekannt)
+    liste.extend(neu.tolist())
+    return pd.Index(liste).get_indexer(werte).astype(np.int64)
+
+
+def int_schluessel(df, schluessel):
+    """
+    Packt (Artikel, Kunde, Monat) in einen int64 – Joins und Gruppierungen laufen dann
+    über eine einzige Ganzzahlspalte (Hash-Join ohne Textvergleiche).
+    """
+    artikel = _kodiere(df["Artikel"], schluessel["Artikel"])
+    kunde = _kodiere(df["Kunde"], schluessel["Kunde"])
+    if len(schluessel["Kunde"]) >= 1 << KUNDE_BITS:
+        raise ValueError("Zu viele Kunden für den int64-Schlüssel")
+    monat = pd.to_numeric(df["Monat"], errors="coerce").fillna(0).astype(np.int64)
+    monat_index = np.clip((monat // 100 - 2000) * 12 + monat % 100 - 1, 0, (1 << MONAT_BITS) - 1)
+    return (artikel << (KUNDE_BITS + MONAT_BITS)) | (kunde << MONAT_BITS) | monat_index
+
+
+def dekodiere(schluessel_int, schluessel):
+    """int64-Schlüssel zurück in Artikel, Kunde, Monat (JJJJMM)."""
+    schluessel_int = np.asarray(schluessel_int, dtype=np.int64)
+    monat_index = schluessel_int & ((1 << MONAT_BITS) - 1)
+    kunde = (schluessel_int >> MONAT_BITS) & ((1 << KUNDE_BITS) - 1)
+    artikel = schluessel_int >> (KUNDE_BITS + MONAT_BITS)
+    return pd.DataFrame({
+        "Artikel": np.asarray(schluessel["Artikel"], dtype=object)[artikel],
+        "Kunde": np.asarray(schluessel["Kunde"], dtype=object)[kunde],
+        "Monat": (2000 + monat_index // 12) * 100 + monat_index % 12 + 1,
+    })
+
+
+# ---------------------------------------------------------
+# 3. SNAPSHOTS SCHREIBEN / LESEN
+# ---------------------------------------------------------
+
+def katalog(store=SNAPSHOT_DIR):
+    """Alle Versionen (eine Zeile je Snapshot) in Schreibreihenfolge."""
+    pfad = os.path.join(store, KATALOG_DATEI)
+    if not os.path.exists(pfad):
+        return pd.DataFrame(columns=["version", "erstellt", "zeilen", "plan_version"])
+    with open(pfad, encoding="utf-8") as f:
+        return pd.DataFrame([json.loads(z) for z in f if z.strip()])
+
+
+def speichere_snapshot(df_final, eingaben=None, plan_version=None, store=SNAPSHOT_DIR, notiz=None):
+    """
+    Legt eine neue, unveränderliche Version an: Partitionen je Prognosejahr (komprimiert),
+    manifest.json mit Eingabe-Hashes und Planversion, Eintrag im Katalog.
+    Geschrieben wird in ein temporäres Verzeichnis, das erst am Ende umbenannt wird.
+
+    Args:
+        eingaben: dict Name -> Dateipfad (z.B. rohdaten, baumarktprogramm); es wird der Inhalts-Hash gespeichert
+
+    Die ganze Vergabe (Versionsnummer, Schlüsselliste, Katalog) läuft unter einer Sperrdatei,
+    damit parallele Läufe weder dieselbe Nummer bekommen noch Schlüssel-Codes verlieren.
+
+    Returns:
+        Versionsname (z.B. 'v0003')
+    """
+    os.makedirs(store, exist_ok=True)
+    sperre = _sperre(store)
+    try:
+        return _speichere_snapshot(df_final, eingaben, plan_version, store, notiz)
+    finally:
+        os.remove(sperre)
+
+
+def _speichere_snapshot(df_final, eingaben, plan_version, store, notiz):
+    vorhandene = katalog(store)
+    nummer = 1 if vorhandene.empty else int(vorhandene["version"].str[1:].astype(int).max()) + 1
+    version = f"v{nummer:04d}"
+    ziel = os.path.join(store, version)
+    tmp = f"{ziel}.{os.getpid()}.tmp"
+    os.makedirs(tmp)
+
+    start = time.perf_counter()
+    schluessel = lade_schluessel(store)
+    df = df_final.copy()
+    df["_key"] = int_schluessel(df, schluessel)
+    df[PARTITION_COL] = pd.to_numeric(df["Monat"], errors="coerce").fillna(0).astype(int) // 100
+
+    format_ = _format()
+    partitionen = {}
+    for jahr, teil in df.groupby(PARTITION_COL):
+        datei = f"{PARTITION_COL.lower()}={jahr}.{format_}"
+        pfad = os.path.join(tmp, datei)
+        teil = teil.drop(columns=[PARTITION_COL]).reset_index(drop=True)
+        if format_ == "parquet":
+            teil.to_parquet(pfad, index=False, compression="zstd")
+        else:
+            teil.to_pickle(pfad, compression={"method": "gzip", "compresslevel": 1})
+        _schreibgeschuetzt(pfad)
+        partitionen[datei] = len(teil)
+
+    manifest = {
+        "version": version,
+        "erstellt": datetime.now().isoformat(timespec="seconds"),
+        "zeilen": len(df),
+        "fingerprint": daten_fingerprint(df_final),
+        "plan_version": plan_version,
+        "eingaben": {name: {"pfad": pfad, "sha256": datei_hash(pfad) if os.path.exists(pfad) else None}
+                     for name, pfad in (eingaben or {}).items()},
+        "partitionen": partitionen,
+        "spalten": {c: str(t) for c, t in df_final.dtypes.items()},
+        "format": format_,
+        "notiz": notiz,
+    }
+    with open(os.path.join(tmp, MANIFEST_DATEI), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    _schreibgeschuetzt(os.path.join(tmp, MANIFEST_DATEI))
+
+    # Schlüsselliste nur erweitern (atomar), dann Version sichtbar machen
+    schluessel_pfad = os.path.join(store, SCHLUESSEL_DATEI)
+    with open(f"{schluessel_pfad}.tmp", "w", encoding="utf-8") as f:
+        json.dump(schluessel, f, ensure_ascii=False)
+    os.replace(f"{schluessel_pfad}.tmp", schluessel_pfad)
+    os.rename(tmp, ziel)
+    with open(os.path.join(store, KATALOG_DATEI), "a", encoding="utf-8") as f:
+        eintrag = {k: manifest[k] for k in ["version", "erstellt", "zeilen", "plan_version", "fingerprint"]}
+        f.write(json.dumps(eintrag, ensure_ascii=False) + "\n")
+
+    if not vorhandene.empty and vorhandene["fingerprint"].iloc[-1] == manifest["fingerprint"]:
+        print(f"   ℹ️  Snapshot {version} ist inhaltsgleich mit {vorhandene['version'].iloc[-1]}.")
+    print(f"   ✅ Snapshot {version} gespeichert: {len(df):,} Zeilen, {len(partitionen)} Partitionen "
+          f"in {time.perf_counter() - start:.1f}s")
+    return version
+
+
+def _version(angabe, store=SNAPSHOT_DIR):
+    """'v0003', '3' oder negative Position ('-1' = neueste, '-2' = vorletzte)."""
+    liste = katalog(store)["version"].tolist()
+    if not liste:
+        raise FileNotFoundError(f"Keine Snapshots in {store}")
+    angabe = str(angabe)
+    if angabe.lstrip("-").isdigit() and angabe.startswith("-"):
+        return liste[int(angabe)]
+    if angabe.isdigit():
+        angabe = f"v{int(angabe):04d}"
+    if angabe not in liste:
+        raise KeyError(f"Snapshot '{angabe}' nicht vorhanden")
+    return angabe
+
+
+def lade_manifest(version, store=SNAPSHOT_DIR):
+    with open(os.path.join(store, _version(version, store), MANIFEST_DATEI), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def lade_snapshot(version, spalten=None, jahre=None, store=SNAPSHOT_DIR):
+    """Liest eine Version (optional nur einzelne Spalten / Prognosejahre)."""
+    manifest = lade_manifest(version, store)
+    teile = []
+    for datei in manifest["partitionen"]:
+        jahr = int(datei.split("=")[1].split(".")[0])
+        if jahre is not None and jahr not in jahre:
+            continue
+        pfad = os.path.join(store, manifest["version"], datei)
+        if manifest["format"] == "parquet":
+            teile.append(pd.read_parquet(pfad, columns=spalten))
+        else:
+            teil = pd.read_pickle(pfad, compression="gzip")
+            teile.append(teil[spalten] if spalten else teil)
+    return pd.concat(teile, ignore_index=True) if teile else pd.DataFrame(columns=spalten)
+
+
+# ---------------------------------------------------------
+# 4. DIFF ZWISCHEN ZWEI VERSIONEN
+# ---------------------------------------------------------
+
+def _je_schluessel(df, werte):
+    """Mehrere Rohdatenzeilen pro Artikel/Kunde/Monat (z.B. verschiedene Belege) zusammenfassen."""
+    return df.groupby("_key", sort=False)[werte].sum()
+
+
+def diff(version_alt, version_neu, werte=DIFF_WERTE, toleranz=DIFF_TOLERANZ, store=SNAPSHOT_DIR):
+    """
+    Geänderte Zellen zwischen zwei Versionen: Hash-Join über den int64-Schlüssel
+    (Artikel, Kunde, Monat), nur Schlüssel- und Wertspalten werden gelesen.
+
+    Returns:
+        DataFrame: Artikel, Kunde, Monat, Spalte, Alt, Neu, Differenz, Art (neu/entfallen/geaendert)
+    """
+    start = time.perf_counter()
+    version_alt, version_neu = _version(version_alt, store), _version(version_neu, store)
+    alt = _je_schluessel(lade_snapshot(version_alt, ["_key"] + werte, store=store), werte)
+    neu = _je_schluessel(lade_snapshot(version_neu, ["_key"] + werte, store=store), werte)
+    verbunden = alt.join(neu, how="outer", lsuffix="_alt", rsuffix="_neu")
+
+    nur_alt = ~alt.index.isin(neu.index)
+    nur_neu = ~neu.index.isin(alt.index)
+    art_index = pd.Series("geaendert", index=verbunden.index)
+    art_index.loc[alt.index[nur_alt]] = "entfallen"
+    art_index.loc[neu.index[nur_neu]] = "neu"
+
+    teile = []
+    for spalte in werte:
+        a = verbunden[f"{spalte}_alt"]
+        b = verbunden[f"{spalte}_neu"]
+        differenz = b.fillna(0) - a.fillna(0)
+        maske = differenz.abs() > toleranz
+        if not maske.any():
+            continue
+        teile.append(pd.DataFrame({
+            "_key": verbunden.index[maske], "Spalte": spalte,
+            "Alt": a[maske].to_numpy(), "Neu": b[maske].to_numpy(), "Differenz": differenz[maske].to_numpy(),
+            "Art": art_index[maske].to_numpy(),
+        }))
+    if not teile:
+        print(f"   ✅ Keine Änderungen zwischen {version_alt} und {version_neu}.")
+        return pd.DataFrame(columns=["Artikel", "Kunde", "Monat", "Spalte", "Alt", "Neu", "Differenz", "Art"])
+
+    ergebnis = pd.concat(teile, ignore_index=True)
+    ergebnis = pd.concat([dekodiere(ergebnis["_key"], lade_schluessel(store)), ergebnis.drop(columns="_key")], axis=1)
+    print(f"   ✅ Diff {version_alt} -> {version_neu}: {len(ergebnis):,} geänderte Zellen "
+          f"({len(verbunden):,} Schlüssel) in {time.perf_counter() - start:.2f}s")
+    return ergebnis.sort_values(["Kunde", "Artikel", "Monat", "Spalte"]).reset_index(drop=True)
+
+
+def diff_zusammenfassung(ergebnis):
+    """Anzahl und Summe der Änderungen je Kunde, Spalte und Art."""
+    if ergebnis.empty:
+        return ergebnis
+    return (
+        ergebnis.groupby(["Kunde", "Spalte", "Art"], dropna=False)
+        .agg(Zellen=("Differenz", "size"), Differenz=("Differenz", "sum"))
+        .reset_index()
+    )
+
+
+# ---------------------------------------------------------
+# 5. MAIN
+# ---------------------------------------------------------
+
+def main():
+    befehl = sys.argv[1] if len(sys.argv) > 1 else "liste"
+    if befehl == "liste":
+        print(katalog().to_string(index=False))
+    elif befehl == "speichere" and len(sys.argv) > 2:
+        speichere_snapshot(pd.read_excel(sys.argv[2]), eingaben={"forecast": sys.argv[2]})
+    elif befehl == "diff":
+        alt = sys.argv[2] if len(sys.argv) > 2 else "-2"
+        neu = sys.argv[3] if len(sys.argv) > 3 else "-1"
+        ergebnis = diff(_version(alt), _version(neu))
+        if not ergebnis.empty:
+            pd.set_option("display.width", 200)
+            print(diff_zusammenfassung(ergebnis).to_string(index=False))
+            out_path = os.path.join(SNAPSHOT_DIR, f"Diff_{_version(alt)}_{_version(neu)}.xlsx")
+            if len(ergebnis) < 1_000_000:
+                ergebnis.to_excel(out_path, index=False)
+                print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+    else:
+        print("Aufruf: python snapshots.py liste | speichere <forecast.xlsx> | diff [alt] [neu]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import pandas as pd
+import os
+import sys
+import time
+import sqlite3
+
+# --- KONFIGURATION ---
+DB_DATEI = "./output/cache/erp.sqlite"      # bei DuckDB wird die Endung .duckdb verwendet
+SQL_ENGINE = "auto"                         # "auto" (DuckDB falls installiert), "duckdb" oder "sqlite"
+CHUNK_ZEILEN = 50_000
+
+# Indizes für SQLite (DuckDB braucht keine: spaltenweise Speicherung mit Min/Max je Block)
+INDIZES = {
+    "rohdaten": [["Baumarkt", "bedmo"], ["matnr"], ["Baumarktartikel"], ["progmo"], ["progmo2"]],
+    "plan": [["Baumarkt", "Monat"]],
+    "final": [["Kunde", "Monat"], ["Artikel"], ["Gruppe"]],
+}
+
+# Sichten: Name -> (benötigte Tabellen, SQL)
+SICHTEN = {
+    # Lange Prognose wie structure_data / prepare_forecast (Jahr 1 und 2 untereinander),
+    # Kunde bereinigt wie clean_keys -> passt zu plan_stueck und final
+    "prognose_lang": (["rohdaten"], """
+        SELECT matnr, Baumarktartikel, UPPER(TRIM(Baumarkt)) AS Baumarkt, CAST(progmo AS INTEGER) AS Monat,
+               prog_mg1 AS Menge, 1 AS Prognosejahr
+        FROM rohdaten WHERE progmo IS NOT NULL AND prog_mg1 IS NOT NULL
+        UNION ALL
+        SELECT matnr, Baumarktartikel, UPPER(TRIM(Baumarkt)), CAST(progmo2 AS INTEGER), prog_mg2, 2
+        FROM rohdaten WHERE progmo2 IS NOT NULL AND prog_mg2 IS NOT NULL
+    """),
+    # Plan in Stück mit bereinigten Schlüsseln wie prepare_plan in Stufe 3
+    "plan_stueck": (["plan"], """
+        SELECT UPPER(TRIM(Baumarkt)) AS Kunde, CAST(Monat AS INTEGER) AS Monat, Zahl * 1000 AS Ziel_Summe
+        FROM plan
+    """),
+    # Erst verdichten, dann joinen: Kunde x Monat statt aller Artikelzeilen gegen den Plan.
+    # Monate ohne Plan behalten Ziel_Summe/Differenz = NULL
+    "abgleich": (["final", "plan"], """
+        SELECT f.Kunde, f.Monat, f.Bottom_Up, f.Geglaettet, p.Ziel_Summe, f.Geglaettet - p.Ziel_Summe AS Differenz
+        FROM (
+            SELECT Kunde, Monat, SUM(Menge) AS Bottom_Up, SUM(Menge_Geglaettet) AS Geglaettet
+            FROM final GROUP BY Kunde, Monat
+        ) f
+        LEFT JOIN plan_stueck p ON p.Kunde = f.Kunde AND p.Monat = f.Monat
+    """),
+}
+
+# Fertige Abfragen (Name statt SQL auf der Kommandozeile)
+ABFRAGEN = {
+    # analyse_monatlicher_umsatz: Menge, Artikel und Anteil je Baumarkt und Monat
+    "monatlicher_umsatz": """
+        SELECT Baumarkt, Monat, SUM(Menge) AS Menge, COUNT(DISTINCT matnr) AS Artikel,
+               100.0 * SUM(Menge) / SUM(SUM(Menge)) OVER (PARTITION BY Baumarkt) AS Anteil_Prozent
+        FROM prognose_lang GROUP BY Baumarkt, Monat ORDER BY Baumarkt, Monat
+    """,
+    # analysiere_hierarchieebenen: Knoten und Menge je Ebene
+    "hierarchie": """
+        SELECT 'Artikel' AS Ebene, COUNT(DISTINCT matnr) AS Knoten, SUM(Menge) AS Menge FROM prognose_lang
+        UNION ALL SELECT 'Teilegruppe', COUNT(DISTINCT Baumarktartikel), SUM(Menge) FROM prognose_lang
+        UNION ALL SELECT 'Kunde', COUNT(DISTINCT Baumarkt), SUM(Menge) FROM prognose_lang
+    """,
+    "top_teilegruppen": """
+        SELECT Baumarktartikel, SUM(Menge) AS Menge, COUNT(DISTINCT matnr) AS Artikel,
+               100.0 * SUM(Menge) / (SELECT SUM(Menge) FROM prognose_lang) AS Anteil_Prozent
+        FROM prognose_lang GROUP BY Baumarktartikel ORDER BY Menge DESC LIMIT 10
+    """,
+    "top_artikel": """
+        SELECT matnr, SUM(Menge) AS Menge,
+               100.0 * SUM(Menge) / (SELECT SUM(Menge) FROM prognose_lang) AS Anteil_Prozent
+        FROM prognose_lang GROUP BY matnr ORDER BY Menge DESC LIMIT 10
+    """,
+    # Differenz nur über Monate mit Plan; Menge in Monaten ohne Plan separat
+    "abgleich_kunden": """
+        SELECT Kunde, SUM(Bottom_Up) AS Bottom_Up, SUM(Geglaettet) AS Geglaettet,
+               SUM(CASE WHEN Ziel_Summe IS NOT NULL THEN Geglaettet END) AS Geglaettet_mit_Plan,
+               SUM(Ziel_Summe) AS Ziel_Summe, SUM(Differenz) AS Differenz,
+               SUM(CASE WHEN Ziel_Summe IS NULL THEN Geglaettet ELSE 0 END) AS Geglaettet_ohne_Plan
+        FROM abgleich GROUP BY Kunde ORDER BY Kunde
+    """,
+}
+
+# ---------------------------------------------------------
+# 1. VERBINDUNG
+# ---------------------------------------------------------
+
+def _duckdb():
+    try:
+        import duckdb
+        return duckdb
+    except ImportError:
+        return None
+
+
+def engine(name=SQL_ENGINE):
+    if name == "auto":
+        return "duckdb" if _duckdb() is not None else "sqlite"
+    if name == "duckdb" and _duckdb() is None:
+        print("   ⚠️ DuckDB nicht installiert (pip install duckdb) – nutze SQLite.")
+        return "sqlite"
+    return name
+
+
+def verbinde(pfad=DB_DATEI, name=SQL_ENGINE):
+    """Öffnet die Datenbankdatei (wird angelegt, falls sie fehlt). ':memory:' für eine reine RAM-Datenbank."""
+    art = engine(name)
+    if pfad != ":memory:":
+        pfad = os.path.splitext(pfad)[0] + (".duckdb" if art == "duckdb" else ".sqlite")
+        os.makedirs(os.path.dirname(pfad) or ".", exist_ok=True)
+    con = _duckdb().connect(pfad) if art == "duckdb" else sqlite3.connect(pfad)
+    _ausfuehren(con, "CREATE TABLE IF NOT EXISTS _quellen (tabelle TEXT PRIMARY KEY, fingerprint TEXT, zeilen INTEGER)")
+    return con
+
+
+def _ist_duckdb(con):
+    return not isinstance(con, sqlite3.Connection)
+
+
+def _ausfuehren(con, sql, params=()):
+    con.execute(sql, params)
+    if not _ist_duckdb(con):
+        con.commit()
+
+
+def tabellen(con):
+    if _ist_duckdb(con):
+        sql = "SELECT table_name FROM information_schema.tables WHERE table_schema = 'main'"
+    else:
+        sql = "SELECT name FROM sqlite_master WHERE type IN ('table', 'view')"
+    return {zeile[0] for zeile in con.execute(sql).fetchall()}
+
+
+# ---------------------------------------------------------
+# 2. TABELLEN LADEN (nur wenn sich die Quelle geändert hat)
+# ---------------------------------------------------------
+
+def datei_fingerprint(pfad):
+    """Pfad, Größe und Änderungszeit – reicht, um ein erneutes Einlesen der Excel-Datei zu vermeiden."""
+    if not os.path.exists(pfad):
+        return None
+    info = os.stat(pfad)
+    return f"{os.path.abspath(pfad)}|{info.st_size}|{info.st_mtime_ns}"
+
+
+def _gespeicherter_fingerprint(con, tabelle):
+    zeile = con.execute("SELECT fingerprint FROM _quellen WHERE tabelle = ?", (tabelle,)).fetchone()
+    return zeile[0] if zeile else None
+
+
+def schreibe_tabelle(con, name, df, fingerprint=None):
+    """Ersetzt die Tabelle 'name' durch df, legt die Indizes an und merkt sich den Fingerprint."""
+    df = df.copy()
+    # Text-Spalten mit gemischten Typen (z.B. Zahlen und Text in 'kundabl') einheitlich als Text
+    for spalte in df.columns[df.dtypes == object]:
+        df[spalte] = df[spalte].where(df[spalte].isna(), df[spalte].astype(str))
+
+    if _ist_duckdb(con):
+        con.register("_neu", df)
+        con.execute(f'CREATE OR REPLACE TABLE "{name}" AS SELECT * FROM _neu')
+        con.unregister("_neu")
+    else:
+        df.to_sql(name, con, if_exists="replace", index=False, chunksize=CHUNK_ZEILEN)
+        for i, spalten in enumerate(INDIZES.get(name, [])):
+            if all(s in df.columns for s in spalten):
+                liste = ", ".join(f'"{s}"' for s in spalten)
+                con.execute(f'CREATE INDEX IF NOT EXISTS "ix_{name}_{i}" ON "{name}" ({liste})')
+    _ausfuehren(con, "DELETE FROM _quellen WHERE tabelle = ?", (name,))
+    _ausfuehren(con, "INSERT INTO _quellen VALUES (?, ?, ?)", (name, fingerprint, len(df)))
+
+
+def vergiss_quellen(con):
+    """Erzwingt beim nächsten aktualisiere() ein Neuladen aller Tabellen."""
+    _ausfuehren(con, "DELETE FROM _quellen")
+
+
+def erstelle_sichten(con):
+    """Legt alle Sichten an, deren Tabellen vorhanden sind."""
+    vorhanden = tabellen(con)
+    for name, (benoetigt, sql) in SICHTEN.items():
+        if all(t in vorhanden for t in benoetigt):
+            _ausfuehren(con, f'DROP VIEW IF EXISTS "{name}"')
+            _ausfuehren(con, f'CREATE VIEW "{name}" AS {sql}')
+            vorhanden.add(name)
+
+
+def aktualisiere(con, quellen):
+    """
+    quellen: Tabellenname -> (Dateipfad, Funktion die den DataFrame liefert).
+    Eine Tabelle wird nur neu geladen, wenn sich die Datei seit dem letzten Laden geändert hat –
+    die Datenbank ist damit zugleich der Cache des Excel-Extrakts.
+    """
+    for name, (pfad, laden) in quellen.items():
+        fingerprint = datei_fingerprint(pfad)
+        if fingerprint is None:
+            print(f"   ℹ️  {name}: {pfad} fehlt – Tabelle wird nicht aktualisiert.")
+            continue
+        if fingerprint == _gespeicherter_fingerprint(con, name):
+            continue
+        start = time.perf_counter()
+        df = laden()
+        if df is None or df.empty:
+            print(f"   ⚠️ {name}: keine Daten geladen.")
+            continue
+        schreibe_tabelle(con, name, df, fingerprint)
+        print(f"   ✅ Tabelle '{name}' geladen: {len(df):,} Zeilen in {time.perf_counter() - start:.1f}s")
+    erstelle_sichten(con)
+
+
+# ---------------------------------------------------------
+# 3. ABFRAGEN
+# ---------------------------------------------------------
+
+def abfrage(con, sql, params=None):
+    """Führt SQL oder den Namen einer fertigen Abfrage (ABFRAGEN) aus und liefert einen DataFrame."""
+    sql = ABFRAGEN.get(sql.strip(), sql)
+    if _ist_duckdb(con):
+        return con.execute(sql, params or []).df()
+    return pd.read_sql_query(sql, con, params=params)
+
+
+def standard_quellen(rohdaten_pfad="rohdaten.xlsx", plan_pfad="./output/agg_baumarktprogramm.xlsx",
+                     final_pfad="./output/final/Final_Forecast_2026_2027.xlsx"):
+    return {
+        "rohdaten": (rohdaten_pfad, lambda: pd.read_excel(rohdaten_pfad)),
+        "plan": (plan_pfad, lambda: pd.read_excel(plan_pfad)),
+        "final": (final_pfad, lambda: pd.read_excel(final_pfad)),
+    }
+
+
+def fuehre_aus(con, sql):
+    """Abfrage mit Laufzeit ausgeben (für die Kommandozeile)."""
+    start = time.perf_counter()
+    try:
+        ergebnis = abfrage(con, sql)
+    except Exception as e:
+        print(f"❌ SQL-Fehler: {e}")
+        return None
+    dauer = (time.perf_counter() - start) * 1000
+    pd.set_option("display.width", 200)
+    print(ergebnis.to_string(index=False, max_rows=50))
+    print(f"\n({len(ergebnis)} Zeilen, {dauer:.1f} ms)")
+    return ergebnis
+
+
+# ---------------------------------------------------------
+# 4. MAIN
+# ---------------------------------------------------------
+
+def main():
+    if len(sys.argv) < 2:
+        print("Aufruf: python sql_abfragen.py \"SELECT ...\" | <Abfrage>")
+        print(f"Fertige Abfragen: {', '.join(ABFRAGEN)}")
+        print(f"Tabellen/Sichten: rohdaten, plan, final, {', '.join(SICHTEN)}")
+        return
+    con = verbinde()
+    aktualisiere(con, standard_quellen())
+    fuehre_aus(con, " ".join(sys.argv[1:]))
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
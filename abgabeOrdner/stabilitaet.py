@@ -0,0 +1,249 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import time
+import warnings
+
+import snapshots
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/final"
+OUTPUT_FILE_EXCEL = "Stabilitaet.xlsx"
+WERTE = ["Menge", "Menge_Geglaettet"]   # ERP-Prognose (prog_mg1/2) und abgeglichene Menge
+REVISION_TOLERANZ = 0.5                 # Stück; kleinere Änderungen gelten als Rundung
+
+# Hierarchieknoten: Kennzahlen je Knoten und Zielmonat, danach über die Zielmonate gemittelt
+EBENEN = {
+    "Gesamt": [],
+    "Kunde": ["Kunde"],
+    "Gruppe": ["Gruppe"],
+    "Kunde x Gruppe": ["Kunde", "Gruppe"],
+    "Artikel": ["Artikel"],
+    "Artikel x Kunde": ["Artikel", "Kunde"],
+}
+
+# ---------------------------------------------------------
+# 1. SNAPSHOTS AUSRICHTEN
+# ---------------------------------------------------------
+
+def lade_matrix(versionen, wert, store=snapshots.SNAPSHOT_DIR):
+    """
+    Richtet die Snapshots über den int64-Schlüssel (Artikel, Kunde, Zielmonat) aus.
+
+    Returns:
+        schluessel (K,), matrix (K x V) – liegt der Zielmonat außerhalb des Horizonts eines Snapshots
+        (kein einziger Schlüssel mit diesem Monat), ist die Zelle NaN; fehlt nur die Reihe in einem
+        abgedeckten Monat, ist ihre Prognose 0
+    """
+    spalten = []
+    for version in versionen:
+        df = snapshots.lade_snapshot(version, ["_key", wert], store=store)
+        spalten.append(df.groupby("_key", sort=False)[wert].sum())
+    schluessel = np.unique(np.concatenate([s.index.to_numpy() for s in spalten]))
+    monat = _monat_index(schluessel)
+    matrix = np.full((len(schluessel), len(versionen)), np.nan)
+    for j, s in enumerate(spalten):
+        abgedeckt = np.isin(monat, _monat_index(s.index.to_numpy()))
+        matrix[abgedeckt, j] = 0.0
+        matrix[np.searchsorted(schluessel, s.index.to_numpy()), j] = s.to_numpy()
+    return schluessel, matrix
+
+
+def _monat_index(schluessel):
+    """Zielmonat-Anteil des int64-Schlüssels (siehe snapshots.int_schluessel)."""
+    return np.asarray(schluessel, dtype=np.int64) & ((1 << snapshots.MONAT_BITS) - 1)
+
+
+def knoten_tabelle(schluessel, store=snapshots.SNAPSHOT_DIR, gruppen=None):
+    """Artikel, Kunde, Monat (und Gruppe aus dem neuesten Snapshot) je Schlüssel."""
+    df = snapshots.dekodiere(schluessel, snapshots.lade_schluessel(store))
+    if gruppen is not None:
+        df["Gruppe"] = df["Artikel"].map(gruppen).fillna("Unbekannt")
+    return df
+
+
+# ---------------------------------------------------------
+# 2. KENNZAHLEN (vektorisiert über alle Snapshot-Paare)
+# ---------------------------------------------------------
+
+def kennzahlen(matrix):
+    """
+    Für jede Zeile (eine Reihe von Prognosen für dasselbe Ziel) über alle Snapshot-Paare, die den
+    Zielmonat beide abdecken (NaN = Zielmonat außerhalb des Horizonts des Snapshots):
+    - Vergleiche:          Anzahl solcher Paare
+    - Abs_Revision:        Summe |x_t - x_t-1|
+    - Netto_Revision:      x_letzte - x_erste (erster/letzter abdeckender Snapshot)
+    - Revisionen:          Anzahl Paare mit Änderung
+    - Richtungswechsel:    Anzahl Vorzeichenwechsel aufeinanderfolgender Revisionen (rauf -> runter)
+    - CoR:                 Variationskoeffizient der Prognosen (Std / Mittel) – "coefficient of revision"
+    - Nervositaet:         mittlere |Revision| relativ zum mittleren Niveau
+    """
+    gueltig = ~np.isnan(matrix)
+    vergleiche = (gueltig[:, 1:] & gueltig[:, :-1]).sum(axis=1)
+    revision = np.nan_to_num(np.diff(matrix, axis=1))
+    revision[np.abs(revision) <= REVISION_TOLERANZ] = 0.0
+    richtung = np.sign(revision)
+    # Nullrevisionen dazwischen überspringen: Vorzeichen der letzten echten Revision fortschreiben
+    letzte = pd.DataFrame(np.where(richtung != 0, richtung, np.nan)).ffill(axis=1).to_numpy()
+    wechsel = (richtung[:, 1:] != 0) & (letzte[:, :-1] * richtung[:, 1:] < 0)
+
+    zeilen = np.arange(len(matrix))
+    erste = matrix[zeilen, gueltig.argmax(axis=1)]
+    letzte_prognose = matrix[zeilen, matrix.shape[1] - 1 - gueltig[:, ::-1].argmax(axis=1)]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)   # Zeilen ganz ohne Wert -> NaN
+        mittel = np.nanmean(matrix, axis=1)
+        std = np.nanstd(matrix, axis=1)
+    abs_revision = np.abs(revision).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cor = np.where((mittel > 0) & (vergleiche > 0), std / mittel, np.nan)
+        nervositaet = np.where((mittel > 0) & (vergleiche > 0), abs_revision / np.maximum(vergleiche, 1) / mittel, np.nan)
+    return pd.DataFrame({
+        "Niveau": mittel,
+        "Vergleiche": vergleiche,
+        "Abs_Revision": abs_revision,
+        "Netto_Revision": np.where(vergleiche > 0, letzte_prognose - erste, 0.0),
+        "Revisionen": (revision != 0).sum(axis=1),
+        "Richtungswechsel": wechsel.sum(axis=1),
+        "CoR": cor,
+        "Nervositaet": nervositaet,
+    })
+
+
+def je_knoten(knoten, matrix, ebene):
+    """
+    Kennzahlen eines Hierarchieknotens: Reihen erst je Knoten und Zielmonat summieren (Netto-Sicht),
+    dann über die Zielmonate zusammenfassen. Churn = Summe der |Revisionen| auf Zellebene relativ
+    zum Niveau – zeigt, wie viel unterhalb des Knotens umgeschichtet wird, auch wenn die Summe stabil bleibt.
+    """
+    spalten = EBENEN[ebene] + ["Monat"]
+    codes = knoten.groupby(spalten, sort=False, dropna=False).ngroup().to_numpy()
+    n = codes.max() + 1
+    # Zeilen mit fehlendem Kunden/Artikel bilden einen eigenen Knoten.
+    # Alle Zeilen eines Knotens teilen den Zielmonat -> Horizont-NaN gilt für den ganzen Knoten (min_count=1)
+    summen = pd.DataFrame(matrix).groupby(codes).sum(min_count=1).to_numpy()
+
+    zellen_abs = np.nan_to_num(np.abs(np.diff(matrix, axis=1)))
+    zellen_abs[zellen_abs <= REVISION_TOLERANZ] = 0.0
+    churn = np.bincount(codes, weights=zellen_abs.sum(axis=1), minlength=n)
+
+    erste = pd.Series(np.arange(len(codes))).groupby(codes).first().to_numpy()
+    df = pd.concat([knoten.iloc[erste][spalten].reset_index(drop=True), kennzahlen(summen)], axis=1)
+    df["Zellen_Abs_Revision"] = churn
+    df["Niveau_x_Vergleiche"] = df["Niveau"].fillna(0) * df["Vergleiche"]
+
+    if not EBENEN[ebene]:
+        df["Knoten"] = "Gesamt"
+        gruppierung = ["Knoten"]
+    else:
+        gruppierung = EBENEN[ebene]
+    ergebnis = df.groupby(gruppierung, dropna=False).agg(
+        Zielmonate=("Monat", "size"),
+        Vergleiche=("Vergleiche", "sum"),
+        Niveau=("Niveau", "sum"),
+        Niveau_x_Vergleiche=("Niveau_x_Vergleiche", "sum"),
+        Abs_Revision=("Abs_Revision", "sum"),
+        Netto_Revision=("Netto_Revision", "sum"),
+        Zellen_Abs_Revision=("Zellen_Abs_Revision", "sum"),
+        Revisionen=("Revisionen", "sum"),
+        Richtungswechsel=("Richtungswechsel", "sum"),
+        CoR=("CoR", "mean"),
+        Nervositaet=("Nervositaet", "mean"),
+    ).reset_index()
+    # Churn je Lauf: bewegte Menge relativ zum Niveau, nur über Paare, die den Zielmonat abdecken
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ergebnis["Churn"] = np.where(
+            ergebnis["Niveau_x_Vergleiche"] > 0, ergebnis["Zellen_Abs_Revision"] / ergebnis["Niveau_x_Vergleiche"], np.nan
+        )
+    ergebnis = ergebnis.drop(columns="Niveau_x_Vergleiche")
+    return ergebnis.sort_values("Zellen_Abs_Revision", ascending=False).reset_index(drop=True)
+
+
+def je_lauf(versionen, matrizen):
+    """
+    Churn je Abgleichslauf (Snapshot-Paar) und Wert: bewegte Menge relativ zum Volumen
+    der Zielmonate, die beide Snapshots abdecken.
+    """
+    zeilen = []
+    for wert, matrix in matrizen.items():
+        revision = np.nan_to_num(np.diff(matrix, axis=1))
+        revision[np.abs(revision) <= REVISION_TOLERANZ] = 0.0
+        beide = ~np.isnan(matrix[:, 1:]) & ~np.isnan(matrix[:, :-1])
+        volumen = np.where(beide, matrix[:, 1:], 0.0).sum(axis=0)
+        for j in range(revision.shape[1]):
+            zeilen.append({
+                "Von": versionen[j], "Nach": versionen[j + 1], "Wert": wert,
+                "Zellen_Verglichen": int(beide[:, j].sum()),
+                "Geaenderte_Zellen": int((revision[:, j] != 0).sum()),
+                "Abs_Revision": np.abs(revision[:, j]).sum(),
+                "Netto_Revision": revision[:, j].sum(),
+                "Churn": np.abs(revision[:, j]).sum() / volumen[j] if volumen[j] > 0 else np.nan,
+            })
+    return pd.DataFrame(zeilen)
+
+
+def analysiere(versionen=None, werte=WERTE, store=snapshots.SNAPSHOT_DIR):
+    """
+    Stabilitätskennzahlen über aufeinanderfolgende Snapshots für alle Ebenen und Werte.
+
+    Returns:
+        dict Tabellenname -> DataFrame (leer, wenn weniger als zwei Snapshots vorliegen)
+    """
+    start = time.perf_counter()
+    if versionen is None:
+        versionen = snapshots.katalog(store)["version"].tolist()
+    else:
+        versionen = [snapshots._version(v, store) for v in versionen]
+    if len(versionen) < 2:
+        print("❌ Für Stabilitätskennzahlen werden mindestens zwei Snapshots benötigt.")
+        return {}
+
+    neuester = snapshots.lade_snapshot(versionen[-1], ["Artikel", "Gruppe"], store=store)
+    gruppen = neuester.drop_duplicates("Artikel").set_index("Artikel")["Gruppe"]
+
+    matrizen, tabellen = {}, {}
+    for wert in werte:
+        schluessel, matrix = lade_matrix(versionen, wert, store)
+        matrizen[wert] = matrix
+        knoten = knoten_tabelle(schluessel, store, gruppen)
+        for ebene in EBENEN:
+            tabellen[f"{ebene} - {wert}"] = je_knoten(knoten, matrix, ebene)
+    tabellen["Je Lauf"] = je_lauf(versionen, matrizen)
+    print(f"   ✅ Stabilität über {len(versionen)} Snapshots ({len(versionen) - 1} Läufe) "
+          f"in {time.perf_counter() - start:.1f}s")
+    return tabellen
+
+
+# ---------------------------------------------------------
+# 3. SPEICHERN & MAIN
+# ---------------------------------------------------------
+
+def save_results(tabellen, out_dir=OUTPUT_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, OUTPUT_FILE_EXCEL)
+    with pd.ExcelWriter(out_path) as writer:
+        for name, df in tabellen.items():
+            # Excel erlaubt max. 31 Zeichen je Blattname
+            df.to_excel(writer, sheet_name=name.replace("Menge_Geglaettet", "Abgl")[:31], index=False)
+    print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+
+
+def main():
+    versionen = sys.argv[1:] or None
+    tabellen = analysiere(versionen)
+    if not tabellen:
+        return
+
+    pd.set_option("display.width", 200)
+    print("\n📊 Churn je Abgleichslauf:")
+    print(tabellen["Je Lauf"].round(4).to_string(index=False))
+    for wert in WERTE:
+        print(f"\n📊 Nervosität je Kunde ({wert}):")
+        print(tabellen[f"Kunde - {wert}"].round(3).to_string(index=False))
+    save_results(tabellen)
+
+
+if __name__ == "__main__":
+    main()
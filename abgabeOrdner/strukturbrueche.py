@@ -0,0 +1,219 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+
+from stufen import lade_stufe
+from exponentielle_glaettung import serien_matrix
+from saisonprofile import saisonprofile, saisonindex_matrix, saisonindizes, PROFIL_EBENEN
+
+# --- KONFIGURATION ---
+OUTPUT_DIR = "./output/final"
+OUTPUT_FILE_EXCEL = "Strukturbrueche.xlsx"
+WERT_COL = "wavor_bstlmg"
+
+MAX_BRUECHE = 3         # maximal erkannte Brüche pro Reihe
+MIN_SEGMENT = 3         # Monate, die ein Regime mindestens dauern muss
+STRAFE_FAKTOR = 3.0     # Strafterm: Faktor * Rauschvarianz * log(Monate)
+MIN_REL_SPRUNG = 0.2    # Niveauwechsel unter 20% werden ignoriert
+MIN_SAISON_INDEX = 0.1  # Untergrenze beim Herausrechnen der Saison
+
+BRUCH_EBENEN = {
+    "Kunde": ["Baumarkt"],
+    "Artikel x Kunde": ["matnr", "Baumarkt"],
+}
+
+# ---------------------------------------------------------
+# 1. BINÄRE SEGMENTIERUNG (vektorisiert über alle Reihen)
+# ---------------------------------------------------------
+
+def _rauschvarianz(werte):
+    """
+    Robuste Rauschvarianz aus den ersten Differenzen (MAD / sqrt(2)), unempfindlich gegen Niveausprünge.
+    Bei sporadischen Reihen ist die MAD 0 – dann wird die normale Varianz der Differenzen genommen,
+    sonst würde jede einzelne Bestellung als Bruch gelten.
+    """
+    diff = np.diff(werte, axis=1)
+    mad = np.median(np.abs(diff - np.median(diff, axis=1, keepdims=True)), axis=1) * 1.4826
+    varianz = (mad / np.sqrt(2)) ** 2
+    return np.where(varianz > 0, varianz, diff.var(axis=1) / 2)
+
+
+def saisonbereinigt(werte, monate, saison_index=None):
+    """
+    Teilt jede Reihe durch ihren Saisonindex (ab zwei vollen Jahren),
+    damit ein saisonales Tief nicht als Niveauwechsel erkannt wird.
+    'saison_index' (n, 12) kommt aus dem Saisonprofil-Speicher; ohne ihn wird er aus
+    der Matrix berechnet (z.B. Backtest-Fenster, die nur die Historie bis zum Ursprung sehen).
+    """
+    if monate is None or werte.shape[1] < 24:
+        return werte
+    index = saisonindizes(werte, monate) if saison_index is None else saison_index
+    return werte / np.maximum(index[:, np.asarray(monate) % 100 - 1], MIN_SAISON_INDEX)
+
+
+def finde_brueche(werte, monate=None, max_brueche=MAX_BRUECHE, min_segment=MIN_SEGMENT, strafe_faktor=STRAFE_FAKTOR,
+                  saison_index=None):
+    """
+    Binäre Segmentierung auf Niveauwechsel über kumulierte Summen.
+    Kosten eines Segments [a, b): Summe der Quadrate - (Summe)^2 / Länge, über S und S2 in O(1).
+    In jeder Runde wird für ALLE Reihen gleichzeitig der beste zusätzliche Bruch gesucht
+    und übernommen, wenn die Kostensenkung den Strafterm übersteigt.
+    Mit 'monate' wird vorher die Saison herausgerechnet (Indizes aus 'saison_index', falls übergeben).
+
+    Returns:
+        grenzen (n, t+1) bool – True an 0, t und an jedem erkannten Bruch (Index des ersten neuen Monats)
+    """
+    werte = saisonbereinigt(werte, monate, saison_index)
+    n, t_max = werte.shape
+    s = np.zeros((n, t_max + 1))
+    s2 = np.zeros((n, t_max + 1))
+    s[:, 1:] = np.cumsum(werte, axis=1)
+    s2[:, 1:] = np.cumsum(werte ** 2, axis=1)
+
+    def kosten(a, b):
+        laenge = np.maximum(b - a, 1)
+        summe = np.take_along_axis(s, b, axis=1) - np.take_along_axis(s, a, axis=1)
+        summe2 = np.take_along_axis(s2, b, axis=1) - np.take_along_axis(s2, a, axis=1)
+        return summe2 - summe ** 2 / laenge
+
+    strafe = strafe_faktor * np.maximum(_rauschvarianz(werte), 1e-9) * np.log(max(t_max, 2))
+    grenzen = np.zeros((n, t_max + 1), dtype=bool)
+    grenzen[:, [0, t_max]] = True
+    pos = np.broadcast_to(np.arange(t_max + 1), (n, t_max + 1))
+    k = np.broadcast_to(np.arange(1, t_max), (n, t_max - 1))
+
+    for _ in range(max_brueche):
+        # Nächste Grenze links (<= k-1) und rechts (>= k+1) für jeden Kandidaten k
+        links = np.maximum.accumulate(np.where(grenzen, pos, 0), axis=1)[:, :-2]
+        rechts = np.minimum.accumulate(np.where(grenzen, pos, t_max)[:, ::-1], axis=1)[:, ::-1][:, 2:]
+
+        gewinn = kosten(links, rechts) - kosten(links, k) - kosten(k, rechts)
+        erlaubt = (k - links >= min_segment) & (rechts - k >= min_segment) & ~grenzen[:, 1:-1]
+        gewinn = np.where(erlaubt, gewinn, -np.inf)
+
+        bester = np.argmax(gewinn, axis=1)
+        bester_gewinn = gewinn[np.arange(n), bester]
+        neu = bester_gewinn > strafe
+        if not neu.any():
+            break
+        grenzen[np.flatnonzero(neu), bester[neu] + 1] = True
+
+    return _filter_kleine_spruenge(werte, grenzen)
+
+
+def _filter_kleine_spruenge(werte, grenzen):
+    """Entfernt Brüche, bei denen sich das Niveau um weniger als MIN_REL_SPRUNG ändert."""
+    n, t_max = werte.shape
+    for zeile, bruch in zip(*np.nonzero(grenzen[:, 1:-1])):
+        bruch = bruch + 1
+        vorher = np.flatnonzero(grenzen[zeile, :bruch]).max()
+        nachher = bruch + 1 + np.flatnonzero(grenzen[zeile, bruch + 1:]).min()
+        m_vor = werte[zeile, vorher:bruch].mean()
+        m_nach = werte[zeile, bruch:nachher].mean()
+        basis = max(abs(m_vor), abs(m_nach), 1e-9)
+        if abs(m_nach - m_vor) / basis < MIN_REL_SPRUNG:
+            grenzen[zeile, bruch] = False
+    return grenzen
+
+
+def regime_start(grenzen):
+    """Index des ersten Monats im aktuellen (letzten) Regime – 0, wenn es keinen Bruch gibt."""
+    t_max = grenzen.shape[1] - 1
+    innen = grenzen[:, :t_max].copy()
+    innen[:, 0] = True
+    return t_max - 1 - np.argmax(innen[:, ::-1], axis=1)
+
+
+def _bis_start(grenzen, start):
+    """Start des vorletzten Regimes: letzte Grenze strikt vor dem aktuellen Regime-Start."""
+    pos = np.arange(grenzen.shape[1])[None, :]
+    return np.where(grenzen & (pos < start[:, None]), pos, 0).max(axis=1)
+
+
+def nur_aktuelles_regime(werte, start):
+    """Setzt alle Monate vor dem Regime-Start auf NaN, damit Prognosen nur das neue Niveau sehen."""
+    maske = np.arange(werte.shape[1])[None, :] < np.asarray(start)[:, None]
+    return np.where(maske, np.nan, werte)
+
+
+def regime_matrix(werte, monate=None):
+    """Erkennt die Brüche und gibt die Matrix nur mit dem aktuellen Regime zurück (Rest NaN)."""
+    return nur_aktuelles_regime(werte, regime_start(finde_brueche(werte, monate)))
+
+
+# ---------------------------------------------------------
+# 2. ANWENDUNG AUF BAUMARKT- UND ARTIKELREIHEN
+# ---------------------------------------------------------
+
+def strukturbrueche(df, wert_col=WERT_COL, ebenen=BRUCH_EBENEN):
+    """
+    Läuft als Batch über alle Reihen jeder Ebene; die Saisonindizes kommen aus dem Saisonprofil-Speicher.
+
+    Returns:
+        DataFrame: eine Zeile pro Reihe mit Anzahl_Brueche, Bruch_Monate,
+        Regime_Start (JJJJMM) und Niveau vor/nach dem letzten Bruch.
+    """
+    profile = saisonprofile(df, wert_col)
+    teile = []
+    for ebene, schluessel in ebenen.items():
+        werte, schluessel_df, monate = serien_matrix(df, schluessel, "bedmo", wert_col)
+        index = saisonindex_matrix(profile, ebene, schluessel_df) if ebene in PROFIL_EBENEN else None
+        grenzen = finde_brueche(werte, monate, saison_index=index)
+        start = regime_start(grenzen)
+
+        innen = grenzen[:, 1:-1]
+        bruch_monate = [
+            ", ".join(str(m) for m in monate[np.flatnonzero(zeile) + 1]) for zeile in innen
+        ]
+        t = np.arange(werte.shape[1])[None, :]
+        nach = t >= start[:, None]
+        # Vorheriges Regime: vom vorletzten Bruch (oder Anfang) bis zum Regime-Start
+        vorher_start = _bis_start(grenzen, start)
+        vor = (t >= vorher_start[:, None]) & ~nach
+        with np.errstate(divide="ignore", invalid="ignore"):
+            niveau_nach = np.where(nach, werte, 0).sum(axis=1) / nach.sum(axis=1)
+            niveau_vor = np.where(vor, werte, 0).sum(axis=1) / vor.sum(axis=1)
+
+        teil = schluessel_df.copy()
+        teil.insert(0, "Ebene", ebene)
+        teil["Anzahl_Brueche"] = innen.sum(axis=1)
+        teil["Bruch_Monate"] = bruch_monate
+        teil["Regime_Start"] = monate[start]
+        teil["Niveau_vor"] = np.where(start > 0, niveau_vor, np.nan)
+        teil["Niveau_nach"] = niveau_nach
+        teil["Aenderung"] = np.where(start > 0, niveau_nach / niveau_vor - 1, np.nan)
+        teile.append(teil)
+
+    return pd.concat(teile, ignore_index=True)
+
+
+# ---------------------------------------------------------
+# 3. MAIN
+# ---------------------------------------------------------
+
+def main():
+    print("=== STRUKTURBRÜCHE (UMBAU / AUSLISTUNG) ===")
+    stufe2 = lade_stufe(2)
+    rohdaten = stufe2.load_rohdaten()
+    if rohdaten is None:
+        return
+
+    start = time.perf_counter()
+    brueche = strukturbrueche(rohdaten)
+    print(f"   ✅ {len(brueche):,} Reihen geprüft in {time.perf_counter() - start:.2f}s")
+
+    mit_bruch = brueche[brueche["Anzahl_Brueche"] > 0]
+    for ebene, anzahl in mit_bruch["Ebene"].value_counts().items():
+        print(f"      - {ebene}: {anzahl:,} Reihen mit Strukturbruch")
+    for _, row in mit_bruch[mit_bruch["Ebene"] == "Kunde"].iterrows():
+        print(f"      {row['Baumarkt']:20} ab {row['Regime_Start']}: {row['Aenderung']:+.0%}")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE_EXCEL)
+    brueche.to_excel(out_path, index=False)
+    print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import importlib.util
+import os
+import sys
+
+# --- KONFIGURATION ---
+BASIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STUFEN_DATEIEN = {
+    1: "1-Datenvertständnis.py",
+    2: "2-Abweichungsanalyse.py",
+    3: "3-Prognoseglättung.py",
+    4: "4-Konsistenzprüfung.py",
+    5: "5-Visualisierung.py",
+}
+
+
+def lade_stufe(nummer):
+    """
+    Lädt eines der nummerierten Skripte (z.B. '2-Abweichungsanalyse.py') als Modul.
+    Die Dateinamen sind keine gültigen Python-Namen, daher über importlib.
+    Das Modul wird unter 'stufe<n>' in sys.modules registriert (wichtig für Pickle
+    in Prozess-Pools) und nur einmal ausgeführt.
+    """
+    name = f"stufe{nummer}"
+    if name in sys.modules:
+        return sys.modules[name]
+
+    pfad = os.path.join(BASIS_DIR, STUFEN_DATEIEN[nummer])
+    spec = importlib.util.spec_from_file_location(name, pfad)
+    modul = importlib.util.module_from_spec(spec)
+    sys.modules[name] = modul
+    try:
+        spec.loader.exec_module(modul)
+    except Exception:
+        del sys.modules[name]
+        raise
+    return modul
@@ -0,0 +1,230 @@
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+import os
+import sys
+import heapq
+import time
+
+# --- KONFIGURATION ---
+INPUT_FILE = "rohdaten.xlsx"
+OUTPUT_DIR = "./output/final"
+OUTPUT_FILE_EXCEL = "TopK_Konzentration.xlsx"
+WERT_COL = "bedmo_mg"   # Tatsächliche Liefermenge
+CHUNK_ZEILEN = 200_000
+TOP_K = 10
+LORENZ_PUNKTE = 101     # Stützstellen je Konzentrationskurve
+
+# Name -> (Gruppenspalten, Element, Wertspalte)
+ABFRAGEN = {
+    "Top Artikel je Baumarkt": (["Baumarkt"], "matnr", WERT_COL),
+    "Top Artikel je Teilegruppe": (["Baumarktartikel"], "matnr", WERT_COL),
+    "Top Teilegruppen je Monat": (["bedmo"], "Baumarktartikel", WERT_COL),
+    "Top Artikel gesamt": ([], "matnr", WERT_COL),
+}
+
+# ---------------------------------------------------------
+# 1. STÜCKWEISES LESEN (CSV / XLSX / PARQUET)
+# ---------------------------------------------------------
+
+def lese_chunks(pfad, spalten, chunk_zeilen=CHUNK_ZEILEN):
+    """
+    Liefert die Datei als Folge von DataFrames mit höchstens 'chunk_zeilen' Zeilen.
+    Es wird nie die ganze Datei gleichzeitig gehalten.
+    """
+    endung = os.path.splitext(pfad)[1].lower()
+    if endung == ".csv":
+        yield from pd.read_csv(pfad, usecols=spalten, chunksize=chunk_zeilen)
+    elif endung == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("❌ Fehler: pyarrow ist für Parquet-Dateien nötig.")
+            return
+        for batch in pq.ParquetFile(pfad).iter_batches(batch_size=chunk_zeilen, columns=spalten):
+            yield batch.to_pandas()
+    elif endung == ".xlsx":
+        yield from _xlsx_chunks(pfad, spalten, chunk_zeilen)
+    else:
+        raise ValueError(f"Nicht unterstütztes Dateiformat: '{endung}'")
+
+
+def _xlsx_chunks(pfad, spalten, chunk_zeilen):
+    """openpyxl im read_only-Modus: Zeilen werden gestreamt statt die Mappe komplett zu laden."""
+    from openpyxl import load_workbook
+
+    mappe = load_workbook(pfad, read_only=True, data_only=True)
+    try:
+        zeilen = mappe.worksheets[0].iter_rows(values_only=True)
+        kopf = list(next(zeilen))
+        fehlend = [c for c in spalten if c not in kopf]
+        if fehlend:
+            raise KeyError(f"Spalten fehlen in {pfad}: {fehlend}")
+        positionen = [kopf.index(c) for c in spalten]
+
+        puffer = []
+        for zeile in zeilen:
+            puffer.append([zeile[i] for i in positionen])
+            if len(puffer) >= chunk_zeilen:
+                yield pd.DataFrame(puffer, columns=spalten)
+                puffer = []
+        if puffer:
+            yield pd.DataFrame(puffer, columns=spalten)
+    finally:
+        mappe.close()
+
+
+# ---------------------------------------------------------
+# 2. TEILSUMMEN UND BEGRENZTE HEAPS
+# ---------------------------------------------------------
+
+def teilsummen(chunks, abfragen=ABFRAGEN):
+    """
+    Summiert pro Abfrage (Gruppe, Element) über alle Chunks.
+    Der Speicher wächst mit der Anzahl verschiedener Schlüssel, nicht mit den Zeilen.
+
+    Returns:
+        dict: Abfrage -> pd.Series (MultiIndex Gruppe..., Element)
+    """
+    summen = {name: None for name in abfragen}
+    zeilen = 0
+    for chunk in chunks:
+        zeilen += len(chunk)
+        if "Baumarkt" in chunk.columns:
+            chunk["Baumarkt"] = chunk["Baumarkt"].astype(str).str.strip()
+        for name, (gruppen, element, wert_col) in abfragen.items():
+            teil = chunk.groupby(gruppen + [element], dropna=False)[wert_col].sum()
+            summen[name] = teil if summen[name] is None else summen[name].add(teil, fill_value=0)
+        print(f"   ... {zeilen:,} Zeilen gelesen")
+    return summen
+
+
+def top_k(summe, k=TOP_K):
+    """
+    Top-k Elemente pro Gruppe mit einem Heap der Größe k je Gruppe (O(n log k), kein Sortieren aller Werte).
+
+    Returns:
+        DataFrame: Gruppe..., Element, Wert, Rang
+    """
+    gruppen_namen = list(summe.index.names[:-1])
+    heaps = {}
+    for schluessel, wert in summe.items():
+        gruppe = schluessel[:-1] if gruppen_namen else ()
+        heap = heaps.setdefault(gruppe, [])
+        eintrag = (wert, str(schluessel[-1]) if gruppen_namen else str(schluessel))
+        if len(heap) < k:
+            heapq.heappush(heap, eintrag)
+        elif eintrag > heap[0]:
+            heapq.heapreplace(heap, eintrag)
+
+    zeilen = []
+    for gruppe, heap in heaps.items():
+        for rang, (wert, element) in enumerate(sorted(heap, reverse=True), start=1):
+            zeilen.append(list(gruppe) + [element, wert, rang])
+    element_name = summe.index.names[-1]
+    return pd.DataFrame(zeilen, columns=gruppen_namen + [element_name, "Wert", "Rang"])
+
+
+# ---------------------------------------------------------
+# 3. LORENZ-KURVE / GINI
+# ---------------------------------------------------------
+
+def lorenz(werte, punkte=LORENZ_PUNKTE):
+    """
+    Konzentrationskurve: Anteil der Elemente (aufsteigend sortiert) gegen Anteil der Menge.
+
+    Returns:
+        x (Anteil Elemente), y (Anteil Menge), gini
+    """
+    werte = np.sort(np.clip(np.asarray(werte, dtype=float), 0, None))
+    n = len(werte)
+    gesamt = werte.sum()
+    if n == 0 or gesamt <= 0:
+        return np.linspace(0, 1, punkte), np.linspace(0, 1, punkte), 0.0
+
+    y_voll = np.concatenate([[0.0], np.cumsum(werte) / gesamt])
+    x_voll = np.arange(n + 1) / n
+    # Gini = 1 - 2 * Fläche unter der Lorenz-Kurve (Trapezregel)
+    gini = 1 - np.sum((y_voll[1:] + y_voll[:-1]) / n)
+    x = np.linspace(0, 1, punkte)
+    return x, np.interp(x, x_voll, y_voll), float(gini)
+
+
+def konzentration(summe):
+    """
+    Gini, Anteil der Top-20% und Lorenz-Kurve pro Gruppe.
+
+    Returns:
+        kennzahlen (DataFrame), kurven (DataFrame, lang)
+    """
+    gruppen_namen = list(summe.index.names[:-1])
+    gruppiert = summe.groupby(level=gruppen_namen, dropna=False) if gruppen_namen else [((), summe)]
+
+    kennzahlen, kurven = [], []
+    for gruppe, werte in gruppiert:
+        gruppe = gruppe if isinstance(gruppe, tuple) else (gruppe,)
+        x, y, gini = lorenz(werte.to_numpy())
+        top_20 = 1 - np.interp(0.8, x, y)
+        kennzahlen.append(list(gruppe) + [len(werte), werte.sum(), gini, top_20])
+        kurven.append(pd.DataFrame(
+            [list(gruppe) + [xi, yi] for xi, yi in zip(x, y)],
+            columns=gruppen_namen + ["Anteil_Elemente", "Anteil_Menge"],
+        ))
+    kennzahlen = pd.DataFrame(kennzahlen, columns=gruppen_namen + ["Elemente", "Menge", "Gini", "Anteil_Top_20"])
+    return kennzahlen, pd.concat(kurven, ignore_index=True)
+
+
+def plot_lorenz(kurven, gruppen_namen, titel, output_dir):
+    plt.figure(figsize=(8, 8))
+    if gruppen_namen:
+        for gruppe, kurve in kurven.groupby(gruppen_namen):
+            label = ", ".join(str(g) for g in (gruppe if isinstance(gruppe, tuple) else (gruppe,)))
+            plt.plot(kurve["Anteil_Elemente"], kurve["Anteil_Menge"], label=label)
+    else:
+        plt.plot(kurven["Anteil_Elemente"], kurven["Anteil_Menge"], label="Gesamt")
+    plt.plot([0, 1], [0, 1], color="grey", linestyle="--", label="Gleichverteilung")
+    plt.title(f"Lorenz-Kurve: {titel}")
+    plt.xlabel("Anteil Elemente (aufsteigend)")
+    plt.ylabel("Anteil Menge")
+    plt.legend(fontsize=8)
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, f"Lorenz_{titel.replace(' ', '_')}.png"))
+    plt.close()
+
+
+# ---------------------------------------------------------
+# 4. MAIN
+# ---------------------------------------------------------
+
+def main():
+    pfad = sys.argv[1] if len(sys.argv) > 1 else INPUT_FILE
+    print(f"=== STREAMING TOP-{TOP_K} / KONZENTRATION ({pfad}) ===")
+    if not os.path.exists(pfad):
+        print(f"❌ Fehler: {pfad} fehlt.")
+        return
+
+    spalten = sorted({c for g, e, w in ABFRAGEN.values() for c in g + [e, w]})
+    start = time.perf_counter()
+    summen = teilsummen(lese_chunks(pfad, spalten))
+    print(f"   ✅ Teilsummen in {time.perf_counter() - start:.1f}s")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE_EXCEL)
+    with pd.ExcelWriter(out_path) as writer:
+        for name, summe in summen.items():
+            if summe is None:
+                continue
+            gruppen_namen = list(summe.index.names[:-1])
+            kennzahlen, kurven = konzentration(summe)
+            blatt = name.replace("Top ", "")[:25]
+            top_k(summe).to_excel(writer, sheet_name=f"Top_{blatt}"[:31], index=False)
+            kennzahlen.to_excel(writer, sheet_name=f"Gini_{blatt}"[:31], index=False)
+            if len(kennzahlen) <= 20:
+                plot_lorenz(kurven, gruppen_namen, name, OUTPUT_DIR)
+            print(f"   {name}: Gini im Mittel {kennzahlen['Gini'].mean():.2f}, "
+                  f"Top 20% = {kennzahlen['Anteil_Top_20'].mean():.0%} der Menge")
+    print(f"\n✅ FERTIG! Datei gespeichert: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
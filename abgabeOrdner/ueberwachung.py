@@ -0,0 +1,469 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import glob
+import json
+import time
+import queue
+import argparse
+import threading
+import traceback
+from datetime import datetime
+
+import erp
+import backend
+import snapshots
+import planversionen
+from stufen import lade_stufe
+from cache import lade_cache, speichere_cache
+
+# --- KONFIGURATION ---
+EINGANG_DIR = "./eingang"                   # Ablageordner für neue Extrakte
+STATUS_DIR = "./output/ueberwachung"
+ZUSTAND_DATEI = "zustand.json"
+LAUF_PROTOKOLL = "laeufe.jsonl"
+SPERR_DATEI = "ueberwachung.lock"
+INTERVALL = 10                              # Sekunden zwischen zwei Prüfungen des Ordners
+MUSTER = {
+    "rohdaten": "rohdaten*.xlsx",
+    "baumarktprogramm": "BAUMARKTPROGRAMM*.xlsx",
+}
+SCHLUESSEL = ["Kunde", "Monat"]             # Abgleich ist je Kunde x Monat unabhängig
+
+# ---------------------------------------------------------
+# 1. ZUSTAND (welche Dateien sind bekannt, welche sind aktiv)
+# ---------------------------------------------------------
+
+def lade_zustand(status_dir=STATUS_DIR):
+    pfad = os.path.join(status_dir, ZUSTAND_DATEI)
+    if not os.path.exists(pfad):
+        return {"dateien": {}, "aktiv": {}, "letzter_lauf": None}
+    with open(pfad, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def speichere_zustand(zustand, status_dir=STATUS_DIR):
+    """Atomar schreiben (erst .tmp, dann umbenennen) – ein Abbruch hinterlässt nie halbe Dateien."""
+    os.makedirs(status_dir, exist_ok=True)
+    pfad = os.path.join(status_dir, ZUSTAND_DATEI)
+    with open(f"{pfad}.tmp", "w", encoding="utf-8") as f:
+        json.dump(zustand, f, indent=2, ensure_ascii=False)
+    os.replace(f"{pfad}.tmp", pfad)
+
+
+def _merkmal(pfad):
+    info = os.stat(pfad)
+    return [info.st_size, info.st_mtime_ns]
+
+
+def durchsuche(eingang=EINGANG_DIR):
+    """Alle passenden Dateien im Ablageordner: Pfad -> (Typ, [Größe, Änderungszeit])."""
+    gefunden = {}
+    for typ, muster in MUSTER.items():
+        for pfad in glob.glob(os.path.join(eingang, muster)):
+            if os.path.basename(pfad).startswith("~$"):     # offene Excel-Sperrdatei
+                continue
+            try:
+                gefunden[os.path.abspath(pfad)] = (typ, _merkmal(pfad))
+            except FileNotFoundError:
+                continue
+    return gefunden
+
+
+def _neueste(zustand, typ):
+    """Zuletzt angenommene Datei eines Typs (Plan: höchste Version laut Dateiname)."""
+    kandidaten = [p for p, d in zustand["dateien"].items() if d["typ"] == typ and d["status"] == "angenommen"]
+    if not kandidaten:
+        return None
+    if typ == "baumarktprogramm":
+        return max(kandidaten, key=lambda p: (planversionen.version_aus_datei(p) or "", zustand["dateien"][p]["mtime_ns"]))
+    return max(kandidaten, key=lambda p: zustand["dateien"][p]["mtime_ns"])
+
+
+# ---------------------------------------------------------
+# 2. INKREMENTELLER ABGLEICH
+# ---------------------------------------------------------
+
+def schluessel_hashes(df, werte):
+    """
+    Ein Hash je Kunde x Monat über alle zugehörigen Zeilen (Summe der Zeilen-Hashes,
+    unabhängig von der Reihenfolge). Ändert sich eine Zeile, ändert sich nur der Hash ihres Schlüssels.
+    """
+    if df.empty:
+        return pd.Series(dtype=np.uint64)
+    zeilen = pd.util.hash_pandas_object(df[SCHLUESSEL + werte], index=False)
+    return zeilen.groupby([df[c] for c in SCHLUESSEL], dropna=False).sum()
+
+
+def geaenderte_schluessel(alt, neu):
+    """Schlüssel, die neu sind, entfallen oder deren Hash sich geändert hat."""
+    if alt is None:
+        return None
+    beide = pd.concat([alt.rename("alt"), neu.rename("neu")], axis=1)
+    return beide.index[beide["alt"].ne(beide["neu"])]
+
+
+def abgleich_inkrementell(df_forecast, df_plan, sitzung, status_dir=STATUS_DIR):
+    """
+    Rechnet den Abgleich nur für Kunde x Monat neu, deren Prognose- oder Planzeilen sich seit dem
+    letzten Lauf geändert haben; alle anderen Zeilen kommen aus dem vorherigen Ergebnis.
+
+    Returns:
+        df_final, Info-dict (Schlüssel gesamt / neu berechnet)
+    """
+    hashes = {
+        "forecast": schluessel_hashes(df_forecast, ["Artikel", "Gruppe", "Menge"]),
+        "plan": schluessel_hashes(df_plan, ["Ziel_Summe"]),
+    }
+    vorher = lade_cache("ueberwachung", "stand")
+    alle = hashes["forecast"].index.union(hashes["plan"].index)
+
+    geaendert = None
+    if vorher is not None:
+        geaendert_f = geaenderte_schluessel(vorher["hashes"]["forecast"], hashes["forecast"])
+        geaendert_p = geaenderte_schluessel(vorher["hashes"]["plan"], hashes["plan"])
+        geaendert = geaendert_f.union(geaendert_p)
+
+    if geaendert is None or len(geaendert) == len(alle):
+        df_final = backend.run_reconciliation(df_forecast, df_plan, sitzung.backend)
+        art = "vollständig"
+    elif len(geaendert) == 0:
+        df_final = vorher["final"]
+        art = "unverändert"
+    else:
+        betroffen = pd.MultiIndex.from_frame(df_forecast[SCHLUESSEL]).isin(geaendert)
+        plan_betroffen = pd.MultiIndex.from_frame(df_plan[SCHLUESSEL]).isin(geaendert)
+        teil = df_forecast[betroffen]
+        neu = backend.run_reconciliation(teil, df_plan[plan_betroffen], sitzung.backend) if len(teil) else teil
+        if len(teil) and neu.empty:
+            # z.B. keine Planzeile für die geänderten Schlüssel -> wie im Vollabgleich behandeln
+            neu = backend.run_reconciliation(df_forecast, df_plan, sitzung.backend)
+            neu = neu[pd.MultiIndex.from_frame(neu[SCHLUESSEL]).isin(geaendert)]
+        alt = vorher["final"]
+        alt = alt[~pd.MultiIndex.from_frame(alt[SCHLUESSEL]).isin(geaendert)]
+        df_final = pd.concat([alt, neu], ignore_index=True)
+        art = "inkrementell"
+
+    if df_final is None or df_final.empty:
+        raise ValueError("Abgleich ohne Ergebnis")
+    speichere_cache("ueberwachung", "stand", {"hashes": hashes, "final": df_final})
+    info = {
+        "art": art,
+        "schluessel_gesamt": int(len(alle)),
+        "schluessel_neu_berechnet": int(len(alle) if geaendert is None else len(geaendert)),
+        "kunden_betroffen": sorted({str(k) for k, _ in geaendert}) if geaendert is not None else "alle",
+    }
+    return df_final, info
+
+
+# ---------------------------------------------------------
+# 3. EIN AUFTRAG (Validieren -> betroffene Stufen -> Zusammenfassung)
+# ---------------------------------------------------------
+
+def _sitzung(config, rohdaten, plan, status_dir, sitzungen=None):
+    """Eine Datensitzung je Eingabepaar und Lauf – Prüfung und Berechnung lesen jede Datei nur einmal."""
+    if sitzungen is not None and (rohdaten, plan) in sitzungen:
+        return sitzungen[(rohdaten, plan)]
+    config = json.loads(json.dumps(config))
+    config["dateien"]["rohdaten"] = rohdaten
+    config["dateien"]["baumarktprogramm"] = plan
+    # Plan immer aus der abgelegten Datei aggregieren, nie eine alte agg_baumarktprogramm.xlsx lesen
+    config["dateien"]["plan_agg"] = os.path.join(status_dir, "kein_plan_agg.xlsx")
+    sitzung = erp.DatenSitzung(config)
+    if sitzungen is not None:
+        sitzungen[(rohdaten, plan)] = sitzung
+    return sitzung
+
+
+def _validiere(sitzung, typ, zusammenfassung):
+    """Ablehnen, wenn das Schema nicht passt oder keine gültige Zeile übrig bleibt."""
+    if typ == "rohdaten":
+        df = sitzung.rohdaten()
+        bericht, quarantaene = sitzung.daten.get("validierung", (pd.DataFrame(), pd.DataFrame()))
+        zusammenfassung["validierung"] = {
+            "zeilen": int(len(df)), "quarantaene": int(len(quarantaene)),
+            "verstoesse": {r["Regel"]: int(r["Verstoesse"]) for _, r in bericht.iterrows() if r["Verstoesse"] > 0},
+        }
+        schema = bericht[(bericht["Regel"] == "schema_rohdaten") & (bericht["Verstoesse"] > 0)]
+        if len(schema) or df.empty:
+            raise ValueError(f"Rohdaten abgelehnt: {schema['Detail'].tolist() or 'keine gültigen Zeilen'}")
+    else:
+        plan = sitzung.plan()
+        if plan.empty or plan["Ziel_Summe"].sum() <= 0:
+            raise ValueError("Baumarktprogramm abgelehnt: keine Planmengen gefunden")
+        zusammenfassung["plan_zeilen"] = int(len(plan))
+
+
+def verarbeite(auftraege, zustand, config, status_dir=STATUS_DIR, plots=False):
+    """
+    Bearbeitet alle gleichzeitig wartenden Dateien in einem Lauf:
+    neue Dateien prüfen, bei Erfolg aktivieren, dann nur die betroffenen Stufen ausführen.
+    """
+    lauf_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    start = time.perf_counter()
+    zusammenfassung = {"lauf": lauf_id, "start": datetime.now().isoformat(timespec="seconds"),
+                       "dateien": [], "stufen": [], "status": "ok"}
+    print(f"\n{'=' * 60}\n▶ Lauf {lauf_id}: {len(auftraege)} neue/geänderte Datei(en)\n{'=' * 60}")
+
+    sitzungen = {}
+    try:
+        geaendert_typen = set()
+        for pfad, (typ, merkmal) in auftraege.items():
+            eintrag = {"typ": typ, "groesse": merkmal[0], "mtime_ns": merkmal[1],
+                       "sha256": snapshots.datei_hash(pfad), "geprueft": lauf_id}
+            bekannt = zustand["dateien"].get(pfad)
+            if bekannt and bekannt.get("sha256") == eintrag["sha256"]:
+                # nur angefasst, Inhalt gleich
+                bekannt.update(groesse=merkmal[0], mtime_ns=merkmal[1])
+                continue
+            aktiv = dict(zustand["aktiv"], **{typ: pfad})
+            datei_info = {"pfad": pfad, "typ": typ, "sha256": eintrag["sha256"]}
+            try:
+                # Jede Datei wird für sich geprüft; die andere Eingabe wird dafür nicht gebraucht
+                sitzung = _sitzung(config, aktiv.get("rohdaten"), aktiv.get("baumarktprogramm"), status_dir, sitzungen)
+                _validiere(sitzung, typ, datei_info)
+                eintrag["status"] = "angenommen"
+                geaendert_typen.add(typ)
+            except Exception as e:
+                eintrag["status"] = "abgelehnt"
+                datei_info["fehler"] = str(e)
+                print(f"   ❌ {os.path.basename(pfad)}: {e}")
+            datei_info["status"] = eintrag["status"]
+            zusammenfassung["dateien"].append(datei_info)
+            zustand["dateien"][pfad] = eintrag
+
+        for typ in MUSTER:
+            zustand["aktiv"][typ] = _neueste(zustand, typ)
+        if not geaendert_typen:
+            abgelehnt = any(d["status"] == "abgelehnt" for d in zusammenfassung["dateien"])
+            zusammenfassung["status"] = "abgelehnt" if abgelehnt else "keine Änderung"
+        elif not all(zustand["aktiv"].get(t) for t in MUSTER):
+            fehlt = [t for t in MUSTER if not zustand["aktiv"].get(t)]
+            zusammenfassung["status"] = f"wartet auf {', '.join(fehlt)}"
+            print(f"   ℹ️  Warte auf: {', '.join(fehlt)}")
+        else:
+            _rechne(zustand, config, status_dir, geaendert_typen, zusammenfassung, plots, sitzungen)
+    except Exception as e:
+        zusammenfassung["status"] = "fehler"
+        zusammenfassung["fehler"] = str(e)
+        print(f"   ❌ Lauf fehlgeschlagen: {e}")
+        traceback.print_exc(limit=3)
+
+    zusammenfassung["aktiv"] = dict(zustand["aktiv"])
+    zusammenfassung["dauer_s"] = round(time.perf_counter() - start, 2)
+    zustand["letzter_lauf"] = lauf_id
+    speichere_zustand(zustand, status_dir)
+    veroeffentliche(zusammenfassung, status_dir)
+    return zusammenfassung
+
+
+def _rechne(zustand, config, status_dir, geaendert_typen, zusammenfassung, plots, sitzungen=None):
+    """Nur die Stufen, die von den geänderten Eingaben abhängen."""
+    rohdaten = zustand["aktiv"]["rohdaten"]
+    sitzung = _sitzung(config, rohdaten, zustand["aktiv"]["baumarktprogramm"], status_dir, sitzungen)
+
+    # Unveränderte Rohdaten (nur neuer Plan): aufbereitete Prognose aus dem Cache statt Excel lesen
+    forecast_schluessel = f"forecast_{zustand['dateien'][rohdaten]['sha256'][:16]}"
+    if "forecast" not in sitzung.daten:
+        gecacht = lade_cache("ueberwachung", forecast_schluessel)
+        if gecacht is not None:
+            print("   ℹ️  Rohdaten unverändert – Prognose aus dem Cache.")
+            sitzung.setze("forecast", gecacht)
+    speichere_cache("ueberwachung", forecast_schluessel, sitzung.forecast())
+
+    def stufe(name, funktion):
+        t = time.perf_counter()
+        ergebnis = funktion()
+        zusammenfassung["stufen"].append({"stufe": name, "dauer_s": round(time.perf_counter() - t, 2)})
+        print(f"   ✅ {name} fertig in {time.perf_counter() - t:.1f}s")
+        return ergebnis
+
+    if "baumarktprogramm" in geaendert_typen:
+        # Stufe 2 (Plan-Teil): aggregierten Plan dorthin schreiben, wo erp.py und die Einzelskripte
+        # (Stufe 3/4) ihn lesen – die Sitzung selbst liest ihn nie von dort (siehe _sitzung)
+        plan_agg = stufe("stage2 (Plan)", sitzung.plan_agg)
+        os.makedirs(os.path.dirname(config["dateien"]["plan_agg"]) or ".", exist_ok=True)
+        plan_agg.to_excel(config["dateien"]["plan_agg"], index=False)
+
+    df_final, info = stufe("stage3 (Abgleich)", lambda: abgleich_inkrementell(sitzung.forecast(), sitzung.plan(), sitzung, status_dir))
+    zusammenfassung["abgleich"] = info
+    print(f"   ℹ️  Abgleich {info['art']}: {info['schluessel_neu_berechnet']:,} von "
+          f"{info['schluessel_gesamt']:,} Kunde x Monat neu berechnet")
+    if info["art"] == "unverändert":
+        return
+    sitzung.setze("final", df_final)
+
+    stufe3 = lade_stufe(3)
+    stufe("stage3 (Speichern)", lambda: stufe3.save_results(df_final, sitzung.ausgabe("final")))
+    stufe("stage4", lambda: erp.stufe_4(sitzung, plots=False))
+    if config["snapshots"]["aktiv"]:
+        version = stufe("snapshot", lambda: snapshots.speichere_snapshot(
+            df_final,
+            eingaben={t: zustand["aktiv"][t] for t in MUSTER},
+            plan_version=planversionen.version_aus_datei(zustand["aktiv"]["baumarktprogramm"]),
+            store=sitzung.ausgabe("snapshots"),
+            notiz=f"ueberwachung {zusammenfassung['lauf']}",
+        ))
+        zusammenfassung["snapshot"] = version
+    if plots:
+        stufe("stage5", lambda: erp.stufe_5(sitzung))
+
+
+def veroeffentliche(zusammenfassung, status_dir=STATUS_DIR):
+    """Zusammenfassung je Lauf als JSON-Datei und als Zeile im Protokoll."""
+    ordner = os.path.join(status_dir, "laeufe")
+    os.makedirs(ordner, exist_ok=True)
+    pfad = os.path.join(ordner, f"{zusammenfassung['lauf']}.json")
+    with open(pfad, "w", encoding="utf-8") as f:
+        json.dump(zusammenfassung, f, indent=2, ensure_ascii=False, default=str)
+    with open(os.path.join(status_dir, LAUF_PROTOKOLL), "a", encoding="utf-8") as f:
+        f.write(json.dumps(zusammenfassung, ensure_ascii=False, default=str) + "\n")
+    print(f"   📄 Zusammenfassung ({zusammenfassung['status']}): {pfad}")
+
+
+# ---------------------------------------------------------
+# 4. DIENST: ORDNER PRÜFEN -> WARTESCHLANGE -> EIN WORKER
+# ---------------------------------------------------------
+
+class Ueberwachung:
+    """
+    Ein Thread prüft den Ablageordner, ein einziger Worker arbeitet die Warteschlange ab.
+    Dateien werden erst eingereiht, wenn Größe und Änderungszeit über zwei Prüfungen gleich
+    bleiben (Kopiervorgang abgeschlossen). Was während eines Laufs eintrifft, wartet in der
+    Schlange und wird im nächsten Lauf gemeinsam verarbeitet – Läufe überlappen nie.
+    """
+
+    def __init__(self, config, eingang=EINGANG_DIR, status_dir=STATUS_DIR, intervall=INTERVALL, plots=False):
+        self.config = config
+        self.eingang = eingang
+        self.status_dir = status_dir
+        self.intervall = intervall
+        self.plots = plots
+        self.zustand = lade_zustand(status_dir)
+        self.lock = threading.Lock()
+        self.warteschlange = queue.Queue()
+        self.eingereiht = {}            # Pfad -> Merkmal, das schon in der Schlange liegt
+        self.vorige_pruefung = {}
+        self.stopp = threading.Event()
+
+    def neue_dateien(self, stabil_pruefen=True):
+        """Dateien, deren Merkmal vom Zustand abweicht (und beim Kopieren nicht mehr wächst)."""
+        gefunden = durchsuche(self.eingang)
+        neu = {}
+        with self.lock:
+            for pfad, (typ, merkmal) in gefunden.items():
+                bekannt = self.zustand["dateien"].get(pfad)
+                if bekannt and [bekannt["groesse"], bekannt["mtime_ns"]] == merkmal:
+                    continue
+                if self.eingereiht.get(pfad) == merkmal:
+                    continue
+                if stabil_pruefen and self.vorige_pruefung.get(pfad) != (typ, merkmal):
+                    continue
+                neu[pfad] = (typ, merkmal)
+                self.eingereiht[pfad] = merkmal
+        self.vorige_pruefung = gefunden
+        return neu
+
+    def pruefe(self, stabil_pruefen=True):
+        for pfad, eintrag in self.neue_dateien(stabil_pruefen).items():
+            print(f"   📥 {os.path.basename(pfad)} eingereiht")
+            self.warteschlange.put((pfad, eintrag))
+
+    def worker(self):
+        while True:
+            auftrag = self.warteschlange.get()
+            if auftrag is None:
+                self.warteschlange.task_done()
+                break
+            auftraege = dict([auftrag])
+            # Alles, was inzwischen wartet, im selben Lauf mitnehmen
+            while True:
+                try:
+                    weiterer = self.warteschlange.get_nowait()
+                except queue.Empty:
+                    break
+                if weiterer is None:
+                    self.warteschlange.put(None)
+                    self.warteschlange.task_done()
+                    break
+                auftraege[weiterer[0]] = weiterer[1]
+                self.warteschlange.task_done()
+            try:
+                with self.lock:
+                    zustand = json.loads(json.dumps(self.zustand))
+                verarbeite(auftraege, zustand, self.config, self.status_dir, self.plots)
+                with self.lock:
+                    self.zustand = zustand
+                    for pfad in auftraege:
+                        self.eingereiht.pop(pfad, None)
+            finally:
+                self.warteschlange.task_done()
+
+    def einmal(self):
+        """Aktuellen Ordnerinhalt sofort verarbeiten (ohne Stabilitätsprüfung) und zurückkehren."""
+        self.pruefe(stabil_pruefen=False)
+        self.warteschlange.put(None)
+        self.worker()
+
+    def starte(self):
+        print(f"👀 Überwache '{self.eingang}' alle {self.intervall}s (Strg+C beendet)")
+        thread = threading.Thread(target=self.worker, name="ueberwachung-worker", daemon=True)
+        thread.start()
+        try:
+            while not self.stopp.is_set():
+                self.pruefe()
+                self.stopp.wait(self.intervall)
+        except KeyboardInterrupt:
+            print("\n   ℹ️  Beende nach dem laufenden Auftrag...")
+        self.warteschlange.put(None)
+        thread.join()
+
+
+def _sperre(status_dir):
+    """Verhindert zwei Dienste auf demselben Ausgabeordner (würden denselben Zustand schreiben)."""
+    os.makedirs(status_dir, exist_ok=True)
+    pfad = os.path.join(status_dir, SPERR_DATEI)
+    try:
+        fd = os.open(pfad, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        with open(pfad) as f:
+            print(f"❌ Überwachung läuft bereits (PID {f.read().strip()}); sonst {pfad} löschen.")
+        return None
+    os.write(fd, str(os.getpid()).encode())
+    os.close(fd)
+    return pfad
+
+
+# ---------------------------------------------------------
+# 5. MAIN
+# ---------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ablageordner überwachen und betroffene Stufen neu rechnen")
+    parser.add_argument("--config", help=f"TOML-Konfiguration (Standard: {erp.CONFIG_DATEI}, falls vorhanden)")
+    parser.add_argument("--eingang", default=EINGANG_DIR, help="Ablageordner für rohdaten*.xlsx / BAUMARKTPROGRAMM*.xlsx")
+    parser.add_argument("--intervall", type=float, default=INTERVALL, help="Sekunden zwischen zwei Prüfungen")
+    parser.add_argument("--einmal", action="store_true", help="aktuellen Inhalt verarbeiten und beenden (z.B. für cron)")
+    parser.add_argument("--plots", action="store_true", help="nach jedem Lauf auch stage5 (Plots) erzeugen")
+    args = parser.parse_args(argv)
+
+    config = erp.lade_config(args.config)
+    status_dir = os.path.join(config["ausgabe"]["verzeichnis"], "ueberwachung")
+    os.makedirs(args.eingang, exist_ok=True)
+    sperre = _sperre(status_dir)
+    if sperre is None:
+        return 1
+    try:
+        dienst = Ueberwachung(config, args.eingang, status_dir, args.intervall, args.plots)
+        if args.einmal:
+            dienst.einmal()
+        else:
+            dienst.starte()
+    finally:
+        os.remove(sperre)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
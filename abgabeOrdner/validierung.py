@@ -0,0 +1,272 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+# --- KONFIGURATION ---
+INPUT_FILE_ROHDATEN = "rohdaten.xlsx"
+INPUT_FILE_PLAN = "./output/agg_baumarktprogramm.xlsx"   # wie von Schritt 2 geschrieben
+OUTPUT_DIR = "./output/validierung"
+OUTPUT_FILE_EXCEL = "Validierung.xlsx"
+
+BEISPIELE = 5                   # Beispielschlüssel pro Regel im Bericht
+JAHR_MIN, JAHR_MAX = 2000, 2100
+PLAN_FAKTOR = 1000              # Plan in Tausend Stück (wie prepare_plan in Stufe 3)
+PLAN_GRENZEN = (0.1, 10)        # Plan / Prognose außerhalb -> Einheit vermutlich falsch (wie run_reconciliation)
+
+SCHLUESSEL = {
+    "rohdaten": ["matnr", "Baumarkt", "bedmo"],
+    "plan": ["Baumarkt", "Monat"],
+}
+
+# Deklarative Regeln. 'schwere' = "fehler": verletzende Zeilen gehen in die Quarantäne,
+# "warnung": nur im Bericht. Regeln für fehlende Spalten werden übersprungen (meldet 'schema').
+REGELN = [
+    {"name": "schema_rohdaten", "tabelle": "rohdaten", "art": "schema", "schwere": "fehler",
+     "spalten": ["matnr", "Baumarkt", "Baumarktartikel", "bedmo", "wavor_bstlmg",
+                 "progmo", "prog_mg1", "progmo2", "prog_mg2"]},
+    {"name": "zahl_dtype", "tabelle": "rohdaten", "art": "dtype", "schwere": "fehler",
+     "spalten": ["bedmo", "progmo", "progmo2", "wavor_bstlmg", "wavor_anteilpromonat",
+                 "wavor_bstlmengemonat", "bedmo_mg", "prog_mg1", "prog_mg2"]},
+    {"name": "monat_gueltig", "tabelle": "rohdaten", "art": "monat", "schwere": "fehler",
+     "spalten": ["bedmo", "progmo", "progmo2"]},
+    {"name": "menge_nicht_negativ", "tabelle": "rohdaten", "art": "nicht_negativ", "schwere": "fehler",
+     "spalten": ["wavor_bstlmg", "bedmo_mg", "prog_mg1", "prog_mg2"]},
+    {"name": "anteil_x_menge", "tabelle": "rohdaten", "art": "produkt", "schwere": "warnung",
+     "spalten": ["wavor_bstlmg", "wavor_anteilpromonat", "wavor_bstlmengemonat"],
+     "rel_toleranz": 0.01, "abs_toleranz": 1.0},
+    {"name": "schema_plan", "tabelle": "plan", "art": "schema", "schwere": "fehler",
+     "spalten": ["Baumarkt", "Monat", "Zahl"]},
+    {"name": "plan_monat_gueltig", "tabelle": "plan", "art": "monat", "schwere": "fehler", "spalten": ["Monat"]},
+    {"name": "plan_nicht_negativ", "tabelle": "plan", "art": "nicht_negativ", "schwere": "fehler", "spalten": ["Zahl"]},
+    {"name": "plan_einheit", "tabelle": "beide", "art": "skala", "schwere": "warnung"},
+    {"name": "plan_kunde_ohne_prognose", "tabelle": "beide", "art": "abdeckung", "schwere": "warnung"},
+]
+
+# ---------------------------------------------------------
+# 1. ZEILENREGELN (vektorisiert: je Regel eine boolesche Maske)
+# ---------------------------------------------------------
+
+class _Spalten:
+    """Numerische Sicht auf die Spalten; jede Spalte wird nur einmal umgewandelt."""
+
+    def __init__(self, df):
+        self.df = df
+        self._zahlen = {}
+
+    def zahl(self, spalte):
+        if spalte not in self._zahlen:
+            self._zahlen[spalte] = pd.to_numeric(self.df[spalte], errors="coerce")
+        return self._zahlen[spalte]
+
+
+def _verstoss_dtype(spalten, regel, spalte):
+    """Wert vorhanden, aber nicht als Zahl lesbar (z.B. Text in 'prog_mg1')."""
+    return spalten.df[spalte].notna() & spalten.zahl(spalte).isna()
+
+
+def _verstoss_monat(spalten, regel, spalte):
+    """Monatscode JJJJMM: ganzzahlig, Monat 1..12, Jahr im Bereich. Leere Werte sind erlaubt."""
+    wert = spalten.zahl(spalte)
+    jahr, monat = wert // 100, wert % 100
+    gueltig = (wert % 1 == 0) & monat.between(1, 12) & jahr.between(JAHR_MIN, JAHR_MAX)
+    return spalten.df[spalte].notna() & ~gueltig
+
+
+def _verstoss_nicht_negativ(spalten, regel, spalte):
+    return spalten.zahl(spalte) < 0
+
+
+def _verstoss_produkt(spalten, regel, spalte=None):
+    """a * b ≈ c (relative oder absolute Toleranz); nur wenn alle drei Werte vorhanden sind."""
+    a, b, c = (spalten.zahl(s) for s in regel["spalten"])
+    abweichung = (a * b - c).abs()
+    erlaubt = np.maximum(regel.get("rel_toleranz", 0.01) * c.abs(), regel.get("abs_toleranz", 0.0))
+    return (abweichung > erlaubt).fillna(False)
+
+
+ZEILEN_PRUEFUNGEN = {
+    "dtype": _verstoss_dtype,
+    "monat": _verstoss_monat,
+    "nicht_negativ": _verstoss_nicht_negativ,
+    "produkt": _verstoss_produkt,
+}
+
+# ---------------------------------------------------------
+# 2. TABELLENREGELN (Schema, Plan-Einheit, Abdeckung)
+# ---------------------------------------------------------
+
+def _kunden(serie):
+    return set(serie.dropna().astype(str).str.strip().str.upper())
+
+
+def _pruefe_schema(df, regel):
+    fehlend = [c for c in regel["spalten"] if c not in df.columns]
+    return len(fehlend), fehlend, f"{len(regel['spalten']) - len(fehlend)}/{len(regel['spalten'])} Pflichtspalten"
+
+
+def _pruefe_skala(rohdaten, plan, regel):
+    """Plan (x PLAN_FAKTOR) im Verhältnis zur Prognose derselben Monate – wie der gewichtete Faktor in Stufe 3."""
+    prognose = 0.0
+    plan_monate = set(pd.to_numeric(plan["Monat"], errors="coerce").dropna().astype(int))
+    for monat_col, menge_col in [("progmo", "prog_mg1"), ("progmo2", "prog_mg2")]:
+        if monat_col in rohdaten.columns and menge_col in rohdaten.columns:
+            monat = pd.to_numeric(rohdaten[monat_col], errors="coerce")
+            menge = pd.to_numeric(rohdaten[menge_col], errors="coerce")
+            prognose += menge[monat.isin(plan_monate)].sum()
+    plan_summe = pd.to_numeric(plan["Zahl"], errors="coerce").sum() * PLAN_FAKTOR
+    if prognose <= 0:
+        return 1, [], "Keine Prognose in den Planmonaten"
+    verhaeltnis = plan_summe / prognose
+    unten, oben = PLAN_GRENZEN
+    detail = f"Plan x {PLAN_FAKTOR} / Prognose = {verhaeltnis:.3f}"
+    if unten <= verhaeltnis <= oben:
+        return 0, [], detail
+    if unten <= verhaeltnis / PLAN_FAKTOR <= oben:
+        detail += " – Plan ist vermutlich schon in Stück"
+    return 1, [], detail
+
+
+def _pruefe_abdeckung(rohdaten, plan, regel):
+    ohne_prognose = sorted(_kunden(plan["Baumarkt"]) - _kunden(rohdaten["Baumarkt"]))
+    return len(ohne_prognose), ohne_prognose[:BEISPIELE], "Kunden im Plan, aber nicht in der Prognose"
+
+
+TABELLEN_PRUEFUNGEN = {
+    "skala": _pruefe_skala,
+    "abdeckung": _pruefe_abdeckung,
+}
+
+# ---------------------------------------------------------
+# 3. AUSWERTUNG
+# ---------------------------------------------------------
+
+def _beispiele(df, maske, tabelle):
+    if not maske.any():
+        return []
+    schluessel = [c for c in SCHLUESSEL[tabelle] if c in df.columns]
+    if not schluessel:
+        return list(df.index[maske][:BEISPIELE])
+    auszug = df.loc[maske, schluessel].head(BEISPIELE).astype(str)
+    return auszug.iloc[:, 0].str.cat(auszug.iloc[:, 1:], sep="/").tolist()
+
+
+def _zeile(regel, anzahl, zeilen, beispiele, detail=""):
+    return {
+        "Regel": regel["name"], "Tabelle": regel["tabelle"], "Schwere": regel["schwere"],
+        "Verstoesse": int(anzahl), "Anteil": anzahl / zeilen if zeilen else 0.0,
+        "Beispiele": ", ".join(str(b) for b in beispiele), "Detail": detail,
+    }
+
+
+def validiere(df, tabelle="rohdaten", regeln=REGELN):
+    """
+    Prüft alle Regeln einer Tabelle in einem Durchgang über die Spalten.
+
+    Returns:
+        bereinigt (ohne Fehlerzeilen), quarantaene (Fehlerzeilen + Spalte 'Verstoesse'), bericht (DataFrame)
+    """
+    spalten = _Spalten(df)
+    bericht = []
+    fehler_masken = {}
+    for regel in regeln:
+        if regel["tabelle"] != tabelle:
+            continue
+        if regel["art"] == "schema":
+            anzahl, fehlend, detail = _pruefe_schema(df, regel)
+            bericht.append(_zeile(regel, anzahl, len(regel["spalten"]), fehlend, detail))
+            continue
+
+        vorhanden = [c for c in regel["spalten"] if c in df.columns]
+        if regel["art"] == "produkt":
+            if len(vorhanden) < len(regel["spalten"]):
+                continue
+            maske = ZEILEN_PRUEFUNGEN["produkt"](spalten, regel)
+            detail = " * ".join(regel["spalten"][:2]) + f" ≈ {regel['spalten'][2]}"
+        else:
+            if not vorhanden:
+                continue
+            pruefung = ZEILEN_PRUEFUNGEN[regel["art"]]
+            je_spalte = pd.DataFrame({c: pruefung(spalten, regel, c) for c in vorhanden})
+            maske = je_spalte.any(axis=1)
+            detail = ", ".join(f"{c}: {n}" for c, n in je_spalte.sum().items() if n)
+
+        bericht.append(_zeile(regel, maske.sum(), len(df), _beispiele(df, maske, tabelle), detail))
+        if regel["schwere"] == "fehler" and maske.any():
+            fehler_masken[regel["name"]] = maske
+
+    bericht = pd.DataFrame(bericht, columns=["Regel", "Tabelle", "Schwere", "Verstoesse", "Anteil", "Beispiele", "Detail"])
+    if not fehler_masken:
+        return df, df.iloc[0:0].assign(Verstoesse=pd.Series(dtype=str)), bericht
+
+    masken = pd.DataFrame(fehler_masken)
+    quarantaene_maske = masken.any(axis=1)
+    # Regelnamen pro Zeile, z.B. "monat_gueltig; menge_nicht_negativ"
+    namen = masken[quarantaene_maske].apply(lambda z: "; ".join(masken.columns[z.to_numpy()]), axis=1)
+    quarantaene = df[quarantaene_maske].assign(Verstoesse=namen)
+    return df[~quarantaene_maske], quarantaene, bericht
+
+
+def pruefe_beziehungen(rohdaten, plan, regeln=REGELN):
+    """Regeln über Rohdaten und Plan gemeinsam (Plan-Einheit, Kunden ohne Prognose). Nur Bericht."""
+    bericht = []
+    for regel in regeln:
+        if regel["tabelle"] != "beide":
+            continue
+        try:
+            anzahl, beispiele, detail = TABELLEN_PRUEFUNGEN[regel["art"]](rohdaten, plan, regel)
+        except KeyError as e:
+            anzahl, beispiele, detail = 1, [], f"Spalte fehlt: {e}"
+        bericht.append(_zeile(regel, anzahl, 1, beispiele, detail))
+    return pd.DataFrame(bericht, columns=["Regel", "Tabelle", "Schwere", "Verstoesse", "Anteil", "Beispiele", "Detail"])
+
+
+def drucke_bericht(bericht):
+    for _, z in bericht.iterrows():
+        if z["Verstoesse"] == 0:
+            print(f"   ✅ {z['Regel']}: OK" + (f" ({z['Detail']})" if z["Detail"] else ""))
+        else:
+            symbol = "❌" if z["Schwere"] == "fehler" else "⚠️"
+            print(f"   {symbol} {z['Regel']}: {z['Verstoesse']} Verstöße ({z['Detail']})"
+                  + (f" – z.B. {z['Beispiele']}" if z["Beispiele"] else ""))
+
+
+def speichere(bericht, quarantaenen, out_dir=OUTPUT_DIR):
+    """Bericht und Quarantäne-Zeilen (je Tabelle ein Blatt) als Excel."""
+    os.makedirs(out_dir, exist_ok=True)
+    pfad = os.path.join(out_dir, OUTPUT_FILE_EXCEL)
+    with pd.ExcelWriter(pfad) as writer:
+        bericht.to_excel(writer, sheet_name="Bericht", index=False)
+        for tabelle, df in quarantaenen.items():
+            df.to_excel(writer, sheet_name=f"Quarantaene_{tabelle}"[:31], index=False)
+    print(f"   ✅ Validierung gespeichert: {pfad}")
+    return pfad
+
+
+# ---------------------------------------------------------
+# 4. MAIN
+# ---------------------------------------------------------
+
+def main():
+    rohdaten_pfad = sys.argv[1] if len(sys.argv) > 1 else INPUT_FILE_ROHDATEN
+    plan_pfad = sys.argv[2] if len(sys.argv) > 2 else INPUT_FILE_PLAN
+    print("=== DATENVALIDIERUNG ===")
+    for pfad in [rohdaten_pfad, plan_pfad]:
+        if not os.path.exists(pfad):
+            print(f"❌ Fehler: {pfad} fehlt.")
+            return
+
+    rohdaten = pd.read_excel(rohdaten_pfad)
+    plan = pd.read_excel(plan_pfad)
+    rohdaten_ok, quarantaene_roh, bericht_roh = validiere(rohdaten, "rohdaten")
+    plan_ok, quarantaene_plan, bericht_plan = validiere(plan, "plan")
+    bericht = pd.concat([bericht_roh, bericht_plan, pruefe_beziehungen(rohdaten_ok, plan_ok)], ignore_index=True)
+
+    drucke_bericht(bericht)
+    print(f"\n   Quarantäne: {len(quarantaene_roh)} von {len(rohdaten)} Rohdatenzeilen, "
+          f"{len(quarantaene_plan)} von {len(plan)} Planzeilen.")
+    speichere(bericht, {"rohdaten": quarantaene_roh, "plan": quarantaene_plan})
+
+
+if __name__ == "__main__":
+    main()
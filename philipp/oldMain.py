@@ -3,6 +3,9 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 
+# Saisonprofile, wie von abgabeOrdner/saisonprofile.py gespeichert (im selben Datenordner)
+SAISONPROFILE_DATEI = "./output/final/Saisonprofile.xlsx"
+
 
 def load_data():
     try:
@@ -116,15 +119,24 @@ def plot_trends(df_agg_gesamt):
     plt.grid(True)
     plt.show()
 
-    # Erstellen einer Monats-Spalte für die Gruppierung
-    df_agg_gesamt["Monat_Nr"] = df_agg_gesamt["Datum"].dt.month
+    # Saisonale Analyse aus den gespeicherten Saisonprofilen (Index je Kunde und Monat)
+    if os.path.exists(SAISONPROFILE_DATEI):
+        df_profile = pd.read_excel(SAISONPROFILE_DATEI)
+        index_spalten = [f"Index_{m:02d}" for m in range(1, 13)]
+        df_index = df_profile[df_profile["Ebene"] == "Kunde"].melt(
+            id_vars="Baumarkt", value_vars=index_spalten, var_name="Monat_Nr", value_name="Saisonindex"
+        )
+        df_index["Monat_Nr"] = df_index["Monat_Nr"].str[-2:].astype(int)
 
-    plt.figure(figsize=(12, 6))
-    sns.boxplot(data=df_agg_gesamt, x="Monat_Nr", y="Prognose_Original_Gesamt")
-    plt.title("Saisonale Analyse: Sind bestimmte Monate stärker?")
-    plt.xlabel("Monat (1=Jan, 12=Dez)")
-    plt.ylabel("Prognosemenge (Stück)")
-    plt.show()
+        plt.figure(figsize=(12, 6))
+        sns.boxplot(data=df_index, x="Monat_Nr", y="Saisonindex")
+        plt.axhline(1.0, color="grey", linestyle=":")
+        plt.title("Saisonale Analyse: Sind bestimmte Monate stärker? (Saisonindex je Kunde)")
+        plt.xlabel("Monat (1=Jan, 12=Dez)")
+        plt.ylabel("Saisonindex (Mittel = 1.0)")
+        plt.show()
+    else:
+        print(f"Keine Saisonprofile gefunden ({SAISONPROFILE_DATEI}) - bitte zuerst saisonprofile.py ausführen.")
 
 
 def analyse_umsatz_pro_baumarkt(df_prognose_lang):
@@ -304,13 +316,13 @@ def analysiere_hierarchieebenen(df_prognose_lang):
     print(f"   Anzahl eindeutige Artikel: {artikel_count:,}")
     print(f"   Gesamtmenge aller Artikel: {artikel_gesamt_menge:,.0f} Stück")
 
-    # Top 5 Artikel
-    top_artikel = (
+    # Top 5 Artikel (alle Artikel sortiert behalten für die Konzentrationsanalyse)
+    artikel_agg = (
         df_prognose_lang.groupby("matnr")["Prognose_Menge"]
         .sum()
         .sort_values(ascending=False)
-        .head(5)
     )
+    top_artikel = artikel_agg.head(5)
     print(f"   Top 5 Artikel:")
     for artikel, menge in top_artikel.items():
         anteil = (menge / artikel_gesamt_menge) * 100
@@ -375,7 +387,7 @@ def analysiere_hierarchieebenen(df_prognose_lang):
 
     # Top 20% Artikel
     top_20_prozent_artikel = int(artikel_count * 0.2)
-    top_artikel_menge = top_artikel.head(top_20_prozent_artikel).sum()
+    top_artikel_menge = artikel_agg.head(top_20_prozent_artikel).sum()
     artikel_konzentration = (top_artikel_menge / artikel_gesamt_menge) * 100
 
     print(